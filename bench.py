@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Порівняння профілів кодування та офлайн-тест швидкості нарізання
+"""
+
+import os
+import re
+import json
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ffmpeg_runner import run_ffmpeg
+from media_cache import ProbeService
+from tiktok_bot import VideoProcessor
+
+logger = logging.getLogger(__name__)
+
+SSIM_PATTERN = re.compile(r"SSIM .*All:([\d.]+)")
+PSNR_PATTERN = re.compile(r"PSNR .*average:([\d.]+|inf)")
+
+
+def measure_quality(encoded: Path, source: Path, start: float,
+                    duration: float, vf: str, fps) -> Tuple[Optional[float],
+                                                             Optional[float]]:
+    """
+    Обчислити SSIM та PSNR закодованого фрагмента відносно джерела
+
+    Еталоном є той самий фрагмент джерела, приведений тим самим
+    фільтром до розміру та частоти кадрів TikTok.
+
+    Returns:
+        (SSIM, PSNR) або None для метрики, яку не вдалося прочитати
+    """
+    graph = (f"[1:v]{vf},fps={fps}[ref];[0:v]split[a][b];"
+             f"[ref]split[r1][r2];[a][r1]ssim;[b][r2]psnr")
+    result = subprocess.run(
+        ['ffmpeg', '-nostats', '-i', str(encoded),
+         '-ss', str(start), '-t', str(duration), '-i', str(source),
+         '-filter_complex', graph, '-f', 'null', '-'],
+        capture_output=True, text=True
+    )
+    ssim = SSIM_PATTERN.search(result.stderr)
+    psnr = PSNR_PATTERN.search(result.stderr)
+    return (
+        float(ssim.group(1)) if ssim else None,
+        float(psnr.group(1)) if psnr else None
+    )
+
+
+def benchmark_profiles(source: Path, start: float = 0.0, duration: float = 20.0,
+                       profiles: Optional[List[str]] = None,
+                       config_file: str = "tiktok_config.json") -> List[Dict]:
+    """
+    Закодувати фрагмент джерела кожним профілем і виміряти результат
+
+    Args:
+        source: Відеофайл для тесту
+        start: Початок фрагмента (секунди)
+        duration: Тривалість фрагмента (секунди)
+        profiles: Назви профілів (None - усі профілі з конфігурації)
+        config_file: Конфігурація з encoding_profiles
+
+    Returns:
+        Список результатів: profile, seconds, fps, bytes, ssim, psnr
+    """
+    import ffmpeg
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        if profiles is None:
+            profiles = list(VideoProcessor(output_dir=tmp,
+                                           config_file=config_file).profiles)
+
+        for name in profiles:
+            processor = VideoProcessor(output_dir=tmp, config_file=config_file,
+                                       profile=name)
+            options = processor._encode_options()
+            output = Path(tmp) / f"{name}.mp4"
+
+            stream = (
+                ffmpeg
+                .input(str(source), ss=start, t=duration,
+                       **processor._input_options())
+                .output(str(output), an=None,
+                        **{k: v for k, v in options.items()
+                           if k not in ('acodec', 'audio_bitrate')})
+                .overwrite_output()
+            )
+
+            logger.info(f"⏱️  Профіль {name}: кодування...")
+            began = time.monotonic()
+            run_ffmpeg(stream, duration, label=name)
+            elapsed = time.monotonic() - began
+
+            probe = ProbeService().probe(output)
+            video = ProbeService.first_stream(probe, 'video') or {}
+            frames = int(video.get('nb_frames') or 0) or round(
+                duration * processor._parse_rate(str(processor.fps))
+            )
+            ssim, psnr = measure_quality(output, source, start, duration,
+                                         options['vf'], processor.fps)
+
+            results.append({
+                'profile': name,
+                'seconds': elapsed,
+                'fps': frames / elapsed if elapsed else 0.0,
+                'bytes': output.stat().st_size,
+                'ssim': ssim,
+                'psnr': psnr,
+            })
+    return results
+
+
+def print_report(results: List[Dict]):
+    """Вивести таблицю результатів"""
+    print(f"{'Профіль':<12} {'Час, с':>8} {'FPS':>8} {'Розмір, МБ':>11} "
+          f"{'SSIM':>8} {'PSNR':>7}")
+    print("-" * 59)
+    for row in results:
+        ssim = f"{row['ssim']:.4f}" if row['ssim'] is not None else "-"
+        psnr = f"{row['psnr']:.2f}" if row['psnr'] is not None else "-"
+        print(f"{row['profile']:<12} {row['seconds']:>8.1f} {row['fps']:>8.1f} "
+              f"{row['bytes'] / 1024 / 1024:>11.2f} {ssim:>8} {psnr:>7}")
+
+
+# Синтетичні епізоди: детерміновані джерела lavfi (testsrc2 + sine)
+SYNTHETIC_SOURCES = [
+    {"name": "hd_h264", "width": 1920, "height": 1080, "fps": 30,
+     "duration": 30, "vcodec": "libx264"},
+    {"name": "sd_mpeg4", "width": 1280, "height": 720, "fps": 25,
+     "duration": 30, "vcodec": "mpeg4"},
+    # Уже у форматі TikTok: перевіряє копіювання та режим smart
+    {"name": "vertical_h264", "width": 1080, "height": 1920, "fps": 30,
+     "duration": 30, "vcodec": "libx264"},
+]
+
+
+def generate_source(spec: Dict, directory: Path) -> Path:
+    """
+    Згенерувати синтетичний епізод (або взяти раніше згенерований)
+
+    Вміст залежить лише від параметрів, тож результати різних запусків
+    порівнянні. Мережа та реальні серіали не потрібні.
+    """
+    path = Path(directory) / (
+        f"{spec['name']}_{spec['width']}x{spec['height']}_{spec['fps']}fps_"
+        f"{spec['duration']}s.mkv"
+    )
+    if path.exists():
+        return path
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f".{path.name}.part")
+    subprocess.run(
+        ['ffmpeg', '-v', 'error', '-y',
+         '-f', 'lavfi', '-i',
+         f"testsrc2=size={spec['width']}x{spec['height']}:rate={spec['fps']}:"
+         f"duration={spec['duration']}",
+         '-f', 'lavfi', '-i',
+         f"sine=frequency=440:beep_factor=4:sample_rate=48000:"
+         f"duration={spec['duration']}",
+         '-c:v', spec['vcodec'], '-g', str(spec['fps'] * 2), '-pix_fmt', 'yuv420p',
+         '-c:a', 'aac', '-b:a', '128k', '-fflags', '+bitexact',
+         '-f', 'matroska', str(partial)],
+        check=True
+    )
+    os.replace(partial, path)
+    return path
+
+
+def _run_case(source: str, mode: str, clip_duration: int,
+              config_file: str) -> Dict:
+    """
+    Нарізати одне джерело одним режимом (у свіжому процесі)
+
+    Окремий процес потрібен для чесного піку пам'яті: ru_maxrss
+    дочірніх процесів лише зростає за час життя процесу.
+    """
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        # Холодний кеш FFprobe: аналіз джерела теж входить у час
+        processor = VideoProcessor(output_dir=tmp, cut_mode=mode,
+                                   cache_file=str(Path(tmp) / "cache.db"),
+                                   config_file=config_file)
+        self_before = resource.getrusage(resource.RUSAGE_SELF)
+        children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        began = time.monotonic()
+        clips = processor.cut_video_to_clips(Path(source), clip_duration)
+        elapsed = time.monotonic() - began
+        self_after = resource.getrusage(resource.RUSAGE_SELF)
+        children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        cpu = sum(
+            (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+            for before, after in ((self_before, self_after),
+                                  (children_before, children_after))
+        )
+        fps = processor._parse_rate(str(processor.fps))
+        frames = sum(
+            round((ProbeService.duration(processor.probe_service.probe(clip))
+                   or 0) * fps)
+            for clip in clips
+        )
+        written = sum(path.stat().st_size for path in Path(tmp).rglob("*")
+                      if path.is_file() and not path.name.startswith("cache.db"))
+
+    return {
+        'source': Path(source).stem,
+        'mode': mode,
+        'clips': len(clips),
+        'seconds': elapsed,
+        'clips_per_sec': len(clips) / elapsed if elapsed else 0.0,
+        'encode_fps': frames / elapsed if elapsed else 0.0,
+        'cpu_util': cpu / elapsed / (os.cpu_count() or 1) if elapsed else 0.0,
+        # ru_maxrss у Linux - кілобайти
+        'peak_rss_mb': max(self_after.ru_maxrss,
+                           children_after.ru_maxrss) / 1024,
+        'bytes': written,
+    }
+
+
+def _ffmpeg_version() -> str:
+    """Версія FFmpeg з першого рядка ffmpeg -version"""
+    result = subprocess.run(['ffmpeg', '-version'], capture_output=True,
+                            text=True)
+    if not result.stdout:
+        return "unknown"
+    return result.stdout.splitlines()[0].split(" Copyright")[0]
+
+
+def benchmark_suite(modes: Optional[List[str]] = None,
+                    sources_dir: Path = Path("bench_sources"),
+                    results_dir: Path = Path("bench_results"),
+                    clip_duration: int = 10,
+                    config_file: str = "tiktok_config.json") -> Dict:
+    """
+    Прогнати режими нарізання на синтетичних епізодах
+
+    Кожен випадок (джерело x режим) виконується в окремому процесі.
+    Результат зберігається в results_dir як JSON з часовою міткою.
+
+    Returns:
+        Звіт: машина, версія FFmpeg та список результатів
+    """
+    modes = modes or list(VideoProcessor.CUT_MODES)
+    sources = []
+    for spec in SYNTHETIC_SOURCES:
+        logger.info(f"🧪 Джерело {spec['name']}...")
+        sources.append(generate_source(spec, sources_dir))
+
+    results = []
+    for source in sources:
+        for mode in modes:
+            logger.info(f"⏱️  {source.stem}: режим {mode}")
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                results.append(pool.submit(
+                    _run_case, str(source), mode, clip_duration, config_file
+                ).result())
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'machine': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'ffmpeg': _ffmpeg_version(),
+        'clip_duration': clip_duration,
+        'results': results,
+    }
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    output = results_dir / f"suite_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    logger.info(f"💾 Результати збережено: {output}")
+    return report
+
+
+def load_previous_suite(results_dir: Path = Path("bench_results"),
+                        skip: int = 1) -> Optional[Dict]:
+    """
+    Попередній збережений звіт для порівняння
+
+    skip - скільки найновіших звітів пропустити (1 - щойно збережений)
+    """
+    reports = sorted(Path(results_dir).glob("suite_*.json"), reverse=True)
+    if len(reports) <= skip:
+        return None
+    return json.loads(reports[skip].read_text())
+
+
+def print_suite_report(report: Dict, baseline: Optional[Dict] = None):
+    """Вивести таблицю результатів (зі зміною швидкості проти baseline)"""
+    previous = {}
+    if baseline:
+        previous = {(row['source'], row['mode']): row
+                    for row in baseline['results']}
+
+    print(f"{report['ffmpeg']} | {report['cpu_count']} CPU")
+    print(f"{'Джерело':<40} {'Режим':<8} {'Кліп/с':>7} {'FPS':>7} "
+          f"{'CPU':>5} {'RSS, МБ':>8} {'МБ':>7} {'Зміна':>7}")
+    print("-" * 96)
+    for row in report['results']:
+        old = previous.get((row['source'], row['mode']))
+        change = "-"
+        if old and old['encode_fps']:
+            change = f"{(row['encode_fps'] / old['encode_fps'] - 1) * 100:+.0f}%"
+        print(f"{row['source']:<40} {row['mode']:<8} "
+              f"{row['clips_per_sec']:>7.2f} {row['encode_fps']:>7.1f} "
+              f"{row['cpu_util'] * 100:>4.0f}% {row['peak_rss_mb']:>8.0f} "
+              f"{row['bytes'] / 1024 / 1024:>7.1f} {change:>7}")
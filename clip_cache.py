@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Обмежений за розміром кеш готових кліпів
+"""
+
+import os
+import time
+import logging
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from media_catalog import MediaCatalog
+
+logger = logging.getLogger(__name__)
+
+
+class ClipCache:
+    """
+    Папка з кліпами, розмір якої не перевищує заданий ліміт
+
+    Першими витісняються вже опубліковані кліпи (за каталогом), далі -
+    найдавніше використані. Часом використання є час доступу до файлу,
+    який оновлюється через touch().
+    """
+
+    def __init__(self, directory: Path, max_bytes: int,
+                 catalog: Optional[MediaCatalog] = None):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.catalog = catalog
+
+    def touch(self, path: Path):
+        """Позначити кліп як щойно використаний (час зміни не чіпається)"""
+        try:
+            stat = path.stat()
+            # Час зміни входить у ключ кешу FFprobe, тому лише atime
+            os.utime(path, (time.time(), stat.st_mtime))
+        except OSError:
+            pass
+
+    def usage(self) -> int:
+        """Поточний розмір кліпів у папці (байти)"""
+        return sum(path.stat().st_size for path in self.directory.glob("*.mp4"))
+
+    def evict(self, protected: Iterable[Path] = ()) -> List[Path]:
+        """
+        Видалити кліпи понад ліміт
+
+        Args:
+            protected: Кліпи, які не можна видаляти (наприклад, файли
+                черги, які неможливо відтворити повторно)
+
+        Returns:
+            Список видалених файлів
+        """
+        if not self.max_bytes:
+            return []
+
+        protected = {Path(path) for path in protected}
+        uploaded = self.catalog.uploaded_clips() if self.catalog else set()
+
+        files = []
+        total = 0
+        for path in self.directory.glob("*.mp4"):
+            stat = path.stat()
+            total += stat.st_size
+            if path not in protected:
+                files.append((str(path) not in uploaded, stat.st_atime,
+                              stat.st_size, path))
+
+        removed = []
+        # Спершу опубліковані (False < True), серед них - найдавніші
+        for _, _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning(f"Не вдалося видалити {path.name}: {e}")
+                continue
+            total -= size
+            removed.append(path)
+            # Проксі (й обкладинки старіших версій) без кліпа не потрібні
+            for sidecar in (path.with_suffix('.jpg'),
+                            self.directory / "proxy" / path.name):
+                try:
+                    sidecar.unlink()
+                except OSError:
+                    pass
+
+        if removed:
+            logger.info(
+                f"🧹 Кеш кліпів: видалено {len(removed)} файлів, "
+                f"зайнято {total / 1024 / 1024:.0f} з "
+                f"{self.max_bytes / 1024 / 1024:.0f} МБ"
+            )
+        return removed
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Перевірка цілісності готових кліпів
+"""
+
+import json
+import subprocess
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from media_cache import ProbeService, get_probe_service
+
+logger = logging.getLogger(__name__)
+
+
+class ClipVerifier:
+    """
+    Перевірка контейнера, тривалості, роздільності та потоків кліпа
+
+    FFprobe лише демультиплексує файл і рахує пакети (-count_packets),
+    кадри не декодуються. Обрізаний файл без moov не читається зовсім,
+    а з moov на початку - має менше пакетів, ніж заявляє контейнер.
+    Результат аналізу кешується за (шлях, розмір, час зміни).
+    """
+
+    # Допустима розбіжність тривалості (секунди)
+    DURATION_TOLERANCE = 0.5
+
+    def __init__(self, probe_service: Optional[ProbeService] = None,
+                 width: int = 1080, height: int = 1920):
+        self.probe_service = probe_service or get_probe_service()
+        self.width = width
+        self.height = height
+
+    def inspect(self, path: Path) -> Dict:
+        """
+        Прочитати заголовки та пакети файлу (з кешем)
+
+        Returns:
+            {'duration', 'streams': [{codec_type, width, height, rate,
+            packets}], 'errors': остання помилка FFprobe}
+        """
+        cached = self.probe_service.cache.get(path, 'packets')
+        if cached is not None:
+            return cached
+
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-count_packets',
+             '-show_entries',
+             'stream=codec_type,width,height,avg_frame_rate,nb_read_packets'
+             ':format=duration',
+             '-of', 'json', str(path)],
+            capture_output=True, text=True, errors='replace'
+        )
+        errors = result.stderr.strip().splitlines()
+        info = {'duration': None, 'streams': [],
+                'errors': errors[-1][-300:] if errors else ''}
+        if result.returncode == 0:
+            data = json.loads(result.stdout or '{}')
+            duration = data.get('format', {}).get('duration')
+            info['duration'] = float(duration) if duration else None
+            for stream in data.get('streams', []):
+                num, _, den = stream.get('avg_frame_rate', '0/0').partition('/')
+                info['streams'].append({
+                    'codec_type': stream.get('codec_type'),
+                    'width': stream.get('width'),
+                    'height': stream.get('height'),
+                    'rate': float(num) / float(den) if float(den or 0) else 0.0,
+                    'packets': int(stream.get('nb_read_packets', 0)),
+                })
+
+        self.probe_service.cache.put(path, 'packets', info)
+        return info
+
+    def verify(self, path: Path, duration: Optional[float] = None,
+               audio: Optional[bool] = None) -> List[str]:
+        """
+        Перевірити кліп
+
+        Args:
+            path: Шлях до кліпа
+            duration: Очікувана тривалість (None - не перевіряти)
+            audio: Чи має бути аудіо (None - перевіряти лише наявне)
+
+        Returns:
+            Список проблем (порожній, якщо кліп цілий)
+        """
+        try:
+            info = self.inspect(path)
+        except (OSError, ValueError) as e:
+            return [f"не вдалося прочитати: {e}"]
+
+        if info['duration'] is None:
+            return [f"пошкоджений контейнер: {info['errors'] or 'немає тривалості'}"]
+
+        problems = []
+        video = next((s for s in info['streams']
+                      if s['codec_type'] == 'video'), None)
+        if video is None:
+            problems.append("немає відеопотоку")
+        else:
+            if (video['width'], video['height']) != (self.width, self.height):
+                problems.append(f"роздільність {video['width']}x{video['height']}")
+            # Кількість пакетів відео має покривати заявлену тривалість
+            if video['rate']:
+                covered = video['packets'] / video['rate']
+                if covered < info['duration'] - self.DURATION_TOLERANCE:
+                    problems.append(f"обрізаний: кадри на {covered:.1f}с з "
+                                    f"{info['duration']:.1f}с")
+
+        audio_stream = next((s for s in info['streams']
+                             if s['codec_type'] == 'audio'), None)
+        if audio and audio_stream is None:
+            problems.append("немає аудіопотоку")
+        elif audio_stream is not None and not audio_stream['packets']:
+            problems.append("порожній аудіопотік")
+
+        if duration is not None and \
+                abs(info['duration'] - duration) > self.DURATION_TOLERANCE:
+            problems.append(f"тривалість {info['duration']:.1f}с "
+                            f"замість {duration:.1f}с")
+        return problems
+
+    def verify_many(self, paths: Iterable[Path],
+                    workers: int = 8) -> Dict[Path, List[str]]:
+        """Паралельно перевірити багато кліпів"""
+        paths = list(paths)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(self.verify, paths))
+        return dict(zip(paths, results))
+
+    def sweep(self, directory: Path, workers: int = 8) -> Dict[Path, List[str]]:
+        """
+        Перевірити всі кліпи папки
+
+        Returns:
+            Словник пошкоджений кліп -> список проблем
+        """
+        clips = sorted(Path(directory).glob("*.mp4"))
+        results = self.verify_many(clips, workers)
+        broken = {path: problems for path, problems in results.items() if problems}
+        logger.info(f"🔎 Перевірено {len(clips)} кліпів, "
+                    f"пошкоджених: {len(broken)}")
+        for path, problems in broken.items():
+            logger.warning(f"❌ {path.name}: {'; '.join(problems)}")
+        return broken
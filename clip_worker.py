@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Робочий процес розподіленого нарізання кліпів
+"""
+
+import os
+import socket
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ClipWorker:
+    """
+    Забирає кліпи з черги журналу задач і рендерить їх по одному
+
+    Скільки завгодно процесів однієї машини працюють з однією локальною
+    базою (media_catalog.db); база в режимі WAL, тож ділити її між
+    машинами через NFS чи SMB не можна.
+    Поки FFmpeg кодує кліп, оренда задачі подовжується кожну третину
+    строку; якщо задачу тим часом забрав інший процес, кодування
+    зупиняється. Задачі зупиненого процесу повертаються в чергу, щойно
+    мине їхня оренда.
+    """
+
+    # Строк оренди задачі (секунди)
+    LEASE = 60.0
+    # Пауза між перевірками черги, коли задач немає
+    POLL_INTERVAL = 5.0
+
+    def __init__(self, processor, name: Optional[str] = None,
+                 lease: float = LEASE):
+        """
+        Args:
+            processor: VideoProcessor з каталогом (журнал - у тій самій базі)
+            name: Ім'я процесу в журналі (за замовчуванням хост:pid)
+            lease: Строк оренди задачі в секундах
+        """
+        if processor.journal is None:
+            raise ValueError("Розподілене нарізання потребує каталогу")
+        self.processor = processor
+        self.journal = processor.journal
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease = lease
+
+    async def run(self, wait: bool = False) -> int:
+        """
+        Обробляти задачі черги
+
+        Args:
+            wait: Чекати на нові задачі замість завершення, коли черга
+                спорожніла
+
+        Returns:
+            Кількість відрендерених кліпів
+        """
+        rendered = 0
+        while True:
+            job = self.journal.claim(self.name, self.lease)
+            if job is None:
+                # Задачі інших процесів можуть повернутися в чергу
+                if not wait and not self.journal.active():
+                    break
+                await asyncio.sleep(self.POLL_INTERVAL)
+                continue
+            if await self._process(job):
+                rendered += 1
+        logger.info(f"👷 {self.name}: черга порожня, відрендерено "
+                    f"{rendered} кліпів")
+        return rendered
+
+    async def _process(self, job: Dict) -> bool:
+        """Відрендерити кліп задачі, подовжуючи оренду"""
+        source = Path(job['source_path'])
+        index = job['clip_index']
+        entry = {
+            'source': job['source_path'],
+            'index': index,
+            'start': job['start_time'],
+            'duration': job['length'],
+            'clip_duration': job['clip_duration'],
+            'settings': job['settings'],
+        }
+        task = asyncio.create_task(self.processor.render_clip_async(entry))
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=self.lease / 3)
+            if done:
+                break
+            if not self.journal.heartbeat(self.name, source, index, self.lease):
+                logger.warning(f"Оренду кліпа {index} {source.name} втрачено, "
+                               f"кодування зупинено")
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                return False
+
+        clip = task.result()
+        if clip is None:
+            self.journal.release(self.name, source, index,
+                                 "рендеринг не вдався")
+            return False
+        # Кліп міг існувати ще до задачі (тоді FFmpeg не запускався)
+        self.journal.finish(source, index)
+        return True
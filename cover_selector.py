@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Вибір кадру обкладинки кліпа
+"""
+
+import re
+import subprocess
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from media_cache import ProbeService, get_probe_service
+
+logger = logging.getLogger(__name__)
+
+# Рядок showinfo з часом кадру на виході ланцюжка фільтрів
+SHOWINFO_PATTERN = re.compile(r"\bn:\s*\d+\s+pts:\s*-?\d+\s+pts_time:\s*(-?[\d.]+)")
+
+
+def read_gray_frames(input_args: List[str], filters: str, width: int,
+                     height: int, output_args: List[str] = ()) -> Tuple:
+    """
+    Декодувати сірі кадри width x height разом з їхнім часом
+
+    Час береться з pts кожного кадру (фільтр showinfo в кінці ланцюжка
+    filters), а не з окремого списку, тож кадр і його час не розходяться,
+    навіть якщо FFmpeg відкинув або додав кадри.
+
+    Args:
+        input_args: Параметри входу разом з -i
+        filters: Ланцюжок фільтрів до кадру width x height у format=gray
+        output_args: Додаткові параметри виходу
+
+    Returns:
+        (час кадрів у секундах, масив кадрів n x висота x ширина)
+    """
+    import numpy as np
+
+    result = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-nostats', '-v', 'info', *input_args,
+         '-vf', f"{filters},showinfo", *output_args,
+         '-an', '-sn', '-f', 'rawvideo', '-pix_fmt', 'gray', '-'],
+        capture_output=True, check=True
+    )
+    stderr = result.stderr.decode('utf-8', errors='replace')
+    times = np.array([float(t) for t in SHOWINFO_PATTERN.findall(stderr)],
+                     dtype=np.float64)
+    frame_size = width * height
+    if len(result.stdout) != len(times) * frame_size:
+        raise ValueError(f"FFmpeg видав {len(result.stdout) / frame_size:g} "
+                         f"кадрів, а showinfo - {len(times)}")
+    frames = np.frombuffer(result.stdout, dtype=np.uint8)
+    return times, frames.reshape(len(times), height, width)
+
+
+class CoverSelector:
+    """
+    Оцінка кадрів-кандидатів кліпа та вибір найкращої обкладинки
+
+    Кандидатами є ключові кадри: FFmpeg декодує лише їх (-skip_frame
+    nokey) і одразу зменшує до сірих мініатюр, які читаються одним
+    масивом NumPy. Якщо ключових кадрів замало, кадри вибираються
+    рівномірно з повного декодування.
+    """
+
+    # Розмір мініатюри (9:16) для оцінки
+    THUMB_WIDTH = 72
+    THUMB_HEIGHT = 128
+
+    # Мінімум кандидатів для режиму лише ключових кадрів
+    MIN_CANDIDATES = 8
+
+    # Кадри, темніші або світліші за ці межі, вважаються порожніми
+    BLACK_LEVEL = 24
+    WHITE_LEVEL = 232
+    # Мінімальний контраст (std яскравості): нижче - затемнення/пустий кадр
+    MIN_CONTRAST = 12.0
+
+    # Обкладинка за замовчуванням (як було в API)
+    DEFAULT_TIMESTAMP_MS = 1000
+
+    def __init__(self, probe_service: Optional[ProbeService] = None,
+                 samples: int = 24):
+        self.probe_service = probe_service or get_probe_service()
+        self.samples = samples
+
+    def _read_frames(self, path: Path, duration: float) -> Tuple:
+        """
+        Прочитати мініатюри кадрів-кандидатів одним запуском FFmpeg
+
+        З ключових кадрів лишається не більше samples, рівномірно розподілених.
+
+        Returns:
+            (час кадрів у секундах, масив кадрів n x висота x ширина)
+        """
+        import numpy as np
+
+        keyframes = self.probe_service.keyframes(path)
+        scale = (f"scale={self.THUMB_WIDTH}:{self.THUMB_HEIGHT}:flags=area,"
+                 f"format=gray")
+        if len(keyframes) >= self.MIN_CANDIDATES:
+            times, frames = read_gray_frames(
+                ['-skip_frame', 'nokey', '-i', str(path)], scale,
+                self.THUMB_WIDTH, self.THUMB_HEIGHT, ['-fps_mode', 'passthrough']
+            )
+        else:
+            rate = self.samples / duration
+            times, frames = read_gray_frames(
+                ['-i', str(path)],
+                f"fps={rate:.6f},{scale}",
+                self.THUMB_WIDTH, self.THUMB_HEIGHT
+            )
+        if len(times) > self.samples:
+            picks = np.unique(np.linspace(0, len(times) - 1, self.samples).round()
+                              .astype(int))
+            times, frames = times[picks], frames[picks]
+        return times, frames
+
+    def score(self, frames):
+        """
+        Оцінити кадри (векторно, для всіх кадрів одразу)
+
+        Оцінка - різкість (дисперсія лапласіана), зважена на експозицію.
+        Чорні, пересвічені та малоконтрастні кадри (затемнення) отримують 0.
+
+        Returns:
+            Масив оцінок довжини n
+        """
+        import numpy as np
+
+        f = frames.astype(np.float32)
+        brightness = f.mean(axis=(1, 2))
+        contrast = f.std(axis=(1, 2))
+
+        laplacian = (4 * f[:, 1:-1, 1:-1] - f[:, :-2, 1:-1] - f[:, 2:, 1:-1]
+                     - f[:, 1:-1, :-2] - f[:, 1:-1, 2:])
+        sharpness = laplacian.var(axis=(1, 2))
+
+        exposure = 1.0 - np.abs(brightness - 128.0) / 128.0
+        valid = ((brightness > self.BLACK_LEVEL) & (brightness < self.WHITE_LEVEL)
+                 & (contrast > self.MIN_CONTRAST))
+        return np.where(valid, sharpness * exposure, 0.0)
+
+    def select(self, path: Path) -> int:
+        """
+        Час найкращого кадру обкладинки (з кешем)
+
+        Returns:
+            Час у мілісекундах для video_cover_timestamp_ms
+        """
+        cached = self.probe_service.cache.get(path, 'cover')
+        if cached is not None:
+            return cached
+
+        timestamp_ms = self.DEFAULT_TIMESTAMP_MS
+        try:
+            duration = ProbeService.duration(self.probe_service.probe(path))
+            if duration:
+                times, frames = self._read_frames(path, duration)
+                if len(times):
+                    scores = self.score(frames)
+                    if scores.max() > 0:
+                        timestamp_ms = int(times[scores.argmax()] * 1000)
+                # Час має бути всередині відео
+                timestamp_ms = max(0, min(timestamp_ms, int(duration * 1000) - 1))
+        except Exception as e:
+            logger.warning(f"Не вдалося вибрати обкладинку {path.name}: {e}")
+            return timestamp_ms
+
+        self.probe_service.cache.put(path, 'cover', timestamp_ms)
+        return timestamp_ms
+
+    def select_many(self, paths: Iterable[Path],
+                    workers: int = 8) -> Dict[Path, int]:
+        """Паралельно вибрати обкладинки для багатьох кліпів"""
+        paths = list(paths)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(self.select, paths))
+        return dict(zip(paths, results))
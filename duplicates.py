@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Пошук майже однакових кліпів за перцептивними хешами кадрів
+"""
+
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from cover_selector import read_gray_frames
+
+logger = logging.getLogger(__name__)
+
+# Мініатюра для хешу та розмір низькочастотного блоку DCT (64 біти)
+HASH_SIZE = 32
+DCT_SIZE = 8
+# Кадрів у підписі кліпа
+FRAMES_PER_CLIP = 5
+# Рідкісні ключові кадри: тоді кадри вибираються з повного декодування
+SAMPLE_INTERVAL = 2.0
+# Однотонні кадри (затемнення, титри на чорному) однакові в усіх кліпах
+MIN_CONTRAST = 8.0
+
+
+def _popcount_table():
+    """Кількість одиничних бітів для кожного байта"""
+    import numpy as np
+    return np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _dct_matrix():
+    """Рядки DCT-II для низьких частот (DCT_SIZE x HASH_SIZE)"""
+    import numpy as np
+    n = np.arange(HASH_SIZE)
+    k = np.arange(DCT_SIZE)[:, None]
+    return np.cos(np.pi * (2 * n + 1) * k / (2 * HASH_SIZE))
+
+
+def dct_hashes(frames):
+    """
+    Перцептивні хеші кадрів (векторно, для всіх кадрів одразу)
+
+    Біт дорівнює 1, якщо коефіцієнт низькочастотного блоку DCT більший
+    за медіану блоку. Хеш стійкий до масштабу, стиснення та яскравості.
+
+    Returns:
+        Масив uint64 довжини n
+    """
+    import numpy as np
+
+    dct = _dct_matrix()
+    f = frames.astype(np.float32)
+    coeffs = np.einsum('kn,fnm,jm->fkj', dct, f, dct).reshape(len(f), -1)
+    # Постійна складова (яскравість) не впливає на поріг
+    median = np.median(coeffs[:, 1:], axis=1, keepdims=True)
+    bits = np.packbits(coeffs > median, axis=1)
+    return bits.view('>u8').ravel().astype(np.uint64)
+
+
+def source_frame_hashes(path: Path, keyframes: List[float],
+                        duration: float) -> List[List]:
+    """
+    Хеші кадрів усього джерела за один прохід FFmpeg
+
+    Декодуються лише ключові кадри (-skip_frame nokey), одразу зменшені
+    до сірих мініатюр. Якщо ключові кадри рідші за SAMPLE_INTERVAL,
+    кадри беруться рівномірно з повного декодування. Час кадру - його
+    pts (cover_selector.read_gray_frames).
+
+    Returns:
+        Список [час, хеш] інформативних кадрів
+    """
+    scale = f"scale={HASH_SIZE}:{HASH_SIZE}:flags=area,format=gray"
+    if keyframes and len(keyframes) >= duration / SAMPLE_INTERVAL / 2:
+        times, frames = read_gray_frames(
+            ['-skip_frame', 'nokey', '-i', str(path)], scale,
+            HASH_SIZE, HASH_SIZE, ['-fps_mode', 'passthrough']
+        )
+    else:
+        times, frames = read_gray_frames(
+            ['-i', str(path)], f"fps={1 / SAMPLE_INTERVAL},{scale}",
+            HASH_SIZE, HASH_SIZE
+        )
+    if not len(times):
+        return []
+
+    informative = frames.std(axis=(1, 2)) > MIN_CONTRAST
+    if not informative.any():
+        return []
+    hashes = dct_hashes(frames[informative])
+    return [[round(float(t), 3), int(h)]
+            for t, h in zip(times[informative], hashes)]
+
+
+def clip_signature(frame_hashes: List[List], start: float,
+                   length: float) -> Optional[List[int]]:
+    """
+    Підпис відрізка: FRAMES_PER_CLIP хешів, рівномірно вибраних з кадрів
+    джерела в його межах
+
+    Returns:
+        Список хешів або None, якщо інформативних кадрів немає
+    """
+    import numpy as np
+
+    inside = [h for t, h in frame_hashes if start <= t < start + length]
+    if not inside:
+        return None
+    picks = np.linspace(0, len(inside) - 1, FRAMES_PER_CLIP).round().astype(int)
+    return [inside[i] for i in picks]
+
+
+class DuplicateIndex:
+    """
+    Індекс підписів кліпів з векторним пошуком за відстанню Геммінга
+
+    Підписи зберігаються в SQLite (одна база з каталогом) і тримаються
+    в пам'яті однією матрицею n x FRAMES_PER_CLIP. Кліп вважається
+    дублікатом, якщо для більшості його кадрів знайдено кадр кандидата
+    на відстані не більше max_distance бітів. Порядок кадрів не важливий,
+    тож збіг знаходиться і при зсуві відрізка (рекапи, повтори).
+
+    Матриця росте геометрично, тож додавання підписів по одному лінійне
+    за сумарним розміром. Видалений підпис лишається в базі порожнім
+    записом з новим rowid: так видалення бачать і інші процеси.
+    """
+
+    # Частка кадрів підпису, що мають збігтися
+    MATCH_RATIO = 0.8
+    # Початкова місткість матриці в пам'яті
+    INITIAL_CAPACITY = 64
+
+    def __init__(self, db_file: str = "media_catalog.db", max_distance: int = 10):
+        import numpy as np
+
+        self.max_distance = max_distance
+        self.conn = sqlite3.connect(db_file, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS clip_hashes (
+                    source_path TEXT NOT NULL,
+                    clip_index INTEGER NOT NULL,
+                    hashes BLOB NOT NULL,
+                    start_time REAL,
+                    length REAL,
+                    PRIMARY KEY (source_path, clip_index)
+                )
+            """)
+            # Відрізок джерела; у старіших базах невідомий (NULL)
+            columns = {row[1] for row in
+                       self.conn.execute("PRAGMA table_info(clip_hashes)")}
+            for column in ('start_time', 'length'):
+                if column not in columns:
+                    self.conn.execute(
+                        f"ALTER TABLE clip_hashes ADD COLUMN {column} REAL"
+                    )
+        self._popcount = _popcount_table()
+        self._keys: List[Tuple[str, int]] = []
+        self._positions: Dict[Tuple[str, int], int] = {}
+        self._matrix = np.zeros((self.INITIAL_CAPACITY, FRAMES_PER_CLIP),
+                                dtype=np.uint64)
+        self._active = np.zeros(self.INITIAL_CAPACITY, dtype=bool)
+        self._count = 0
+        self._last_rowid = 0
+
+    def close(self):
+        """Закрити з'єднання з базою"""
+        self.conn.close()
+
+    def _reserve(self, size: int):
+        """Розширити матрицю (з запасом удвічі) до size рядків"""
+        import numpy as np
+
+        capacity = len(self._matrix)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        matrix = np.zeros((capacity, FRAMES_PER_CLIP), dtype=np.uint64)
+        matrix[:self._count] = self._matrix[:self._count]
+        active = np.zeros(capacity, dtype=bool)
+        active[:self._count] = self._active[:self._count]
+        self._matrix, self._active = matrix, active
+
+    def _refresh(self):
+        """Дочитати підписи, додані після останнього читання (й іншими процесами)"""
+        import numpy as np
+
+        rows = self.conn.execute(
+            "SELECT rowid, source_path, clip_index, hashes FROM clip_hashes "
+            "WHERE rowid > ? ORDER BY rowid", (self._last_rowid,)
+        ).fetchall()
+        if not rows:
+            return
+        self._reserve(self._count + len(rows))
+        for rowid, source, index, blob in rows:
+            self._last_rowid = max(self._last_rowid, rowid)
+            key = (source, index)
+            position = self._positions.get(key)
+            if not blob:
+                # Підпис видалено
+                if position is not None:
+                    self._active[position] = False
+                continue
+            if position is None:
+                position = self._positions[key] = self._count
+                self._keys.append(key)
+                self._count += 1
+            self._matrix[position] = np.frombuffer(blob, dtype=np.uint64)
+            self._active[position] = True
+
+    def __len__(self) -> int:
+        self._refresh()
+        return int(self._active[:self._count].sum())
+
+    def find(self, signature: List[int], exclude: Optional[Tuple[Path, int]] = None
+             ) -> Optional[Tuple[str, int, float]]:
+        """
+        Найближчий кліп-дублікат
+
+        Args:
+            signature: Підпис кліпа (clip_signature)
+            exclude: (джерело, номер) самого кліпа
+
+        Returns:
+            (джерело, номер, середня відстань у бітах) або None
+        """
+        import numpy as np
+
+        self._refresh()
+        if not self._count:
+            return None
+
+        query = np.array(signature, dtype=np.uint64)
+        # n x кадри індексу x кадри запиту
+        xor = self._matrix[:self._count, :, None] ^ query[None, None, :]
+        distances = self._popcount[xor.view(np.uint8)].reshape(
+            *xor.shape, 8
+        ).sum(axis=3, dtype=np.uint16)
+        nearest = distances.min(axis=1)
+        matched = (nearest <= self.max_distance).mean(axis=1)
+        matched[~self._active[:self._count]] = 0.0
+        score = nearest.mean(axis=1)
+        if exclude is not None:
+            position = self._positions.get((str(exclude[0]), exclude[1]))
+            if position is not None:
+                matched[position] = 0.0
+
+        best = int(np.lexsort((score, -matched))[0])
+        if matched[best] < self.MATCH_RATIO:
+            return None
+        source, index = self._keys[best]
+        return source, index, float(score[best])
+
+    def add(self, source: Path, index: int, signature: List[int],
+            span: Optional[Tuple[float, float]] = None):
+        """Додати або оновити підпис кліпа (span - його відрізок джерела)"""
+        import numpy as np
+
+        blob = np.array(signature, dtype=np.uint64).tobytes()
+        start, length = span if span is not None else (None, None)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO clip_hashes "
+                "(source_path, clip_index, hashes, start_time, length) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (str(source), index, blob, start, length)
+            )
+
+    def retain(self, source: Path, plan: Dict[int, Tuple[float, float]]) -> int:
+        """
+        Видалити підписи джерела, яких немає в його поточному плані
+
+        Після зміни плану (нова заставка, інша тривалість кліпа) старий
+        підпис під тим самим або іншим номером покриває інший відрізок,
+        і новий кліп визнавався б дублікатом самого себе. Записи без
+        відрізка (старі бази) лишаються, якщо номер є в плані.
+
+        Returns:
+            Кількість видалених підписів
+        """
+        rows = self.conn.execute(
+            "SELECT clip_index, start_time, length FROM clip_hashes "
+            "WHERE source_path = ? AND length(hashes) > 0", (str(source),)
+        ).fetchall()
+        stale = []
+        for index, start, length in rows:
+            span = plan.get(index)
+            if span is None:
+                stale.append(index)
+            elif start is not None and (
+                    abs(start - span[0]) > 1e-3 or abs(length - span[1]) > 1e-3):
+                stale.append(index)
+        if stale:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO clip_hashes "
+                    "(source_path, clip_index, hashes) VALUES (?, ?, X'')",
+                    [(str(source), index) for index in stale]
+                )
+        return len(stale)
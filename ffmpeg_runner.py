@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Неблокуючий запуск FFmpeg в asyncio з потоковим прогресом
+"""
+
+import time
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[Dict], None]
+
+
+def compile_command(stream) -> List[str]:
+    """
+    Зібрати аргументи командного рядка з графа ffmpeg-python
+
+    До команди додається -progress pipe:1, щоб FFmpeg писав стан
+    кодування у stdout у форматі key=value.
+    """
+    import ffmpeg
+
+    args = ffmpeg.compile(stream)
+    return [args[0], '-nostats', '-loglevel', 'error',
+            '-progress', 'pipe:1'] + args[1:]
+
+
+def _parse_time(value: str) -> Optional[float]:
+    """Перетворити out_time (HH:MM:SS.micro) у секунди"""
+    try:
+        hours, minutes, seconds = value.split(':')
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except ValueError:
+        return None
+
+
+def _progress_event(block: Dict[str, str], duration: Optional[float],
+                    label: str) -> Dict:
+    """Перетворити блок -progress у подію прогресу"""
+    out_time = _parse_time(block.get('out_time', ''))
+    if out_time is not None and out_time < 0:
+        # До першого закодованого кадру FFmpeg звітує некоректний час
+        out_time = None
+    try:
+        fps = float(block.get('fps', 0))
+    except ValueError:
+        fps = 0.0
+    try:
+        speed = float(block.get('speed', '0x').rstrip('x') or 0)
+    except ValueError:
+        speed = 0.0
+
+    percent = None
+    eta = None
+    if duration and out_time is not None:
+        percent = min(100.0, out_time / duration * 100)
+        if speed > 0:
+            eta = max(0.0, (duration - out_time) / speed)
+
+    return {
+        'label': label,
+        'out_time': out_time,
+        'fps': fps,
+        'speed': speed,
+        'percent': percent,
+        'eta': eta,
+        'done': block.get('progress') == 'end',
+    }
+
+
+async def _read_line(stream, timeout: Optional[float]) -> Optional[bytes]:
+    """Рядок stdout або None, якщо за timeout секунд нічого не прийшло"""
+    if timeout is None:
+        return await stream.readline()
+    try:
+        return await asyncio.wait_for(stream.readline(), max(timeout, 0.01))
+    except asyncio.TimeoutError:
+        return None
+
+
+async def run_ffmpeg_async(stream, duration: Optional[float] = None,
+                           on_progress: Optional[ProgressCallback] = None,
+                           label: str = "",
+                           stall_timeout: Optional[float] = None) -> None:
+    """
+    Виконати граф ffmpeg-python як asyncio-підпроцес
+
+    Args:
+        stream: Вихідний потік ffmpeg-python (після .output())
+        duration: Очікувана тривалість результату для відсотків та ETA
+        on_progress: Функція, яка отримує події прогресу
+        label: Назва задачі у подіях прогресу
+        stall_timeout: Зупинити FFmpeg, якщо стільки секунд не росте ні
+            час, ні розмір результату (зависле читання джерела, NFS);
+            None - чекати без обмежень
+
+    Raises:
+        ffmpeg.Error: якщо FFmpeg завершився з помилкою або завис
+            (тоді атрибут stalled - секунди без прогресу до зупинки)
+        asyncio.CancelledError: задачу скасовано, процес FFmpeg зупинено
+    """
+    import ffmpeg
+
+    args = compile_command(stream)
+    started = time.monotonic()
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    # stderr читається паралельно, щоб FFmpeg не заблокувався на повному буфері
+    stderr_task = asyncio.ensure_future(process.stderr.read())
+
+    stalled = False
+    try:
+        block = {}
+        # Звіти -progress ідуть і тоді, коли кодування стоїть, тож
+        # прогресом вважається лише зміна часу чи розміру результату
+        position = None
+        last_progress = started
+        while True:
+            timeout = None
+            if stall_timeout is not None:
+                timeout = stall_timeout - (time.monotonic() - last_progress)
+            raw_line = await _read_line(process.stdout, timeout)
+            if raw_line is None or (
+                    stall_timeout is not None
+                    and time.monotonic() - last_progress > stall_timeout):
+                stalled = True
+                break
+            if not raw_line:
+                break
+            key, _, value = raw_line.decode(errors='replace').strip().partition('=')
+            if not key:
+                continue
+            block[key] = value
+            # Ключ progress завершує кожен блок звіту
+            if key == 'progress':
+                current = (block.get('out_time_us'), block.get('total_size'))
+                if current != position:
+                    position = current
+                    last_progress = time.monotonic()
+                if on_progress:
+                    on_progress(_progress_event(block, duration, label))
+                block = {}
+
+        if stalled:
+            process.kill()
+            await process.wait()
+            stderr_task.cancel()
+            lost = time.monotonic() - last_progress
+            logger.warning(f"FFmpeg завис ({label}): немає прогресу "
+                           f"{stall_timeout:.0f}с, процес зупинено")
+            error = ffmpeg.Error('ffmpeg', b'', (
+                f"FFmpeg завис: немає прогресу {stall_timeout:.0f}с"
+            ).encode())
+            error.stalled = lost
+            raise error
+
+        stderr = await stderr_task
+        returncode = await process.wait()
+    except asyncio.CancelledError:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        stderr_task.cancel()
+        logger.info(f"FFmpeg зупинено: {label}")
+        raise
+
+    if returncode != 0:
+        raise ffmpeg.Error('ffmpeg', b'', stderr)
+
+
+def run_ffmpeg(stream, duration: Optional[float] = None,
+               on_progress: Optional[ProgressCallback] = None,
+               label: str = "", stall_timeout: Optional[float] = None) -> None:
+    """Синхронна обгортка run_ffmpeg_async (для коду поза event loop)"""
+    asyncio.run(run_ffmpeg_async(stream, duration, on_progress, label,
+                                 stall_timeout))
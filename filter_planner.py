@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Планування ланцюжка відеофільтрів кліпа за метаданими джерела
+"""
+
+import logging
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Порядок полів, за яким FFprobe позначає черезрядкове джерело
+INTERLACED_FIELD_ORDERS = ('tt', 'bb', 'tb', 'bt')
+
+
+def parse_rate(rate: Optional[str]) -> float:
+    """Частота кадрів FFprobe ("30000/1001") у кадрах за секунду"""
+    if not rate:
+        return 0.0
+    num, _, den = str(rate).partition('/')
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _parse_sar(sar: Optional[str]) -> float:
+    """Співвідношення сторін пікселя; 0:1 і невідоме - квадратний піксель"""
+    num, _, den = (sar or '1:1').partition(':')
+    try:
+        value = float(num) / float(den)
+    except (ValueError, ZeroDivisionError):
+        return 1.0
+    return value if value > 0 else 1.0
+
+
+def _rotation(video: Dict) -> int:
+    """Кут повороту з метаданих (FFmpeg повертає кадр до фільтрів)"""
+    for side_data in video.get('side_data_list', []):
+        if 'rotation' in side_data:
+            return int(float(side_data['rotation']))
+    try:
+        return int(video.get('tags', {}).get('rotate', 0))
+    except ValueError:
+        return 0
+
+
+def _even(value: float) -> int:
+    """Найближче парне число (розміри кадру yuv420p)"""
+    return max(2, int(round(value / 2)) * 2)
+
+
+def source_geometry(probe: Dict) -> Optional[Dict]:
+    """
+    Розмір, форма пікселя, частота та розгортка першого відеопотоку
+    так, як їх побачать фільтри (після автоповороту)
+
+    Returns:
+        {'width', 'height', 'sar', 'fps', 'constant_rate', 'interlaced'}
+        або None, якщо відеопотоку немає
+    """
+    video = next((s for s in probe.get('streams', [])
+                  if s.get('codec_type') == 'video'), None)
+    if not video or not video.get('width') or not video.get('height'):
+        return None
+    width, height = video['width'], video['height']
+    sar = _parse_sar(video.get('sample_aspect_ratio'))
+    if abs(_rotation(video)) % 180 == 90:
+        width, height, sar = height, width, 1 / sar
+
+    average = parse_rate(video.get('avg_frame_rate'))
+    nominal = parse_rate(video.get('r_frame_rate'))
+    return {
+        'width': width,
+        'height': height,
+        'sar': sar,
+        'fps': average or nominal,
+        # Різні середня й номінальна частоти - змінна частота кадрів
+        'constant_rate': bool(average) and abs(average - nominal) < 0.01,
+        'interlaced': video.get('field_order') in INTERLACED_FIELD_ORDERS,
+    }
+
+
+def legacy_chain(width: int, height: int) -> str:
+    """Універсальний ланцюжок: масштабування всього кадру, потім обрізання"""
+    return (f"scale={width}:{height}:force_original_aspect_ratio=increase,"
+            f"crop={width}:{height}")
+
+
+def _legacy_pixels(geometry: Dict, width: int, height: int) -> float:
+    """Пікселів за кадр, які масштабує універсальний ланцюжок"""
+    factor = max(width / geometry['width'], height / geometry['height'])
+    return (_even(geometry['width'] * factor)
+            * _even(geometry['height'] * factor))
+
+
+def plan_filters(probe: Optional[Dict], width: int, height: int,
+                 fps: Optional[float] = None,
+                 reframe: Optional[Tuple[str, float]] = None) -> Dict:
+    """
+    Найдешевший правильний ланцюжок фільтрів до кадру width x height
+
+    - черезрядкове джерело (field_order) спершу деінтерлейситься, лише
+      кадри з позначкою interlaced; прогресивне - ні;
+    - кадр обрізається до потрібної пропорції у пікселях джерела (з
+      урахуванням форми пікселя й повороту) і лише потім масштабується,
+      тож масштабується вже обрізаний кадр, а не весь;
+    - масштабування пропускається, якщо обрізаний кадр уже потрібного
+      розміру; зменшення - білінійне, збільшення - бікубічне;
+    - частота змінюється, лише якщо джерело не fps (або з змінною
+      частотою): зайві кадри відкидаються до масштабування, бракуючі
+      дублюються після нього.
+
+    Args:
+        probe: Метадані FFprobe (None - універсальний ланцюжок без
+            динамічного кадрування)
+        fps: Частота кліпа (None - не змінювати, напр. для обкладинок)
+        reframe: (файл команд sendcmd, початкове положення) - вікно
+            обрізання рухається за командами (див. reframe.py)
+
+    Returns:
+        {'vf': ланцюжок, 'r': частота для виходу або None,
+         'pixels': пікселів за секунду джерела,
+         'baseline': те саме для універсального ланцюжка}
+    """
+    geometry = source_geometry(probe) if probe else None
+    if geometry is None:
+        return {'vf': legacy_chain(width, height), 'r': fps,
+                'pixels': None, 'baseline': None}
+
+    source_fps = geometry['fps'] or fps or 0.0
+    filters = []
+    pixels = 0.0
+    if geometry['interlaced']:
+        filters.append("yadif=deint=interlaced")
+        pixels += source_fps * geometry['width'] * geometry['height']
+
+    convert = fps is not None and not (
+        geometry['constant_rate'] and abs(source_fps - fps) < 0.01
+    )
+    frames = source_fps
+    if convert and source_fps > fps:
+        filters.append(f"fps={fps}")
+        frames = fps
+
+    # Вікно потрібної пропорції в пікселях джерела
+    target = width / height
+    aspect = geometry['width'] * geometry['sar'] / geometry['height']
+    if aspect > target:
+        crop_w = min(geometry['width'],
+                     _even(geometry['height'] * target / geometry['sar']))
+        crop_h = geometry['height']
+    else:
+        crop_w = geometry['width']
+        crop_h = min(geometry['height'],
+                     _even(geometry['width'] * geometry['sar'] / target))
+    if reframe:
+        commands, position = reframe
+        filters.append(f"sendcmd=f={commands}")
+        filters.append(f"crop@reframe={crop_w}:{crop_h}:"
+                       f"(in_w-out_w)*{position:.3f}")
+    elif (crop_w, crop_h) != (geometry['width'], geometry['height']):
+        filters.append(f"crop={crop_w}:{crop_h}")
+
+    if (crop_w, crop_h) != (width, height):
+        scaler = "bilinear" if crop_w * crop_h > width * height else "bicubic"
+        filters.append(f"scale={width}:{height}:flags={scaler}")
+        pixels += frames * width * height
+    if (crop_w, crop_h) != (width, height) or geometry['sar'] != 1.0:
+        # Після обрізання з урахуванням форми пікселя кадр квадратний
+        filters.append("setsar=1")
+
+    if convert and source_fps <= fps:
+        filters.append(f"fps={fps}")
+
+    return {
+        'vf': ",".join(filters) or "null",
+        'r': None,
+        'pixels': pixels,
+        'baseline': source_fps * _legacy_pixels(geometry, width, height),
+    }
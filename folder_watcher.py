@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Спостереження за папкою серіалів для автоматичної обробки нових епізодів
+"""
+
+import os
+import time
+import asyncio
+import logging
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, Tuple
+
+from media_catalog import MediaCatalog
+
+logger = logging.getLogger(__name__)
+
+
+class FolderWatcher:
+    """
+    Видає відеофайли папки, коли їх копіювання завершено
+
+    Файл вважається готовим, якщо його розмір і час зміни не змінювалися
+    settle_time секунд. Події inotify (пакет inotify_simple, якщо
+    встановлений) лише будять перевірку раніше; без нього папка
+    опитується кожні poll_interval секунд.
+    """
+
+    def __init__(self, root: Path, extensions: Iterable[str],
+                 poll_interval: float = 10.0, settle_time: float = 15.0):
+        self.root = Path(root)
+        self.extensions = tuple(extensions)
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        # Шлях -> (розмір, час зміни, з якого моменту без змін)
+        self._pending: Dict[Path, Tuple[int, float, float]] = {}
+        # Шлях -> (розмір, час зміни) вже виданої версії файлу
+        self._emitted: Dict[Path, Tuple[int, float]] = {}
+        self._inotify = None
+        self._watches = {}
+
+    def _open_inotify(self):
+        """Підписатися на події inotify для папки та підпапок (якщо можливо)"""
+        try:
+            from inotify_simple import INotify, flags
+        except ImportError:
+            logger.info(f"inotify_simple не встановлено, опитування "
+                        f"кожні {self.poll_interval:.0f}с")
+            return
+        try:
+            self._inotify = INotify()
+            self._mask = (flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE
+                          | flags.DELETE_SELF)
+            for dirpath, dirnames, _ in os.walk(self.root):
+                dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+                self._add_watch(Path(dirpath))
+            logger.info(f"👀 Спостереження за {self.root} (inotify)")
+        except OSError as e:
+            logger.warning(f"inotify недоступний ({e}), опитування папки")
+            self._inotify = None
+
+    def _add_watch(self, directory: Path):
+        """Додати підпапку до спостереження inotify"""
+        if directory not in self._watches.values():
+            wd = self._inotify.add_watch(str(directory), self._mask)
+            self._watches[wd] = directory
+
+    def _read_events(self, timeout: float):
+        """Дочекатися подій inotify (блокує, виконується в потоці)"""
+        from inotify_simple import flags
+
+        for event in self._inotify.read(timeout=int(timeout * 1000)):
+            directory = self._watches.get(event.wd)
+            if directory and event.mask & flags.ISDIR and event.name:
+                try:
+                    self._add_watch(directory / event.name)
+                except OSError:
+                    pass
+
+    async def _wait(self):
+        """Чекати змін у папці або наступного опитування"""
+        if self._pending:
+            # Незавершені копіювання перевіряються не рідше settle_time
+            timeout = min(self.poll_interval, self.settle_time)
+        else:
+            timeout = self.poll_interval
+        if self._inotify is not None:
+            await asyncio.to_thread(self._read_events, timeout)
+        else:
+            await asyncio.sleep(timeout)
+
+    def _ready_files(self):
+        """Файли, що не змінювалися settle_time секунд і ще не видані"""
+        now = time.monotonic()
+        ready = []
+        for path in MediaCatalog.scan(self.root, self.extensions):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            version = (stat.st_size, stat.st_mtime)
+            if self._emitted.get(path) == version or not stat.st_size:
+                continue
+
+            pending = self._pending.get(path)
+            if pending is None or pending[:2] != version:
+                self._pending[path] = (*version, now)
+                continue
+            if now - pending[2] >= self.settle_time:
+                del self._pending[path]
+                self._emitted[path] = version
+                ready.append(path)
+        return ready
+
+    async def changes(self) -> AsyncIterator[Path]:
+        """
+        Нескінченно видавати готові відеофайли
+
+        Спершу видаються вже наявні файли (після перевірки стабільності),
+        далі - нові та змінені.
+        """
+        if self._inotify is None:
+            self._open_inotify()
+        try:
+            while True:
+                for path in self._ready_files():
+                    yield path
+                await self._wait()
+        finally:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Пошук спільних заставок серіалу за аудіовідбитками
+"""
+
+import subprocess
+import logging
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Аудіо для відбитків: моно 5.5 кГц, STFT 1024 з кроком 512 (~93 мс)
+SAMPLE_RATE = 5512
+FFT_SIZE = 1024
+HOP = 512
+FRAME_TIME = HOP / SAMPLE_RATE
+
+# Заставка шукається на початку епізоду, титри - в кінці
+HEAD = 360.0
+TAIL = 240.0
+
+# Окіл локального максимуму спектра (кадри, частотні біни)
+PEAK_TIME = 5
+PEAK_FREQ = 10
+# Кожен пік поєднується з наступними FAN_OUT піками не далі MAX_DT кадрів
+FAN_OUT = 5
+MAX_DT = 60
+# Хеші, що трапляються частіше, не розрізняють епізоди (тиша, гул)
+MAX_HASH_REPEATS = 8
+
+# Збіг: щонайменше MIN_MATCHES хешів з однаковим зсувом у часі,
+# діапазон не коротший за MIN_RANGE, розриви всередині не довші за GAP
+MIN_MATCHES = 20
+# Скільки найчастіших зсувів перевіряти
+MAX_OFFSETS = 8
+MIN_RANGE = 10.0
+GAP = 3.0
+
+# Скільки сусідніх епізодів порівнювати з новим
+MAX_REFERENCES = 4
+
+
+def _decode(path: Path, start: float, length: float):
+    """Моно-аудіо відрізка джерела як масив float32"""
+    import numpy as np
+
+    result = subprocess.run(
+        ['ffmpeg', '-v', 'error', '-ss', f"{start:.3f}", '-t', f"{length:.3f}",
+         '-i', str(path), '-vn', '-sn', '-dn', '-ac', '1',
+         '-ar', str(SAMPLE_RATE), '-f', 's16le', '-'],
+        capture_output=True
+    )
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def _sliding_max(values, size: int, axis: int):
+    """Максимум у вікні 2*size+1 уздовж осі (без SciPy)"""
+    import numpy as np
+
+    pad = [(0, 0)] * values.ndim
+    pad[axis] = (size, size)
+    padded = np.pad(values, pad, mode='constant', constant_values=-np.inf)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * size + 1,
+                                                       axis=axis)
+    return windows.max(axis=-1)
+
+
+def fingerprint_samples(samples) -> Dict[str, List[int]]:
+    """
+    Відбиток аудіо: хеші пар спектральних піків (сузір'я)
+
+    Хеш кодує частоти двох піків і відстань між ними в кадрах, тож він
+    не залежить від гучності та положення фрагмента в епізоді.
+
+    Returns:
+        {'hashes': [...], 'frames': [кадр першого піку пари]}
+    """
+    import numpy as np
+
+    if len(samples) < FFT_SIZE:
+        return {'hashes': [], 'frames': []}
+
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FFT_SIZE)[::HOP]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FFT_SIZE), axis=1))
+    spectrum = 20 * np.log10(spectrum + 1e-6)
+
+    local_max = _sliding_max(_sliding_max(spectrum, PEAK_TIME, 0), PEAK_FREQ, 1)
+    threshold = spectrum.mean() + spectrum.std()
+    times, freqs = np.nonzero((spectrum == local_max) & (spectrum > threshold))
+    # nonzero повертає піки впорядковано за часом, потім за частотою
+    hashes = []
+    anchors = []
+    for k in range(1, FAN_OUT + 1):
+        dt = times[k:] - times[:-k]
+        valid = (dt > 0) & (dt <= MAX_DT)
+        hashes.append((freqs[:-k][valid].astype(np.int64) << 20)
+                      | (freqs[k:][valid].astype(np.int64) << 10)
+                      | dt[valid])
+        anchors.append(times[:-k][valid])
+    return {'hashes': np.concatenate(hashes).tolist(),
+            'frames': np.concatenate(anchors).tolist()}
+
+
+def fingerprint(path: Path, duration: float) -> Dict:
+    """
+    Відбитки початку та кінця епізоду (одне декодування кожної частини)
+
+    Returns:
+        {'head': {'start', hashes, frames}, 'tail': {...}}
+    """
+    parts = {}
+    tail_start = max(0.0, duration - TAIL)
+    for name, start, length in (('head', 0.0, min(HEAD, duration)),
+                                ('tail', tail_start, duration - tail_start)):
+        part = fingerprint_samples(_decode(path, start, length))
+        part['start'] = start
+        parts[name] = part
+    return parts
+
+
+def match_part(part: Dict, reference: Dict) -> List[Tuple[float, float]]:
+    """
+    Діапазони частини епізоду, які звучать і в референсі
+
+    Для кожного спільного хешу обчислюється зсув у часі між епізодами;
+    заставка дає багато хешів з одним зсувом, випадкові збіги - ні.
+    Заставка й титри зсунуті по-різному, тож беруться всі зсуви, що
+    набрали щонайменше MIN_MATCHES збігів.
+
+    Returns:
+        Список (початок, кінець) у секундах епізоду
+    """
+    import numpy as np
+
+    query = np.asarray(part['hashes'], dtype=np.int64)
+    query_frames = np.asarray(part['frames'], dtype=np.int64)
+    known = np.asarray(reference['hashes'], dtype=np.int64)
+    known_frames = np.asarray(reference['frames'], dtype=np.int64)
+    if not len(query) or not len(known):
+        return []
+
+    order = np.argsort(known, kind='stable')
+    known, known_frames = known[order], known_frames[order]
+    left = np.searchsorted(known, query, 'left')
+    counts = np.searchsorted(known, query, 'right') - left
+    useful = (counts > 0) & (counts <= MAX_HASH_REPEATS)
+    if not useful.any():
+        return []
+
+    # Усі пари (хеш запиту, такий самий хеш референсу)
+    counts = counts[useful]
+    owners = np.repeat(np.nonzero(useful)[0], counts)
+    starts = np.repeat(left[useful], counts)
+    within = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+    offsets = known_frames[starts + within] - query_frames[owners]
+
+    # Кожен спільний фрагмент (заставка, титри) має власний зсув
+    values, votes = np.unique(offsets, return_counts=True)
+    anchors = []
+    for offset in values[np.argsort(-votes, kind='stable')][:MAX_OFFSETS]:
+        if any(abs(offset - chosen) <= 2 for chosen in anchors):
+            continue
+        aligned = np.abs(offsets - offset) <= 1
+        if aligned.sum() < MIN_MATCHES:
+            break
+        anchors.append(offset)
+    if not anchors:
+        return []
+
+    aligned = np.zeros(len(offsets), dtype=bool)
+    for offset in anchors:
+        aligned |= np.abs(offsets - offset) <= 1
+    matched = np.unique(query_frames[owners[aligned]]) * FRAME_TIME + part['start']
+    ranges = []
+    run_start = previous = matched[0]
+    for time in matched[1:]:
+        if time - previous > GAP:
+            ranges.append((run_start, previous))
+            run_start = time
+        previous = time
+    ranges.append((run_start, previous))
+    # Кінець діапазону - кінець останньої пари піків, округлено до кадру
+    return [(round(float(start), 2), round(float(end) + FRAME_TIME, 2))
+            for start, end in ranges if end - start >= MIN_RANGE]
+
+
+def shared_ranges(episode: Dict, references: List[Dict]) -> List[Tuple[float, float]]:
+    """
+    Об'єднані діапазони заставок і титрів, спільних з іншими епізодами
+
+    Returns:
+        Відсортовані діапазони (початок, кінець) без перетинів
+    """
+    ranges = []
+    for reference in references:
+        for name in ('head', 'tail'):
+            ranges.extend(match_part(episode[name], reference[name]))
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + GAP:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
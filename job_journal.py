@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Журнал задач нарізання для відновлення після збою
+"""
+
+import sqlite3
+import time
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class JobJournal:
+    """
+    Стан кожного кліпа у SQLite: pending, encoding, done, failed
+
+    Стан змінюється до і після кожного запуску FFmpeg, тож після збою
+    видно, які кліпи були готові, а які обірвалися. Кожен запуск
+    кодування рахується як спроба; кліпи, що не вдалися MAX_ATTEMPTS
+    разів, більше не нарізаються автоматично.
+
+    Та сама таблиця - черга для розподіленого нарізання: задачі з
+    відрізком джерела (enqueue) забирають робочі процеси (claim) на
+    строк оренди й подовжують її (heartbeat), поки FFmpeg працює.
+    Задача, оренда якої минула, повертається в чергу. Спробою тут
+    рахується кожне забирання задачі, тож кліп, що раз у раз валить
+    робочий процес (збій, OOM), після MAX_ATTEMPTS оренд стає failed.
+    """
+
+    MAX_ATTEMPTS = 3
+
+    # Відрізок джерела та оренда задачі розподіленої черги
+    QUEUE_COLUMNS = (('start_time', 'REAL'), ('length', 'REAL'),
+                     ('clip_duration', 'INTEGER'), ('owner', 'TEXT'),
+                     ('lease_until', 'REAL'))
+
+    # Задачі черги, які можна забрати: нові, невдалі з запасом спроб
+    # і ті, чия оренда минула (робочий процес зупинився), теж із запасом
+    CLAIMABLE = ("start_time IS NOT NULL AND (state = 'pending' "
+                 "OR (state = 'failed' AND attempts < :max_attempts) "
+                 "OR (state = 'encoding' AND lease_until < :now "
+                 "AND attempts < :max_attempts))")
+
+    def __init__(self, db_file: str = "media_catalog.db",
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            db_file: База каталогу (журнал - окрема таблиця)
+            clock: Джерело часу для оренд (секунди)
+        """
+        self.db_file = db_file
+        self.clock = clock
+        self.conn = sqlite3.connect(db_file, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    source_path TEXT NOT NULL,
+                    clip_index INTEGER NOT NULL,
+                    settings TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (source_path, clip_index)
+                )
+            """)
+            # Журнали, створені до появи розподіленої черги
+            columns = {row['name'] for row in
+                       self.conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in self.QUEUE_COLUMNS:
+                if column not in columns:
+                    self.conn.execute(
+                        f"ALTER TABLE jobs ADD COLUMN {column} {kind}"
+                    )
+
+    def close(self):
+        """Закрити з'єднання з базою"""
+        self.conn.close()
+
+    def plan(self, source: Path, settings: str, indices: Iterable[int]) -> int:
+        """
+        Зареєструвати кліпи, які треба нарізати
+
+        Записи з іншими налаштуваннями починаються заново; незавершені
+        кліпи, яких більше немає в плані (план змінився), видаляються.
+
+        Returns:
+            Кількість кліпів, обірваних під час попереднього запуску
+        """
+        now = datetime.now().isoformat()
+        key = str(source)
+        indices = list(indices)
+        with self.conn:
+            interrupted = self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE source_path = ? "
+                "AND settings = ? AND state = 'encoding'",
+                (key, settings)
+            ).fetchone()[0]
+            self.conn.execute(
+                "DELETE FROM jobs WHERE source_path = ? AND settings != ?",
+                (key, settings)
+            )
+            self.conn.execute(
+                "DELETE FROM jobs WHERE source_path = ? AND state != 'done' "
+                f"AND clip_index NOT IN ({','.join('?' * len(indices))})",
+                (key, *indices)
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs "
+                "(source_path, clip_index, settings, state, updated_at) "
+                "VALUES (?, ?, ?, 'pending', ?)",
+                [(key, index, settings, now) for index in indices]
+            )
+        return interrupted
+
+    def exhausted(self, source: Path) -> Set[int]:
+        """Кліпи, які не вдалися MAX_ATTEMPTS разів"""
+        rows = self.conn.execute(
+            "SELECT clip_index FROM jobs WHERE source_path = ? "
+            "AND state = 'failed' AND attempts >= ?",
+            (str(source), self.MAX_ATTEMPTS)
+        ).fetchall()
+        return {row['clip_index'] for row in rows}
+
+    def start(self, source: Path, indices: Iterable[int]):
+        """
+        Позначити кліпи як ті, що кодуються (нова спроба)
+
+        Задачу в оренді спробу вже пораховано під час claim.
+        """
+        now = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE jobs SET state = 'encoding', attempts = attempts + "
+                "CASE WHEN state = 'encoding' AND lease_until >= ? "
+                "THEN 0 ELSE 1 END, "
+                "updated_at = ? WHERE source_path = ? AND clip_index = ?",
+                [(self.clock(), now, str(source), index) for index in indices]
+            )
+
+    def finish(self, source: Path, index: int):
+        """Позначити кліп як готовий"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = 'done', attempts = 0, error = NULL, "
+                "updated_at = ? "
+                "WHERE source_path = ? AND clip_index = ?",
+                (datetime.now().isoformat(), str(source), index)
+            )
+
+    def fail(self, source: Path, indices: Iterable[int], error: str):
+        """Позначити незавершені кліпи як невдалі"""
+        now = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE jobs SET state = 'failed', error = ?, updated_at = ? "
+                "WHERE source_path = ? AND clip_index = ? AND state != 'done'",
+                [(error[-500:], now, str(source), index) for index in indices]
+            )
+
+    def enqueue(self, source: Path, settings: str, clip_duration: int,
+                clips: Dict[int, Tuple[float, float]]):
+        """
+        Поставити кліпи в чергу розподіленого нарізання
+
+        Args:
+            clips: Номер кліпа -> (початок, тривалість) у джерелі
+        """
+        self.plan(source, settings, clips)
+        now = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE jobs SET start_time = ?, length = ?, clip_duration = ?, "
+                # Готовий за журналом кліп, якого немає в каталозі, - заново
+                "state = CASE WHEN state = 'done' THEN 'pending' ELSE state END, "
+                "updated_at = ? WHERE source_path = ? AND clip_index = ?",
+                [(start, length, clip_duration, now, str(source), index)
+                 for index, (start, length) in clips.items()]
+            )
+
+    def claim(self, owner: str, lease: float) -> Optional[Dict]:
+        """
+        Атомарно забрати наступну задачу черги
+
+        BEGIN IMMEDIATE блокує запис на час вибору, тож одна задача не
+        дістанеться двом процесам. Гарантія діє для процесів однієї
+        машини: база в режимі WAL потребує спільної пам'яті й не працює
+        на мережевих файлових системах (NFS, SMB). Кожне забирання - спроба; задачі, оренда яких минула
+        MAX_ATTEMPTS разів, стають failed і більше не забираються.
+
+        Returns:
+            Задача (source_path, clip_index, settings, start_time, length,
+            clip_duration) або None, якщо черга порожня
+        """
+        now = self.clock()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            abandoned = self.conn.execute(
+                "UPDATE jobs SET state = 'failed', error = ?, updated_at = ? "
+                "WHERE start_time IS NOT NULL AND state = 'encoding' "
+                "AND lease_until < ? AND attempts >= ?",
+                (f"оренда минула {self.MAX_ATTEMPTS} рази: робочий процес "
+                 f"зупинявся під час кодування",
+                 datetime.now().isoformat(), now, self.MAX_ATTEMPTS)
+            ).rowcount
+            if abandoned:
+                logger.warning(f"{abandoned} кліпів черги щоразу зупиняли "
+                               f"робочий процес - позначено як невдалі")
+            row = self.conn.execute(
+                f"SELECT * FROM jobs WHERE {self.CLAIMABLE} "
+                "ORDER BY source_path, clip_index LIMIT 1",
+                {'max_attempts': self.MAX_ATTEMPTS, 'now': now}
+            ).fetchone()
+            if row is not None:
+                self.conn.execute(
+                    "UPDATE jobs SET state = 'encoding', owner = ?, "
+                    "lease_until = ?, attempts = attempts + 1, updated_at = ? "
+                    "WHERE source_path = ? AND clip_index = ?",
+                    (owner, now + lease, datetime.now().isoformat(),
+                     row['source_path'], row['clip_index'])
+                )
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return dict(row) if row is not None else None
+
+    def heartbeat(self, owner: str, source: Path, index: int,
+                  lease: float) -> bool:
+        """
+        Подовжити оренду задачі
+
+        Returns:
+            False, якщо задачу вже забрав інший процес (оренда минула)
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE source_path = ? "
+                "AND clip_index = ? AND owner = ? AND state = 'encoding'",
+                (self.clock() + lease, str(source), index, owner)
+            )
+        return cursor.rowcount > 0
+
+    def release(self, owner: str, source: Path, index: int, error: str):
+        """
+        Позначити невдалою задачу, що не дійшла до запису в журнал
+        (наприклад, не збіглися налаштування); спробу пораховано в claim
+        """
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = 'failed', "
+                "error = ?, updated_at = ? "
+                "WHERE source_path = ? AND clip_index = ? AND owner = ? "
+                "AND state = 'encoding'",
+                (error, datetime.now().isoformat(), str(source), index, owner)
+            )
+
+    def active(self) -> int:
+        """Задачі черги, що чекають або кодуються (зокрема іншими процесами)"""
+        return self.conn.execute(
+            f"SELECT COUNT(*) FROM jobs WHERE {self.CLAIMABLE} "
+            "OR (start_time IS NOT NULL AND state = 'encoding')",
+            {'max_attempts': self.MAX_ATTEMPTS, 'now': self.clock()}
+        ).fetchone()[0]
+
+    def summary(self) -> Dict[str, int]:
+        """Кількість кліпів у кожному стані"""
+        rows = self.conn.execute(
+            "SELECT state, COUNT(*) AS count FROM jobs GROUP BY state"
+        ).fetchall()
+        return {row['state']: row['count'] for row in rows}
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Аналіз гучності джерел (EBU R128) для нормалізації кліпів
+"""
+
+import re
+import subprocess
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+FRAME_PATTERN = re.compile(
+    r"t:\s*([\d.]+)\s.*?M:\s*(\S+)\s.*?FTPK:\s*(.+?)\s*dBFS"
+)
+
+# Поріг абсолютного та відносного гейтування за ITU-R BS.1770
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+
+
+def _to_float(value: str) -> float:
+    """Значення з логу ebur128 (-inf, nan) у float"""
+    try:
+        return float(value)
+    except ValueError:
+        return float('-inf')
+
+
+def analyze_loudness(path: Path) -> Optional[Dict]:
+    """
+    Виміряти гучність джерела за один прохід лише по аудіо
+
+    Фільтр ebur128 кожні 100 мс звітує моментальну гучність (вікно
+    400 мс) та пік кадру, тож гучність будь-якого відрізка джерела
+    обчислюється з цієї таблиці без повторного декодування.
+
+    Returns:
+        Таблиця {time, momentary, peak} або None, якщо в джерелі немає аудіо
+    """
+    result = subprocess.run(
+        ['ffmpeg', '-nostats', '-i', str(path), '-vn', '-sn', '-dn',
+         '-af', 'ebur128=peak=true', '-f', 'null', '-'],
+        capture_output=True, text=True, errors='replace'
+    )
+    table = {'time': [], 'momentary': [], 'peak': []}
+    for match in FRAME_PATTERN.finditer(result.stderr):
+        table['time'].append(round(float(match.group(1)), 3))
+        table['momentary'].append(round(_to_float(match.group(2)), 2))
+        peaks = [_to_float(value) for value in match.group(3).split()]
+        table['peak'].append(round(max(peaks), 2))
+
+    if result.returncode != 0 and not table['time']:
+        logger.warning(f"Аналіз гучності не вдався: {path.name}")
+        return None
+    if not table['time']:
+        return None
+    return table
+
+
+def segment_loudness(table: Dict, start: float, length: float) -> Dict:
+    """
+    Інтегрована гучність і пік відрізка з таблиці джерела
+
+    Returns:
+        {'integrated': LUFS або None для тиші, 'peak': dBFS}
+    """
+    import numpy as np
+
+    times = np.asarray(table['time'])
+    momentary = np.asarray(table['momentary'])
+    peaks = np.asarray(table['peak'])
+    end = start + length
+
+    # Блоки 400 мс, що повністю лежать у відрізку
+    blocks = momentary[(times >= start + 0.4) & (times <= end + 0.001)]
+    frames = peaks[(times > start) & (times <= end + 0.001)]
+    peak = float(frames.max()) if len(frames) else float('-inf')
+
+    gated = blocks[blocks > ABSOLUTE_GATE]
+    if not len(gated):
+        return {'integrated': None, 'peak': peak}
+
+    energy = np.power(10.0, (gated + 0.691) / 10.0)
+    threshold = -0.691 + 10 * np.log10(energy.mean()) + RELATIVE_GATE
+    energy = energy[gated > threshold]
+    integrated = -0.691 + 10 * np.log10(energy.mean())
+    return {'integrated': float(integrated), 'peak': peak}
+
+
+def linear_gain(measurement: Dict, target: float, true_peak: float) -> float:
+    """
+    Постійне підсилення (дБ) для досягнення цільової гучності
+
+    Як у лінійному режимі loudnorm: підсилення обмежується так, щоб
+    пік не перевищив true_peak, тому динаміка кліпа не змінюється.
+    """
+    if measurement['integrated'] is None:
+        return 0.0
+    gain = target - measurement['integrated']
+    if measurement['peak'] != float('-inf'):
+        gain = min(gain, true_peak - measurement['peak'])
+    return gain
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Кеш метаданих медіафайлів та спільний сервіс FFprobe
+"""
+
+import os
+import json
+import subprocess
+import sqlite3
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class MediaCache:
+    """
+    Постійний кеш результатів аналізу файлів у SQLite
+
+    Запис прив'язаний до (шлях, розмір, час зміни): якщо файл змінився,
+    старий запис вважається промахом. Кількість записів обмежена,
+    найдавніше використані витісняються першими (LRU).
+    """
+
+    def __init__(self, db_file: str = "media_cache.db",
+                 max_entries: int = 20000):
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Одне з'єднання на всі потоки, доступ серіалізується через _lock
+        self.conn = sqlite3.connect(db_file, timeout=30,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    path TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    data TEXT NOT NULL,
+                    accessed REAL NOT NULL,
+                    PRIMARY KEY (path, kind)
+                )
+            """)
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+            )
+
+    @staticmethod
+    def _file_key(path: Path) -> Optional[tuple]:
+        """(шлях, розмір, час зміни) файлу або None якщо файлу немає"""
+        try:
+            stat = Path(path).stat()
+        except OSError:
+            return None
+        return str(path), stat.st_size, stat.st_mtime
+
+    def get(self, path: Path, kind: str) -> Optional[Any]:
+        """
+        Отримати збережений результат для файлу
+
+        Args:
+            path: Шлях до файлу
+            kind: Тип даних (probe, keyframes, ...)
+
+        Returns:
+            Збережене значення або None при промаху
+        """
+        key = self._file_key(path)
+        if key is None:
+            return None
+
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT data FROM entries "
+                "WHERE path = ? AND kind = ? AND size = ? AND mtime = ?",
+                (key[0], kind, key[1], key[2])
+            ).fetchone()
+            if row is None:
+                return None
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE entries SET accessed = ? WHERE path = ? AND kind = ?",
+                    (time.time(), key[0], kind)
+                )
+        return json.loads(row[0])
+
+    def put(self, path: Path, kind: str, value: Any):
+        """Зберегти результат для поточної версії файлу"""
+        key = self._file_key(path)
+        if key is None:
+            return
+
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(path, kind, size, mtime, data, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key[0], kind, key[1], key[2], data, time.time())
+            )
+            self._evict()
+
+    def _evict(self):
+        """Витіснити найдавніше використані записи понад ліміт"""
+        count = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM entries WHERE rowid IN ("
+                "SELECT rowid FROM entries ORDER BY accessed LIMIT ?)",
+                (excess,)
+            )
+
+    def close(self):
+        """Закрити з'єднання з базою"""
+        self.conn.close()
+
+
+class ProbeService:
+    """Спільний доступ до FFprobe з постійним кешем і пакетним режимом"""
+
+    def __init__(self, cache: Optional[MediaCache] = None):
+        self.cache = cache or MediaCache(":memory:")
+
+    def probe(self, path: Path) -> Dict:
+        """
+        Отримати метадані файлу (як ffmpeg.probe, але з кешем)
+
+        Raises:
+            ffmpeg.Error: якщо FFprobe не зміг прочитати файл
+        """
+        cached = self.cache.get(path, 'probe')
+        if cached is not None:
+            return cached
+
+        import ffmpeg
+        result = ffmpeg.probe(str(path))
+        self.cache.put(path, 'probe', result)
+        return result
+
+    def keyframes(self, path: Path) -> List[float]:
+        """
+        Індекс ключових кадрів першого відеопотоку (з кешем)
+
+        Читаються лише заголовки пакетів, без декодування кадрів.
+
+        Returns:
+            Відсортований список часу ключових кадрів у секундах
+        """
+        cached = self.cache.get(path, 'keyframes')
+        if cached is not None:
+            return cached
+
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+             '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0',
+             str(path)],
+            capture_output=True, text=True, check=True
+        )
+        times = []
+        for line in result.stdout.splitlines():
+            pts_time, _, flags = line.partition(',')
+            if 'K' in flags and pts_time not in ('', 'N/A'):
+                times.append(float(pts_time))
+        times.sort()
+
+        self.cache.put(path, 'keyframes', times)
+        return times
+
+    def loudness(self, path: Path) -> Optional[Dict]:
+        """
+        Таблиця гучності джерела (з кешу; аналіз лише по аудіо)
+
+        Returns:
+            Таблиця loudness.analyze_loudness або None, якщо аудіо немає
+        """
+        cached = self.cache.get(path, 'loudness')
+        if cached is not None:
+            return cached or None
+
+        from loudness import analyze_loudness
+        table = analyze_loudness(path)
+        # Порожній словник - позначка "аудіо немає", щоб не аналізувати знову
+        self.cache.put(path, 'loudness', table or {})
+        return table
+
+    def silence_boundaries(self, path: Path, spans: List[List[float]],
+                           min_length: float, max_length: float,
+                           target: float) -> Optional[List[List[float]]]:
+        """
+        Межі кліпів у паузах звуку (з кешу; аналіз лише по аудіо)
+
+        Args:
+            spans: Відрізки джерела [початок, кінець], що діляться на кліпи
+
+        Returns:
+            Межі для кожного відрізка (див. silence.plan_boundaries)
+            або None, якщо аудіо немає
+        """
+        kind = (f'boundaries:{min_length:g}:{max_length:g}:{target:g}:'
+                + ','.join(f'{start:g}-{end:g}' for start, end in spans))
+        cached = self.cache.get(path, kind)
+        if cached is not None:
+            return cached['spans']
+
+        from silence import analyze_energy, plan_boundaries
+        energy = analyze_energy(path)
+        boundaries = None
+        if len(energy):
+            boundaries = [plan_boundaries(energy, end, min_length, max_length,
+                                          target, start)
+                          for start, end in spans]
+        self.cache.put(path, kind, {'spans': boundaries})
+        return boundaries
+
+    def frame_hashes(self, path: Path) -> List[List]:
+        """
+        Перцептивні хеші кадрів джерела (з кешу; декодуються лише
+        ключові кадри)
+
+        Returns:
+            Список [час, хеш] (див. duplicates.source_frame_hashes)
+        """
+        cached = self.cache.get(path, 'phash')
+        if cached is not None:
+            return cached
+
+        from duplicates import source_frame_hashes
+        duration = self.duration(self.probe(path)) or 0.0
+        hashes = source_frame_hashes(path, self.keyframes(path), duration)
+        self.cache.put(path, 'phash', hashes)
+        return hashes
+
+    def subtitle_events(self, path: Path, stream: int = 0) -> List[List]:
+        """
+        Події субтитрової доріжки (з кешу; доріжка розбирається один раз)
+
+        Returns:
+            Список [початок, кінець, текст] (див. subtitles.extract_events)
+        """
+        kind = f'subtitles:{stream}'
+        cached = self.cache.get(path, kind)
+        if cached is not None:
+            return cached
+
+        from subtitles import extract_events
+        events = extract_events(path, stream)
+        self.cache.put(path, kind, events)
+        return events
+
+    def audio_fingerprint(self, path: Path) -> Dict:
+        """
+        Аудіовідбитки початку та кінця епізоду (з кешу; декодується
+        лише аудіо цих частин)
+
+        Returns:
+            Відбиток (див. intro_detector.fingerprint)
+        """
+        cached = self.cache.get(path, 'fingerprint')
+        if cached is not None:
+            return cached
+
+        from intro_detector import fingerprint
+        duration = self.duration(self.probe(path)) or 0.0
+        parts = fingerprint(path, duration)
+        self.cache.put(path, 'fingerprint', parts)
+        return parts
+
+    def shared_audio(self, path: Path, references: List[Path]) -> List[List[float]]:
+        """
+        Заставки та титри, спільні з іншими епізодами серіалу
+
+        Відбиток кожного епізоду обчислюється один раз, тож новий епізод
+        порівнюється з уже відомими без повторного аналізу. Знайдені
+        діапазони кешуються й далі не змінюються; порожній результат не
+        кешується - з'явиться наступний епізод, і заставка знайдеться.
+
+        Returns:
+            Діапазони [початок, кінець] (див. intro_detector.shared_ranges)
+        """
+        cached = self.cache.get(path, 'intro')
+        if cached:
+            return cached
+
+        from intro_detector import shared_ranges
+        ranges = [list(r) for r in shared_ranges(
+            self.audio_fingerprint(path),
+            [self.audio_fingerprint(reference) for reference in references]
+        )]
+        if ranges:
+            self.cache.put(path, 'intro', ranges)
+        return ranges
+
+    def reframe_track(self, path: Path, target_aspect: float) -> Dict:
+        """
+        Траєкторія динамічного кадрування джерела (з кешу; аналізується
+        зменшена копія з кількома кадрами за секунду)
+
+        Returns:
+            Траєкторія (див. reframe.analyze_track)
+        """
+        kind = f'reframe:{target_aspect:.4f}'
+        cached = self.cache.get(path, kind)
+        if cached is not None:
+            return cached
+
+        from reframe import analyze_track
+        aspect = self.display_aspect(self.probe(path))
+        if aspect is None:
+            return {'fps': 0, 'positions': []}
+        track = analyze_track(path, aspect, target_aspect)
+        self.cache.put(path, kind, track)
+        return track
+
+    def probe_many(self, paths: Iterable[Path],
+                   workers: int = 8) -> Dict[Path, Optional[Dict]]:
+        """
+        Паралельно отримати метадані багатьох файлів
+
+        Returns:
+            Словник шлях -> метадані (None якщо файл не вдалося прочитати)
+        """
+        paths = list(paths)
+
+        def safe_probe(path: Path) -> Optional[Dict]:
+            try:
+                return self.probe(path)
+            except Exception as e:
+                logger.warning(f"Не вдалося прочитати метадані {path}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(safe_probe, paths))
+        return dict(zip(paths, results))
+
+    def scan_directory(self, root: Path, extensions: Iterable[str],
+                       workers: int = 8) -> Dict[Path, Optional[Dict]]:
+        """Рекурсивно знайти відеофайли у папці та отримати їх метадані"""
+        from media_catalog import MediaCatalog
+        return self.probe_many(MediaCatalog.scan(Path(root), extensions), workers)
+
+    @staticmethod
+    def duration(probe: Dict) -> Optional[float]:
+        """Тривалість файлу з контейнера або першого відеопотоку"""
+        if 'format' in probe and 'duration' in probe['format']:
+            return float(probe['format']['duration'])
+        for stream in probe.get('streams', []):
+            if stream.get('codec_type') == 'video' and 'duration' in stream:
+                return float(stream['duration'])
+        return None
+
+    @staticmethod
+    def first_stream(probe: Dict, codec_type: str) -> Optional[Dict]:
+        """Перший потік заданого типу (video, audio, subtitle)"""
+        return next((s for s in probe.get('streams', [])
+                     if s.get('codec_type') == codec_type), None)
+
+    @classmethod
+    def display_aspect(cls, probe: Dict) -> Optional[float]:
+        """Відображуване співвідношення сторін першого відеопотоку"""
+        video = cls.first_stream(probe, 'video')
+        if not video or not video.get('width') or not video.get('height'):
+            return None
+        num, _, den = video.get('sample_aspect_ratio', '1:1').partition(':')
+        try:
+            sar = float(num) / float(den)
+        except (ValueError, ZeroDivisionError):
+            sar = 1.0
+        # 0:1 - співвідношення пікселів невідоме
+        if sar <= 0:
+            sar = 1.0
+        return video['width'] * sar / video['height']
+
+
+_services: Dict[tuple, ProbeService] = {}
+
+
+def get_probe_service(cache_file: str = "media_cache.db") -> ProbeService:
+    """
+    Спільний ProbeService для процесу (один на файл кешу)
+
+    З'єднання SQLite не можна використовувати після fork, тому робочі
+    процеси пулу отримують власний сервіс.
+    """
+    key = (os.getpid(), cache_file)
+    if key not in _services:
+        _services[key] = ProbeService(MediaCache(cache_file))
+    return _services[key]
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Каталог медіафайлів для інкрементальної обробки серіалів
+"""
+
+import os
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MediaCatalog:
+    """
+    Каталог джерел та створених з них кліпів у SQLite
+
+    Джерело ідентифікується шляхом, розміром, часом зміни та хешем
+    вибіркових фрагментів вмісту. Для кожного кліпа зберігається
+    відрізок джерела, підпис налаштувань кодування, з якими його створено,
+    та час публікації: опубліковані кліпи більше не нарізаються, навіть
+    якщо файл уже видалено з диска.
+    """
+
+    # Розмір кожного з фрагментів для хешу (початок, середина, кінець)
+    SAMPLE_SIZE = 1024 * 1024
+
+    def __init__(self, db_file: str = "media_catalog.db"):
+        self.db_file = db_file
+        # Паралельні процеси обробки пишуть в одну базу
+        self.conn = sqlite3.connect(db_file, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        """Створити таблиці каталогу"""
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS sources (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    duration REAL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS clips (
+                    source_path TEXT NOT NULL,
+                    clip_index INTEGER NOT NULL,
+                    clip_path TEXT NOT NULL,
+                    settings TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    uploaded_at TEXT,
+                    PRIMARY KEY (source_path, clip_index)
+                )
+            """)
+            # Каталоги, створені до появи позначки публікації
+            columns = {row['name'] for row in
+                       self.conn.execute("PRAGMA table_info(clips)")}
+            if 'uploaded_at' not in columns:
+                self.conn.execute("ALTER TABLE clips ADD COLUMN uploaded_at TEXT")
+            # Відрізок джерела; у старіших каталогах невідомий (NULL)
+            for column in ('start_time', 'length'):
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE clips ADD COLUMN {column} REAL")
+
+    def close(self):
+        """Закрити з'єднання з базою"""
+        self.conn.close()
+
+    @staticmethod
+    def scan(root: Path, extensions: Iterable[str]) -> List[Path]:
+        """
+        Рекурсивно знайти відеофайли у папці та всіх підпапках серіалів
+
+        Args:
+            root: Коренева папка бібліотеки
+            extensions: Розширення відеофайлів (з крапкою, нижній регістр)
+
+        Returns:
+            Відсортований список файлів
+        """
+        extensions = set(extensions)
+        found = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            # Приховані папки (.tmp, .cache) не є частиною бібліотеки
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for filename in filenames:
+                if Path(filename).suffix.lower() in extensions:
+                    found.append(Path(dirpath) / filename)
+        return sorted(found)
+
+    @classmethod
+    def content_hash(cls, path: Path) -> str:
+        """Хеш розміру та трьох фрагментів файлу (без читання всього файлу)"""
+        size = path.stat().st_size
+        digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+        with open(path, 'rb') as f:
+            for offset in (0, size // 2, max(0, size - cls.SAMPLE_SIZE)):
+                f.seek(offset)
+                digest.update(f.read(cls.SAMPLE_SIZE))
+        return digest.hexdigest()
+
+    def refresh_source(self, path: Path) -> bool:
+        """
+        Звірити джерело з каталогом
+
+        Якщо файл змінився, його кліпи видаляються з каталогу.
+
+        Returns:
+            True якщо джерело не змінилося з минулої обробки
+        """
+        key = str(path)
+        stat = path.stat()
+        row = self.conn.execute(
+            "SELECT size, mtime, content_hash FROM sources WHERE path = ?",
+            (key,)
+        ).fetchone()
+
+        if row and row['size'] == stat.st_size and row['mtime'] == stat.st_mtime:
+            return True
+
+        content_hash = self.content_hash(path)
+        unchanged = (
+            row is not None
+            and row['size'] == stat.st_size
+            and row['content_hash'] == content_hash
+        )
+        now = datetime.now().isoformat()
+
+        with self.conn:
+            if unchanged:
+                # Файл лише переписано/скопійовано - оновити час зміни
+                self.conn.execute(
+                    "UPDATE sources SET mtime = ?, updated_at = ? WHERE path = ?",
+                    (stat.st_mtime, now, key)
+                )
+            else:
+                if row is not None:
+                    logger.info(f"Джерело змінилося: {path.name}")
+                self.conn.execute(
+                    "DELETE FROM clips WHERE source_path = ?", (key,)
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO sources "
+                    "(path, size, mtime, content_hash, duration, updated_at) "
+                    "VALUES (?, ?, ?, ?, NULL, ?)",
+                    (key, stat.st_size, stat.st_mtime, content_hash, now)
+                )
+        return unchanged
+
+    def get_duration(self, path: Path) -> Optional[float]:
+        """Тривалість джерела, збережена під час минулої обробки"""
+        row = self.conn.execute(
+            "SELECT duration FROM sources WHERE path = ?", (str(path),)
+        ).fetchone()
+        return row['duration'] if row else None
+
+    def set_duration(self, path: Path, duration: float):
+        """Зберегти тривалість джерела"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE sources SET duration = ? WHERE path = ?",
+                (duration, str(path))
+            )
+
+    @staticmethod
+    def _span(row) -> Optional[Tuple[float, float]]:
+        """Відрізок джерела кліпа або None, якщо його не записано"""
+        if row['start_time'] is None or row['length'] is None:
+            return None
+        return row['start_time'], row['length']
+
+    def done_clips(self, path: Path,
+                   settings: str) -> Dict[int, Optional[Tuple[float, float]]]:
+        """
+        Кліпи джерела, які не треба нарізати знову
+
+        Це кліпи, створені з такими ж налаштуваннями і наявні на диску,
+        а також уже опубліковані (з будь-якими налаштуваннями).
+
+        Returns:
+            Словник номер кліпа -> (початок, тривалість) у джерелі
+            (None для кліпів, записаних до появи відрізків)
+        """
+        rows = self.conn.execute(
+            "SELECT clip_index, clip_path, uploaded_at, start_time, length "
+            "FROM clips "
+            "WHERE source_path = ? AND (settings = ? OR uploaded_at IS NOT NULL)",
+            (str(path), settings)
+        ).fetchall()
+        return {
+            row['clip_index']: self._span(row)
+            for row in rows
+            if row['uploaded_at'] or Path(row['clip_path']).exists()
+        }
+
+    def uploaded_spans(self, path: Path) -> Dict[int, Optional[Tuple[float, float]]]:
+        """Опубліковані кліпи джерела: номер -> (початок, тривалість) або None"""
+        rows = self.conn.execute(
+            "SELECT clip_index, start_time, length FROM clips "
+            "WHERE source_path = ? AND uploaded_at IS NOT NULL",
+            (str(path),)
+        ).fetchall()
+        return {row['clip_index']: self._span(row) for row in rows}
+
+    def uploaded_clips(self) -> set:
+        """Шляхи всіх опублікованих кліпів"""
+        rows = self.conn.execute(
+            "SELECT clip_path FROM clips WHERE uploaded_at IS NOT NULL"
+        ).fetchall()
+        return {row['clip_path'] for row in rows}
+
+    def mark_uploaded(self, clip_path: Path):
+        """Позначити кліп як опублікований"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE clips SET uploaded_at = ? WHERE clip_path = ?",
+                (datetime.now().isoformat(), str(clip_path))
+            )
+
+    def record_clips(self, path: Path, settings: str, clips: Dict[int, Path],
+                     spans: Optional[Dict[int, Tuple[float, float]]] = None):
+        """
+        Записати створені кліпи джерела
+
+        Args:
+            spans: Номер кліпа -> (початок, тривалість) у джерелі
+        """
+        spans = spans or {}
+        now = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO clips "
+                "(source_path, clip_index, clip_path, settings, created_at, "
+                "start_time, length) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(str(path), index, str(clip), settings, now,
+                  *spans.get(index, (None, None)))
+                 for index, clip in clips.items()]
+            )
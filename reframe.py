@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Динамічне кадрування 16:9 -> 9:16 за картою помітності
+"""
+
+import subprocess
+import tempfile
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Копія для аналізу: ширина в пікселях і кадрів за секунду
+ANALYSIS_WIDTH = 160
+ANALYSIS_FPS = 4
+# Вага деталізації (контурів) відносно руху
+DETAIL_WEIGHT = 0.25
+# Вікно має бути помітно кращим за центр, інакше кадр лишається по центру
+MIN_GAIN = 1.15
+# Частка найкращої суми, з якою вікна вважаються рівноцінними
+PLATEAU = 0.98
+# Середня різниця сусідніх кадрів (0-255), що вважається зміною плану
+CUT_THRESHOLD = 35.0
+# Згладжування траєкторії (секунди) і найбільша швидкість панорами
+# (частка можливого зсуву за секунду)
+SMOOTH_SECONDS = 1.5
+MAX_PAN_SPEED = 0.35
+
+
+def _box(values, size: int):
+    """Ковзне середнє вздовж першої осі з відбиттям на краях"""
+    import numpy as np
+
+    if size <= 1 or len(values) < 2:
+        return values
+    pad = size // 2
+    padded = np.pad(values, [(pad, size - 1 - pad)] + [(0, 0)] * (values.ndim - 1),
+                    mode='edge')
+    cumulative = np.cumsum(padded, axis=0, dtype=np.float64)
+    cumulative = np.concatenate([np.zeros((1,) + values.shape[1:]), cumulative])
+    return (cumulative[size:] - cumulative[:-size]) / size
+
+
+def _smooth_shot(targets):
+    """Згладити траєкторію одного плану: медіана, середнє, обмеження швидкості"""
+    import numpy as np
+
+    if len(targets) > 4:
+        windows = np.lib.stride_tricks.sliding_window_view(
+            np.pad(targets, 2, mode='edge'), 5
+        )
+        targets = np.median(windows, axis=1)
+    targets = _box(targets, max(1, round(SMOOTH_SECONDS * ANALYSIS_FPS)))
+    step = MAX_PAN_SPEED / ANALYSIS_FPS
+    positions = np.empty_like(targets)
+    position = targets[0]
+    for i, target in enumerate(targets):
+        position += float(np.clip(target - position, -step, step))
+        positions[i] = position
+    return positions
+
+
+def analyze_track(path: Path, display_aspect: float,
+                  target_aspect: float) -> Dict:
+    """
+    Траєкторія вікна кадрування для всього джерела за один прохід
+
+    Джерело декодується без неопорних кадрів і фільтра деблокінгу, одразу
+    зменшене до сірої копії ANALYSIS_WIDTH пікселів з ANALYSIS_FPS кадрів
+    за секунду. Помітність стовпця - рух (різниця кадрів) плюс контури;
+    для кожного кадру вибирається вікно ширини кліпа з найбільшою сумою.
+    Траєкторія згладжується в межах плану, а між планами переходить
+    одразу.
+
+    Args:
+        display_aspect: Відображуване співвідношення сторін джерела
+        target_aspect: Співвідношення сторін кліпа (ширина / висота)
+
+    Returns:
+        {'fps': ANALYSIS_FPS, 'positions': [частка можливого зсуву 0..1]}
+    """
+    import numpy as np
+
+    height = max(2, round(ANALYSIS_WIDTH / display_aspect / 2) * 2)
+    result = subprocess.run(
+        ['ffmpeg', '-v', 'error', '-skip_frame', 'noref',
+         '-skip_loop_filter', 'all', '-i', str(path), '-an', '-sn', '-dn',
+         '-vf', f"fps={ANALYSIS_FPS},scale={ANALYSIS_WIDTH}:{height}"
+                f":flags=fast_bilinear,format=gray",
+         '-f', 'rawvideo', '-pix_fmt', 'gray', '-'],
+        capture_output=True, check=True
+    )
+    frame_size = ANALYSIS_WIDTH * height
+    count = len(result.stdout) // frame_size
+    if count < 2:
+        return {'fps': ANALYSIS_FPS, 'positions': []}
+    frames = np.frombuffer(result.stdout[:count * frame_size], dtype=np.uint8)
+    frames = frames.reshape(count, height, ANALYSIS_WIDTH).astype(np.float32)
+
+    motion = np.abs(np.diff(frames, axis=0, prepend=frames[:1]))
+    detail = np.abs(np.diff(frames, axis=2, append=frames[:, :, -1:]))
+    detail += np.abs(np.diff(frames, axis=1, append=frames[:, -1:, :]))
+    columns = (motion + DETAIL_WEIGHT * detail).sum(axis=1)
+
+    cuts = motion.mean(axis=(1, 2)) > CUT_THRESHOLD
+    cuts[0] = True
+    shots = np.cumsum(cuts)
+    # Помітність усереднюється в межах плану, щоб вікно не сіпалося
+    for shot in np.unique(shots):
+        members = shots == shot
+        columns[members] = _box(columns[members], ANALYSIS_FPS)
+
+    window = min(ANALYSIS_WIDTH, max(1, round(height * target_aspect)))
+    slack = ANALYSIS_WIDTH - window
+    if slack <= 0:
+        return {'fps': ANALYSIS_FPS, 'positions': [0.5] * count}
+    cumulative = np.concatenate([np.zeros((count, 1)),
+                                 np.cumsum(columns, axis=1)], axis=1)
+    scores = cumulative[:, window:] - cumulative[:, :-window]
+    # Усі вікна, що вміщують об'єкт, мають майже однакову суму; середина
+    # цього плато тримає об'єкт ближче до центру кадру
+    peak = scores.max(axis=1, keepdims=True)
+    near = scores >= peak * PLATEAU
+    best = (near * np.arange(slack + 1)).sum(axis=1) / near.sum(axis=1)
+    center = scores[:, slack // 2]
+    targets = np.where(peak[:, 0] > center * MIN_GAIN, best / slack, 0.5)
+
+    positions = np.empty(count)
+    for shot in np.unique(shots):
+        members = shots == shot
+        positions[members] = _smooth_shot(targets[members])
+    return {'fps': ANALYSIS_FPS,
+            'positions': np.round(np.clip(positions, 0.0, 1.0), 3).tolist()}
+
+
+def position_at(track: Dict, time: float) -> float:
+    """Положення вікна в момент часу джерела (0.5 - центр)"""
+    positions = track['positions']
+    if not positions:
+        return 0.5
+    index = min(len(positions) - 1, max(0, int(time * track['fps'])))
+    return positions[index]
+
+
+def write_crop_commands(track: Dict, start: float, length: float,
+                        target: str = "reframe") -> Optional[Path]:
+    """
+    Записати команди sendcmd для відрізка у тимчасовий файл
+
+    Час команд відраховується від початку відрізка (вхід FFmpeg з ss).
+    Зсув задається виразом від in_w, тож не залежить від розміру
+    масштабованого кадру.
+
+    Returns:
+        Шлях до файлу (видаляє викликач) або None, якщо траєкторії немає
+    """
+    positions = track['positions']
+    if not positions:
+        return None
+    fps = track['fps']
+    first = max(0, int(start * fps))
+    last = min(len(positions), int((start + length) * fps) + 2)
+    lines = []
+    previous = None
+    for index in range(first, last):
+        position = positions[index]
+        if position == previous:
+            continue
+        previous = position
+        lines.append(f"{max(0.0, index / fps - start):.3f} {target} x "
+                     f"(in_w-out_w)*{position:.3f};")
+    if not lines:
+        return None
+
+    # Системна тимчасова папка: шлях без символів, які довелося б
+    # екранувати в описі фільтра
+    with tempfile.NamedTemporaryFile('w', suffix='.cmd', prefix='reframe_',
+                                     delete=False, encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    return Path(f.name)
@@ -8,31 +8,53 @@ import sys
 import argparse
 from pathlib import Path
 import logging
+from typing import Optional
 
 # Імпортуємо наші модулі
-from tiktok_bot import TikTokBot
+from tiktok_bot import TikTokBot, VideoProcessor, setup_logging
+from media_catalog import MediaCatalog
+from bench import (benchmark_profiles, print_report, benchmark_suite,
+                   load_previous_suite, print_suite_report)
+from clip_verifier import ClipVerifier
+from media_cache import get_probe_service
 
-# Налаштування логування
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
-async def process_videos():
+async def process_videos(cut_mode: str = "segment", workers: int = 1,
+                         threads: int = 0, incremental: bool = True,
+                         snap_tolerance: float = 0.0,
+                         profile: Optional[str] = None, jit: bool = False,
+                         distributed: bool = False):
     """Обробити всі відео та створити кліпи"""
-    logger.info("🎬 Початок обробки відео...")
-    bot = TikTokBot()
-    await bot.process_all_videos()
+    logger.info(f"🎬 Початок обробки відео (режим: {cut_mode})...")
+    bot = TikTokBot(cut_mode=cut_mode, incremental=incremental,
+                    snap_tolerance=snap_tolerance, profile=profile)
+    await bot.process_all_videos(workers=workers, threads_per_worker=threads,
+                                 jit=jit, distributed=distributed)
     logger.info("✅ Обробка відео завершена!")
 
 
-async def run_bot():
+async def run_workers(cut_mode: str = "segment", workers: int = 1,
+                      threads: int = 0, snap_tolerance: float = 0.0,
+                      profile: Optional[str] = None, wait: bool = False):
+    """Допомогти з розподіленим нарізанням: забирати кліпи з черги"""
+    bot = TikTokBot(cut_mode=cut_mode, snap_tolerance=snap_tolerance,
+                    profile=profile)
+    rendered = await bot.run_workers(workers, threads, wait)
+    logger.info(f"✅ Відрендерено {rendered} кліпів")
+
+
+async def run_bot(with_processing: bool = False, watch: bool = False,
+                  cut_mode: str = "segment", workers: int = 1,
+                  threads: int = 0, incremental: bool = True,
+                  snap_tolerance: float = 0.0, profile: Optional[str] = None):
     """Запустити бота в безперервному режимі"""
     logger.info("🤖 Запуск TikTok бота...")
-    bot = TikTokBot()
-    await bot.run_continuous()
+    bot = TikTokBot(cut_mode=cut_mode, incremental=incremental,
+                    snap_tolerance=snap_tolerance, profile=profile)
+    await bot.run_continuous(with_processing=with_processing, watch=watch,
+                             workers=workers, threads_per_worker=threads)
 
 
 async def post_now():
@@ -44,16 +66,17 @@ async def post_now():
         logger.warning("❌ Черга порожня! Спочатку обробіть відео.")
         return
     
-    video_path = Path(bot.scheduler.schedule["queue"][0])
-    if not video_path.exists():
-        logger.error(f"❌ Файл не знайдено: {video_path}")
+    entry = bot.scheduler.schedule["queue"][0]
+    video_path = await bot.materialize(entry)
+    if video_path is None:
+        logger.error(f"❌ Файл не знайдено: {bot.scheduler.entry_path(entry)}")
         return
     
     success = await bot.uploader.upload_video(video_path)
     if success:
         # Видалити з черги після успішного завантаження
         bot.scheduler.schedule["queue"].pop(0)
-        bot.scheduler.save_schedule()
+        bot.finish_upload(video_path)
         logger.info(f"✅ Відео опубліковано: {video_path.name}")
     else:
         logger.error("❌ Помилка завантаження відео")
@@ -76,6 +99,46 @@ async def post_specific(file_path: str):
         logger.error("❌ Помилка завантаження відео")
 
 
+def run_benchmark(file_path: Optional[str], start: float, duration: float,
+                  profiles: Optional[str] = None):
+    """Порівняти профілі кодування на фрагменті епізоду"""
+    if file_path:
+        source = Path(file_path)
+    else:
+        video_files = MediaCatalog.scan(Path("Serial"),
+                                        VideoProcessor.VIDEO_EXTENSIONS)
+        if not video_files:
+            logger.error("❌ Немає відео для тесту. Вкажіть --file")
+            return
+        source = video_files[0]
+    
+    names = profiles.split(',') if profiles else None
+    logger.info(f"📐 Тест профілів на {source.name} "
+                f"({start:.0f}-{start + duration:.0f} с)")
+    print_report(benchmark_profiles(source, start, duration, names))
+
+
+def verify_clips(workers: int = 8, remove: bool = False):
+    """Перевірити цілісність усіх кліпів у папці clips"""
+    video_settings, _ = VideoProcessor._load_video_settings("tiktok_config.json")
+    verifier = ClipVerifier(get_probe_service(),
+                            int(video_settings["width"]),
+                            int(video_settings["height"]))
+    broken = verifier.sweep(Path("clips"), workers)
+    if remove:
+        for path in broken:
+            path.unlink(missing_ok=True)
+        if broken:
+            logger.info(f"🗑️  Видалено {len(broken)} пошкоджених кліпів, "
+                        f"'process' наріже їх заново")
+
+
+def run_suite():
+    """Офлайн-тест режимів нарізання на синтетичних епізодах"""
+    report = benchmark_suite()
+    print_suite_report(report, load_previous_suite())
+
+
 def setup_project():
     """Початкове налаштування проекту"""
     logger.info("🔧 Налаштування проекту...")
@@ -93,7 +156,8 @@ def setup_project():
         serial_folder.mkdir(exist_ok=True)
         logger.info("📂 Скопіюйте ваші серіали у папку 'Serial'")
     else:
-        video_files = list(serial_folder.glob("*.mkv"))
+        video_files = MediaCatalog.scan(serial_folder,
+                                        VideoProcessor.VIDEO_EXTENSIONS)
         logger.info(f"📺 Знайдено {len(video_files)} відеофайлів")
     
     logger.info("✅ Налаштування завершено!")
@@ -101,15 +165,111 @@ def setup_project():
 
 def main():
     """Головна функція"""
+    setup_logging()
     parser = argparse.ArgumentParser(description='TikTok Bot')
     parser.add_argument(
         'command',
-        choices=['setup', 'process', 'run', 'post', 'upload'],
+        choices=['setup', 'process', 'run', 'post', 'upload', 'bench',
+                 'verify', 'worker'],
         help='Команда для виконання'
     )
     parser.add_argument(
         '--file',
-        help='Шлях до конкретного файлу для завантаження'
+        help='Шлях до конкретного файлу для завантаження (або для тесту bench)'
+    )
+    parser.add_argument(
+        '--mode',
+        choices=['segment', 'seek', 'smart'],
+        default='segment',
+        help='Режим нарізання: segment - одне декодування епізоду, '
+             'seek - окремий прохід FFmpeg на кожен кліп, '
+             'smart - перекодування лише початку кліпа до ключового кадру'
+    )
+    parser.add_argument(
+        '--snap',
+        type=float,
+        default=0.0,
+        help='У режимі smart зсувати межі кліпів до ключового кадру, '
+             'якщо він ближче за вказану кількість секунд'
+    )
+    parser.add_argument(
+        '--profile',
+        help='Профіль кодування з encoding_profiles (за замовчуванням '
+             'video_settings.profile)'
+    )
+    parser.add_argument(
+        '--profiles',
+        help="Для команди 'bench': профілі через кому (за замовчуванням усі)"
+    )
+    parser.add_argument(
+        '--start',
+        type=float,
+        default=0.0,
+        help="Для команди 'bench': початок фрагмента в секундах"
+    )
+    parser.add_argument(
+        '--duration',
+        type=float,
+        default=20.0,
+        help="Для команди 'bench': тривалість фрагмента в секундах"
+    )
+    parser.add_argument(
+        '--suite',
+        action='store_true',
+        help="Для команди 'bench': прогнати всі режими нарізання на "
+             "синтетичних епізодах і зберегти результати в bench_results/"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Кількість епізодів, що обробляються паралельно'
+    )
+    parser.add_argument(
+        '--threads',
+        type=int,
+        default=0,
+        help='Потоки FFmpeg на один процес (0 - поділити ядра порівну)'
+    )
+    parser.add_argument(
+        '--with-processing',
+        action='store_true',
+        help="Для команди 'run': нарізати нові відео паралельно з публікацією"
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help="Для команди 'run': стежити за папкою Serial і нарізати нові "
+             "епізоди, щойно вони скопійовані"
+    )
+    parser.add_argument(
+        '--jit',
+        action='store_true',
+        help="Для команди 'process': лише запланувати кліпи в черзі, кожен "
+             "рендериться перед своїм часом публікації"
+    )
+    parser.add_argument(
+        '--distributed',
+        action='store_true',
+        help="Для команди 'process': поставити кліпи в чергу й нарізати їх "
+             "--workers процесами; інші процеси цієї машини допомагають "
+             "командою 'worker'"
+    )
+    parser.add_argument(
+        '--wait',
+        action='store_true',
+        help="Для команди 'worker': чекати на нові кліпи в черзі замість "
+             "завершення"
+    )
+    parser.add_argument(
+        '--remove',
+        action='store_true',
+        help="Для команди 'verify': видалити пошкоджені кліпи"
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Нарізати всі епізоди заново, ігноруючи каталог'
     )
     
     args = parser.parse_args()
@@ -118,11 +278,28 @@ def main():
         if args.command == 'setup':
             setup_project()
         elif args.command == 'process':
-            asyncio.run(process_videos())
+            asyncio.run(process_videos(
+                args.mode, args.workers, args.threads, not args.force,
+                args.snap, args.profile, args.jit, args.distributed
+            ))
+        elif args.command == 'worker':
+            asyncio.run(run_workers(args.mode, args.workers, args.threads,
+                                    args.snap, args.profile, args.wait))
         elif args.command == 'run':
-            asyncio.run(run_bot())
+            asyncio.run(run_bot(
+                args.with_processing, args.watch, args.mode, args.workers,
+                args.threads, not args.force, args.snap, args.profile
+            ))
         elif args.command == 'post':
             asyncio.run(post_now())
+        elif args.command == 'bench':
+            if args.suite:
+                run_suite()
+            else:
+                run_benchmark(args.file, args.start, args.duration,
+                              args.profiles)
+        elif args.command == 'verify':
+            verify_clips(remove=args.remove)
         elif args.command == 'upload':
             if args.file:
                 asyncio.run(post_specific(args.file))
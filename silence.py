@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Межі кліпів у паузах звуку
+"""
+
+import subprocess
+import logging
+from pathlib import Path
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Аудіо для аналізу: моно 8 кГц, вікна по 50 мс
+SAMPLE_RATE = 8000
+WINDOW = 0.05
+
+# Пауза має тривати хоча б стільки, щоб у неї потрапила межа
+MIN_PAUSE = 0.3
+# Штраф (дБ за секунду) за відхилення межі від номінальної тривалості
+DRIFT_PENALTY = 0.5
+# Рівень цифрової тиші (дБ), щоб уникнути log(0)
+FLOOR_DB = -100.0
+
+
+def analyze_energy(path: Path):
+    """
+    Енергія звуку джерела по вікнах WINDOW за один прохід лише по аудіо
+
+    Аудіо декодується у моно 8 кГц, тож аналіз коштує малу частку
+    кодування відео.
+
+    Returns:
+        Масив NumPy рівнів у дБ (порожній, якщо аудіо немає)
+    """
+    import numpy as np
+
+    result = subprocess.run(
+        ['ffmpeg', '-v', 'error', '-i', str(path), '-vn', '-sn', '-dn',
+         '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', '-'],
+        capture_output=True
+    )
+    samples = np.frombuffer(result.stdout, dtype=np.int16)
+    size = round(SAMPLE_RATE * WINDOW)
+    count = len(samples) // size
+    if not count:
+        return np.zeros(0)
+
+    blocks = samples[:count * size].astype(np.float32).reshape(count, size) / 32768.0
+    power = np.mean(blocks * blocks, axis=1)
+    return np.maximum(10 * np.log10(power + 1e-12), FLOOR_DB)
+
+
+def plan_boundaries(energy, duration: float, min_length: float,
+                    max_length: float, target: float,
+                    start: float = 0.0) -> List[float]:
+    """
+    Вибрати межі кліпів у найтихіших місцях
+
+    Кожна наступна межа шукається серед вікон [min_length, max_length]
+    від попередньої: найнижча згладжена енергія з невеликим штрафом за
+    віддаленість від target. Межі вибираються так, щоб хвіст епізоду
+    теж став кліпом; відкидається лише залишок, коротший за min_length.
+    Якщо задано start, плануються лише кліпи відрізка [start, duration].
+
+    Returns:
+        Межі від start до кінця останнього кліпа (порожній - кліпів немає)
+    """
+    import numpy as np
+
+    # Згладжування: короткий провал між складами не вважається паузою
+    width = max(1, round(MIN_PAUSE / WINDOW))
+    smooth = np.convolve(energy, np.ones(width) / width, mode='same')
+    times = (np.arange(len(smooth)) + 0.5) * WINDOW
+
+    boundaries = [round(start, 3)]
+    position = start
+    while duration - position > max_length:
+        low = position + min_length
+        # Не залишати хвіст, коротший за min_length
+        high = min(position + max_length, duration - min_length)
+        # Залишок не ділиться на два кліпи: останній кліп закінчується
+        # у найтихішому місці, решта відкидається
+        final = high < low
+        if final:
+            high = min(position + max_length, duration)
+        first, last = int(low / WINDOW), int(high / WINDOW) + 1
+        candidates = smooth[first:last]
+        if len(candidates):
+            cost = candidates + DRIFT_PENALTY * np.abs(
+                times[first:last] - (position + target)
+            )
+            cut = float(times[first + int(cost.argmin())])
+        else:
+            # Аудіо коротше за відео - ділити рівномірно
+            cut = position + target
+        boundaries.append(round(cut, 3))
+        position = cut
+        if final:
+            return boundaries
+
+    if duration - position >= min_length:
+        boundaries.append(round(duration, 3))
+    return boundaries if len(boundaries) > 1 else []
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Облік часу, втраченого на завислі кодування та завантаження
+"""
+
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StallLog:
+    """
+    Завислі задачі у SQLite (та сама база, що й каталог)
+
+    Кожен запис - задача, зупинена через відсутність прогресу: FFmpeg
+    (encode) або завантаження в TikTok (upload), і скільки секунд вона
+    працювала марно до зупинки (для FFmpeg - від останнього прогресу).
+    """
+
+    def __init__(self, db_file: str = "media_catalog.db"):
+        self.conn = sqlite3.connect(db_file, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS stalls (
+                    kind TEXT NOT NULL,
+                    label TEXT NOT NULL,
+                    lost_seconds REAL NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            """)
+
+    def close(self):
+        """Закрити з'єднання з базою"""
+        self.conn.close()
+
+    def record(self, kind: str, label: str, lost_seconds: float):
+        """Записати зупинену задачу"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO stalls (kind, label, lost_seconds, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (kind, label, lost_seconds, datetime.now().isoformat())
+            )
+
+    def summary(self) -> Dict[str, Tuple[int, float]]:
+        """Кількість зависань і втрачені секунди для кожного типу задач"""
+        rows = self.conn.execute(
+            "SELECT kind, COUNT(*), SUM(lost_seconds) FROM stalls GROUP BY kind"
+        ).fetchall()
+        return {kind: (count, lost) for kind, count, lost in rows}
@@ -7,6 +7,11 @@ import json
 from pathlib import Path
 from datetime import datetime
 
+from media_cache import ProbeService, get_probe_service
+from job_journal import JobJournal
+from stall_log import StallLog
+from tiktok_bot import VideoProcessor, ScheduleManager
+
 def check_bot_status():
     """Перевірити поточний статус бота"""
     print("📊 Статус TikTok Бота")
@@ -22,10 +27,15 @@ def check_bot_status():
         
         if schedule['queue']:
             print("\n📹 Наступні кліпи:")
-            for i, clip in enumerate(schedule['queue'][:3], 1):
-                clip_name = Path(clip).name
-                exists = "✅" if Path(clip).exists() else "❌"
-                print(f"   {i}. {exists} {clip_name}")
+            for i, entry in enumerate(schedule['queue'][:3], 1):
+                clip = ScheduleManager.entry_path(entry)
+                if clip.exists():
+                    exists = "✅"
+                elif ScheduleManager.is_virtual(entry):
+                    exists = "🕓"  # буде відрендерено перед публікацією
+                else:
+                    exists = "❌"
+                print(f"   {i}. {exists} {clip.name}")
         
         # Час наступної публікації
         now = datetime.now()
@@ -47,14 +57,50 @@ def check_bot_status():
     except FileNotFoundError:
         print("❌ Файл schedule.json не знайдено")
     
-    # Перевірити кліпи
+    # Кеш FFprobe відкривається, лише якщо є що перевіряти
+    serial_dir = Path('Serial')
     clips_dir = Path('clips')
+    if serial_dir.exists() or clips_dir.exists():
+        probe_service = get_probe_service()
+    
+    # Перевірити бібліотеку серіалів (метадані з кешу FFprobe)
+    if serial_dir.exists():
+        probes = probe_service.scan_directory(
+            serial_dir, VideoProcessor.VIDEO_EXTENSIONS
+        )
+        durations = [ProbeService.duration(p) or 0 for p in probes.values() if p]
+        unreadable = sum(1 for p in probes.values() if p is None)
+        print(f"\n📺 Епізодів у бібліотеці: {len(probes)} "
+              f"({sum(durations) / 3600:.1f} год)")
+        if unreadable:
+            print(f"   ⚠️  Не вдалося прочитати: {unreadable}")
+    
+    # Перевірити кліпи
     if clips_dir.exists():
         clips = list(clips_dir.glob('*.mp4'))
-        print(f"\n🎬 Всього кліпів у папці: {len(clips)}")
+        probes = probe_service.probe_many(clips)
+        total = sum(ProbeService.duration(p) or 0 for p in probes.values() if p)
+        print(f"\n🎬 Всього кліпів у папці: {len(clips)} "
+              f"({total / 60:.0f} хв контенту)")
     else:
         print("\n❌ Папка clips не знайдена")
     
+    # Перевірити журнал нарізання
+    if Path('media_catalog.db').exists():
+        journal = JobJournal('media_catalog.db')
+        summary = journal.summary()
+        journal.close()
+        if summary.get('encoding') or summary.get('failed'):
+            print(f"   ⚠️  Незавершені кліпи: {summary.get('encoding', 0)}, "
+                  f"невдалі: {summary.get('failed', 0)}")
+        stalls = StallLog('media_catalog.db')
+        stall_summary = stalls.summary()
+        stalls.close()
+        names = {'encode': 'кодування', 'upload': 'завантаження'}
+        for kind, (count, lost) in stall_summary.items():
+            print(f"   ⏱️  Зависання ({names.get(kind, kind)}): {count}, "
+                  f"втрачено {lost / 60:.1f} хв")
+    
     # Перевірити API
     try:
         from tiktok_api import TikTokAPIClient
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Субтитри епізодів для вшивання в кліпи
+"""
+
+import subprocess
+import tempfile
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Текстові формати, які FFmpeg перетворює в ASS (PGS/DVD - це картинки)
+TEXT_CODECS = ('subrip', 'ass', 'ssa', 'mov_text', 'webvtt', 'text')
+EXTERNAL_EXTENSIONS = ('.ass', '.ssa', '.srt', '.vtt')
+
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: {width}
+PlayResY: {height}
+WrapStyle: 0
+ScaledBorderAndShadow: yes
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,{font_size},&H00FFFFFF,&H000000FF,&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,4,1,2,60,60,{margin},1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+
+def find_subtitles(video_path: Path, probe: Dict,
+                   selector: Union[bool, str]) -> Optional[Tuple[Path, int]]:
+    """
+    Знайти субтитри епізоду
+
+    Спершу шукається зовнішній файл поруч з епізодом (епізод.srt або
+    епізод.<мова>.srt), далі - текстова доріжка в контейнері.
+
+    Args:
+        selector: True - будь-які субтитри, рядок - код мови (ukr, eng)
+
+    Returns:
+        (файл, номер субтитрової доріжки в ньому) або None
+    """
+    language = selector if isinstance(selector, str) else None
+    names = [f"{video_path.stem}.{language}" if language else video_path.stem]
+    if language:
+        names.append(video_path.stem)
+    for name in names:
+        for extension in EXTERNAL_EXTENSIONS:
+            external = video_path.with_name(name + extension)
+            if external.exists():
+                return external, 0
+
+    subtitle_streams = [s for s in probe.get('streams', [])
+                        if s.get('codec_type') == 'subtitle']
+    for number, stream in enumerate(subtitle_streams):
+        if stream.get('codec_name') not in TEXT_CODECS:
+            continue
+        if language and stream.get('tags', {}).get('language') != language:
+            continue
+        return video_path, number
+
+    if subtitle_streams:
+        logger.info(f"Немає текстових субтитрів {video_path.name} "
+                    f"(графічні доріжки не підтримуються)")
+    return None
+
+
+def _ass_time(value: str) -> float:
+    """Час ASS (h:mm:ss.cc) у секунди"""
+    hours, minutes, seconds = value.strip().split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _format_time(seconds: float) -> str:
+    """Секунди у час ASS (h:mm:ss.cc)"""
+    centiseconds = max(0, round(seconds * 100))
+    hours, rest = divmod(centiseconds, 360000)
+    minutes, rest = divmod(rest, 6000)
+    return f"{hours}:{minutes:02d}:{rest // 100:02d}.{rest % 100:02d}"
+
+
+def extract_events(path: Path, stream: int = 0) -> List[List]:
+    """
+    Прочитати події субтитрів (FFmpeg перетворює будь-який текстовий
+    формат в ASS, тож розбирається лише один формат)
+
+    Returns:
+        Відсортований список [початок, кінець, текст ASS]
+    """
+    result = subprocess.run(
+        ['ffmpeg', '-v', 'error', '-i', str(path), '-map', f'0:s:{stream}',
+         '-f', 'ass', '-'],
+        capture_output=True, text=True, errors='replace', check=True
+    )
+    events = []
+    for line in result.stdout.splitlines():
+        if not line.startswith('Dialogue:'):
+            continue
+        fields = line[len('Dialogue:'):].split(',', 9)
+        if len(fields) < 10:
+            continue
+        start, end = _ass_time(fields[1]), _ass_time(fields[2])
+        text = fields[9].strip()
+        if text and end > start:
+            events.append([round(start, 2), round(end, 2), text])
+    events.sort()
+    return events
+
+
+def write_clip_subtitles(events: List[List], start: float, length: float,
+                         width: int, height: int, font_size: int,
+                         margin: int) -> Optional[Path]:
+    """
+    Записати субтитри відрізка у тимчасовий ASS-файл
+
+    Час подій зсувається на початок відрізка (кліп починається з 0).
+    Стиль задається для кадру 9:16: роздільність сценарію дорівнює
+    роздільності кліпа, тож розмір шрифту - у пікселях.
+
+    Returns:
+        Шлях до файлу (видаляє викликач) або None, якщо подій немає
+    """
+    end = start + length
+    lines = [
+        f"Dialogue: 0,{_format_time(max(event_start, start) - start)},"
+        f"{_format_time(min(event_end, end) - start)},Default,,0,0,0,,{text}"
+        for event_start, event_end, text in events
+        if event_end > start and event_start < end
+    ]
+    if not lines:
+        return None
+
+    # Системна тимчасова папка: у назві немає символів, які довелося б
+    # екранувати в описі фільтра
+    with tempfile.NamedTemporaryFile('w', suffix='.ass', prefix='subs_',
+                                     delete=False, encoding='utf-8') as f:
+        f.write(ASS_HEADER.format(width=width, height=height,
+                                  font_size=font_size, margin=margin))
+        f.write("\n".join(lines) + "\n")
+    return Path(f.name)
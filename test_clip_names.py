@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Тест назв кліпів для однойменних епізодів у різних папках серіалів
+"""
+
+import json
+import subprocess
+import tempfile
+from pathlib import Path
+
+from tiktok_bot import VideoProcessor
+
+
+def _make_episode(path: Path, duration: int = 4):
+    """Синтетичний епізод (FFmpeg lavfi: testsrc2 + sine)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    subprocess.run(
+        ['ffmpeg', '-v', 'error', '-y',
+         '-f', 'lavfi', '-i', f"testsrc2=s=320x180:r=30:d={duration}",
+         '-f', 'lavfi', '-i', f"sine=d={duration}",
+         '-c:v', 'libx264', '-preset', 'ultrafast', '-c:a', 'aac',
+         '-shortest', str(path)],
+        check=True
+    )
+
+
+def test_same_stem_sources_do_not_collide():
+    """Serial/ep1.mp4 і Serial/ShowB/ep1.mp4 пишуть різні кліпи"""
+    print("🧪 Тестування назв кліпів однойменних епізодів...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        first = root / "Serial" / "ep1.mp4"
+        second = root / "Serial" / "ShowB" / "ep1.mp4"
+        _make_episode(first)
+        _make_episode(second)
+        config = root / "config.json"
+        config.write_text(json.dumps({"video_settings": {
+            "normalize_audio": False, "verify_clips": False
+        }}))
+
+        processor = VideoProcessor(
+            input_dir=str(root / "Serial"), output_dir=str(root / "clips"),
+            catalog_file=str(root / "catalog.db"),
+            cache_file=str(root / "cache.db"), config_file=str(config)
+        )
+        assert set(processor.get_video_files()) == {first, second}
+
+        # Назви кліпів джерел у корені не змінюються
+        assert processor._clip_path(first, 1).name == "ep1_clip_001.mp4"
+        assert processor._clip_path(second, 1).name == "ShowB. ep1_clip_001.mp4"
+
+        clips = []
+        for source in (first, second):
+            clips += processor.cut_video_to_clips(source, clip_duration=2)
+        files = sorted((root / "clips").glob("*.mp4"))
+
+        print(f"📁 Кліпи: {[clip.name for clip in files]}")
+        assert len(clips) == 4
+        assert len(set(clips)) == 4
+        assert files == sorted(clips)
+        for source in (first, second):
+            assert processor.catalog.done_clips(
+                source, processor._job_settings[source]
+            ).keys() == {1, 2}
+
+
+if __name__ == "__main__":
+    test_same_stem_sources_do_not_collide()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Тест плану кліпів: нарізані кліпи визначаються відрізком джерела
+"""
+
+import asyncio
+import tempfile
+from pathlib import Path
+
+from job_journal import JobJournal
+from media_catalog import MediaCatalog
+from tiktok_bot import VideoProcessor
+
+
+def _processor(root: Path) -> VideoProcessor:
+    """Обробник без каталогу з фіксованими межами кліпів"""
+    return VideoProcessor(input_dir=str(root / "Serial"),
+                          output_dir=str(root / "clips"), catalog_file=None,
+                          cache_file=str(root / "cache.db"), config_file=None)
+
+
+def test_unchanged_plan_keeps_numbers():
+    """Кліпи, що збігаються з планом, не змінюють план"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = _processor(Path(tmp))
+        plan = asyncio.run(processor._plan_spans(
+            Path(tmp) / "ep1.mp4", 300.0, 60, [], [],
+            {1: (0.0, 60.0), 2: (60.0, 60.0), 3: None}
+        ))
+        assert plan == {i: (60.0 * (i - 1), 60.0) for i in range(1, 6)}
+
+
+def test_late_intro_replans_only_remainder():
+    """Заставку знайдено після нарізання: старі кліпи лишаються"""
+    print("🧪 Тестування плану після пізно знайденої заставки...")
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = _processor(Path(tmp))
+        cut = {1: (0.0, 60.0), 3: (120.0, 60.0)}
+        plan = asyncio.run(processor._plan_spans(
+            Path(tmp) / "ep1.mp4", 300.0, 60, [], [[0.0, 45.0]], cut
+        ))
+        print(f"📋 План: {plan}")
+        assert plan[1] == cut[1] and plan[3] == cut[3]
+        # Нові кліпи - лише проміжки між нарізаними, з новими номерами
+        assert {i: plan[i] for i in plan if i not in cut} == {
+            4: (60.0, 60.0), 5: (180.0, 60.0), 6: (240.0, 60.0)
+        }
+        assert asyncio.run(processor._fully_cut(
+            Path(tmp) / "ep1.mp4", 300.0, 60, [[0.0, 45.0]], plan
+        ))
+        assert not asyncio.run(processor._fully_cut(
+            Path(tmp) / "ep1.mp4", 300.0, 60, [[0.0, 45.0]], cut
+        ))
+
+
+def test_catalog_returns_clip_spans():
+    """Каталог повертає відрізок кожного кліпа (None для старих записів)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "ep1.mp4"
+        source.write_bytes(b"episode")
+        clip = Path(tmp) / "ep1_clip_001.mp4"
+        clip.write_bytes(b"clip")
+        catalog = MediaCatalog(str(Path(tmp) / "catalog.db"))
+        catalog.refresh_source(source)
+        catalog.record_clips(source, "s", {1: clip}, {1: (0.0, 60.0)})
+        catalog.record_clips(source, "s", {2: clip})
+        assert catalog.done_clips(source, "s") == {1: (0.0, 60.0), 2: None}
+        catalog.mark_uploaded(clip)
+        assert catalog.uploaded_spans(source) == {1: (0.0, 60.0), 2: None}
+
+
+def test_journal_drops_jobs_outside_plan():
+    """Незавершені задачі старого плану видаляються, готові - ні"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "ep1.mp4"
+        journal = JobJournal(str(Path(tmp) / "catalog.db"))
+        journal.plan(source, "s", [1, 2, 3])
+        journal.finish(source, 1)
+        journal.plan(source, "s", [4, 5])
+        rows = journal.conn.execute(
+            "SELECT clip_index, state FROM jobs ORDER BY clip_index"
+        ).fetchall()
+        assert [tuple(row) for row in rows] == [
+            (1, 'done'), (4, 'pending'), (5, 'pending')
+        ]
+
+
+if __name__ == "__main__":
+    test_unchanged_plan_keeps_numbers()
+    test_late_intro_replans_only_remainder()
+    test_catalog_returns_clip_spans()
+    test_journal_drops_jobs_outside_plan()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Тест вибору обкладинки: час кадру з його pts, ліміт samples
+"""
+
+import subprocess
+import tempfile
+from pathlib import Path
+
+from cover_selector import CoverSelector
+from media_cache import get_probe_service
+
+
+def _clip(tmp: str, gop: int) -> Path:
+    """10 с затемнення, де лише секунда 6-7 має зображення"""
+    path = Path(tmp) / f"clip_{gop}.mp4"
+    subprocess.run(
+        ['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i',
+         "testsrc=s=320x180:r=24:d=10,"
+         "drawbox=color=black:t=fill:enable='not(between(t,6,6.99))'",
+         '-c:v', 'libx264', '-preset', 'ultrafast', '-g', str(gop),
+         '-sc_threshold', '0', str(path)],
+        check=True
+    )
+    return path
+
+
+def test_keyframe_candidates_honour_samples():
+    """Ключові кадри щосекунди: кандидатів не більше samples, час - з pts"""
+    print("🧪 Тестування вибору обкладинки...")
+    with tempfile.TemporaryDirectory() as tmp:
+        service = get_probe_service(str(Path(tmp) / "cache.db"))
+        clip = _clip(tmp, 24)
+        selector = CoverSelector(service, samples=4)
+        times, frames = selector._read_frames(clip, 10.0)
+        assert times.tolist() == [0.0, 3.0, 6.0, 9.0]
+        assert frames.shape == (4, CoverSelector.THUMB_HEIGHT,
+                                CoverSelector.THUMB_WIDTH)
+        assert selector.select(clip) == 6000
+
+
+def test_sampled_candidates_without_keyframes():
+    """Ключових кадрів замало: рівномірні кадри з повного декодування"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = get_probe_service(str(Path(tmp) / "cache.db"))
+        clip = _clip(tmp, 240)
+        selector = CoverSelector(service, samples=10)
+        times, _ = selector._read_frames(clip, 10.0)
+        assert times.tolist() == [float(t) for t in range(10)]
+        assert selector.select(clip) == 6000
+
+
+if __name__ == "__main__":
+    test_keyframe_candidates_honour_samples()
+    test_sampled_candidates_without_keyframes()
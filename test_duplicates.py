@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Тест індексу дублікатів: зростання матриці та підписи старого плану
+"""
+
+import tempfile
+from pathlib import Path
+
+from duplicates import FRAMES_PER_CLIP, DuplicateIndex
+
+SOURCE = Path("/library/Serial/ep1.mp4")
+
+
+def _signature(seed: int):
+    """Підпис з далеких один від одного хешів"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    return [int(h) for h in rng.integers(0, 2 ** 63, FRAMES_PER_CLIP)]
+
+
+def test_index_grows_past_capacity():
+    """Підписи, додані по одному, всі знаходяться після розширення матриці"""
+    with tempfile.TemporaryDirectory() as tmp:
+        index = DuplicateIndex(str(Path(tmp) / "catalog.db"))
+        count = DuplicateIndex.INITIAL_CAPACITY * 2 + 3
+        for i in range(count):
+            assert index.find(_signature(i)) is None
+            index.add(SOURCE, i, _signature(i), (60.0 * i, 60.0))
+        assert len(index) == count
+        assert index.find(_signature(count - 1))[:2] == (str(SOURCE), count - 1)
+        assert index.find(_signature(5), (SOURCE, 5)) is None
+
+
+def test_replanned_source_is_not_its_own_duplicate():
+    """Після зміни плану старі підписи джерела видаляються (й в інших процесах)"""
+    print("🧪 Тестування підписів після зміни плану...")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = str(Path(tmp) / "catalog.db")
+        index = DuplicateIndex(db)
+        other = DuplicateIndex(db)
+        index.add(SOURCE, 1, _signature(1), (0.0, 60.0))
+        index.add(SOURCE, 2, _signature(2), (60.0, 60.0))
+        assert other.find(_signature(2), (SOURCE, 3)) is not None
+
+        # Новий план: кліп 1 той самий, відрізок 60-120 тепер кліп 3
+        assert index.retain(SOURCE, {1: (0.0, 60.0), 3: (60.0, 60.0)}) == 1
+        assert index.find(_signature(2), (SOURCE, 3)) is None
+        assert other.find(_signature(2), (SOURCE, 3)) is None
+        assert other.find(_signature(1))[:2] == (str(SOURCE), 1)
+        # Відрізок номера змінився - підпис теж застарів
+        assert index.retain(SOURCE, {1: (15.0, 60.0)}) == 1
+        assert len(other) == 0
+        index.add(SOURCE, 1, _signature(1), (15.0, 60.0))
+        assert other.find(_signature(1))[:2] == (str(SOURCE), 1)
+
+
+if __name__ == "__main__":
+    test_index_grows_past_capacity()
+    test_replanned_source_is_not_its_own_duplicate()
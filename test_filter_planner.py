@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Тест планувальника фільтрів: обрізання до масштабування
+"""
+
+import json
+import subprocess
+import tempfile
+from pathlib import Path
+
+from filter_planner import legacy_chain, plan_filters
+
+
+def _probe(width: int, height: int, rate: str = "30/1", **video) -> dict:
+    """Метадані FFprobe з одним відеопотоком"""
+    stream = {'codec_type': 'video', 'width': width, 'height': height,
+              'avg_frame_rate': rate, 'r_frame_rate': rate}
+    stream.update(video)
+    return {'streams': [stream]}
+
+
+def test_crop_before_scale():
+    """Широкий кадр обрізається до 9:16 і масштабується вже обрізаним"""
+    print("🧪 Тестування ланцюжка фільтрів...")
+    plan = plan_filters(_probe(1920, 1080), 1080, 1920, 30)
+    print(f"📋 -vf {plan['vf']}")
+    assert plan['vf'] == "crop=608:1080,scale=1080:1920:flags=bicubic,setsar=1"
+    assert plan['r'] is None
+    assert plan['pixels'] < plan['baseline']
+
+
+def test_rate_conversion_placement():
+    """Зайві кадри відкидаються до масштабування, бракуючі - після"""
+    faster = plan_filters(_probe(1920, 1080, "60/1"), 1080, 1920, 30)
+    assert faster['vf'].startswith("fps=30,crop=")
+    slower = plan_filters(_probe(1920, 1080, "25/1"), 1080, 1920, 30)
+    assert slower['vf'].endswith(",setsar=1,fps=30")
+    # Змінна частота кадрів - теж до сталої
+    variable = plan_filters(_probe(1920, 1080, "30/1", r_frame_rate="60/1"),
+                            1080, 1920, 30)
+    assert "fps=30" in variable['vf']
+    assert "fps" not in plan_filters(_probe(1920, 1080), 1080, 1920, None)['vf']
+
+
+def test_interlaced_rotated_and_anamorphic():
+    """Деінтерлейсинг першим; поворот і форма пікселя змінюють обрізання"""
+    interlaced = plan_filters(_probe(1920, 1080, field_order='tt'), 1080, 1920, 30)
+    assert interlaced['vf'].startswith("yadif=deint=interlaced,crop=608:1080,")
+    rotated = plan_filters(_probe(1920, 1080, tags={'rotate': '90'}),
+                           1080, 1920, 30)
+    assert rotated['vf'] == "null"
+    # HDV 1440x1080 з пікселем 4:3 - це кадр 16:9
+    anamorphic = plan_filters(_probe(1440, 1080, sample_aspect_ratio='4:3'),
+                              1080, 1920, 30)
+    assert anamorphic['vf'].startswith("crop=456:1080,scale=1080:1920")
+    assert anamorphic['vf'].endswith("setsar=1")
+
+
+def test_reframe_and_fallback():
+    """Рухоме вікно - через sendcmd; без метаданих - універсальний ланцюжок"""
+    plan = plan_filters(_probe(1920, 1080), 1080, 1920, 30, ("crop.cmd", 0.25))
+    assert plan['vf'].startswith(
+        "sendcmd=f=crop.cmd,crop@reframe=608:1080:(in_w-out_w)*0.250,scale="
+    )
+    assert plan_filters(None, 1080, 1920, 30)['vf'] == legacy_chain(1080, 1920)
+
+
+def test_chain_renders_target_size():
+    """Ланцюжок на синтетичному джерелі дає кадр потрібного розміру"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "frame.png"
+        plan = plan_filters(_probe(640, 360, "25/1"), 180, 320, 30)
+        subprocess.run(
+            ['ffmpeg', '-v', 'error', '-f', 'lavfi',
+             '-i', 'testsrc=size=640x360:rate=25:duration=0.2',
+             '-vf', plan['vf'], '-frames:v', '1', str(output)],
+            check=True
+        )
+        probe = json.loads(subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_streams', '-of', 'json', str(output)],
+            capture_output=True, text=True, check=True
+        ).stdout)
+        stream = probe['streams'][0]
+        assert (stream['width'], stream['height']) == (180, 320)
+
+
+if __name__ == "__main__":
+    test_crop_before_scale()
+    test_rate_conversion_placement()
+    test_interlaced_rotated_and_anamorphic()
+    test_reframe_and_fallback()
+    test_chain_renders_target_size()
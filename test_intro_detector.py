@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Тест пошуку спільних заставок за сузір'ями спектральних піків
+"""
+
+from intro_detector import SAMPLE_RATE, fingerprint_samples, match_part, shared_ranges
+
+
+def _tones(seconds: float, seed: int):
+    """Синтетична "музика": акорди з трьох випадкових тонів по 250 мс"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(0.25 * SAMPLE_RATE)) / SAMPLE_RATE
+    notes = [np.sin(2 * np.pi * rng.uniform(200, 2500, 3)[:, None] * t).mean(axis=0)
+             for _ in range(int(seconds / 0.25))]
+    return (np.concatenate(notes) * 0.5).astype(np.float32)
+
+
+def _part(samples, start: float = 0.0):
+    """Відбиток частини епізоду, що починається в start"""
+    part = fingerprint_samples(samples)
+    part['start'] = start
+    return part
+
+
+def _episodes():
+    """Два епізоди з однією заставкою (30 с) у різних місцях"""
+    import numpy as np
+    intro = _tones(30, 1)
+    first = np.concatenate([_tones(5, 2), intro, _tones(40, 3)])
+    second = np.concatenate([_tones(20, 4), intro, _tones(25, 5)])
+    return first, second
+
+
+def test_shared_intro_found_at_own_offset():
+    """Заставка знаходиться в кожному епізоді на власному місці"""
+    print("🧪 Тестування пошуку заставки...")
+    first, second = _episodes()
+    ranges = match_part(_part(first), _part(second))
+    print(f"📋 Діапазони: {ranges}")
+    assert len(ranges) == 1
+    start, end = ranges[0]
+    assert abs(start - 5.0) < 0.5 and abs(end - 35.0) < 1.0
+    (start, end), = match_part(_part(second), _part(first))
+    assert abs(start - 20.0) < 0.5 and abs(end - 50.0) < 1.0
+
+
+def test_match_ignores_volume_and_uses_part_start():
+    """Гучність не впливає на хеші; діапазон у часі епізоду"""
+    first, second = _episodes()
+    (start, end), = match_part(_part(first * 0.2, 100.0), _part(second))
+    assert abs(start - 105.0) < 0.5 and abs(end - 135.0) < 1.0
+
+
+def test_unrelated_audio_does_not_match():
+    """Епізоди без спільної музики (чи без аудіо) не дають діапазонів"""
+    _, second = _episodes()
+    assert match_part(_part(_tones(75, 6)), _part(second)) == []
+    # Аудіо коротше за вікно STFT - відбиток порожній
+    assert match_part(_part(second[:500]), _part(second)) == []
+
+
+def test_shared_ranges_merges_references():
+    """Той самий діапазон з кількох референсів об'єднується"""
+    first, second = _episodes()
+    episode = {'head': _part(first), 'tail': _part(_tones(20, 8), 200.0)}
+    reference = {'head': _part(second), 'tail': _part(_tones(20, 9), 300.0)}
+    ranges = shared_ranges(episode, [reference, reference])
+    assert len(ranges) == 1 and abs(ranges[0][0] - 5.0) < 0.5
+
+
+if __name__ == "__main__":
+    test_shared_intro_found_at_own_offset()
+    test_match_ignores_volume_and_uses_part_start()
+    test_unrelated_audio_does_not_match()
+    test_shared_ranges_merges_references()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Тест оренд черги журналу задач і робочого процесу (підставний годинник)
+"""
+
+import asyncio
+import tempfile
+from pathlib import Path
+
+from clip_worker import ClipWorker
+from job_journal import JobJournal
+
+SOURCE = Path("/library/Serial/ep1.mp4")
+
+
+class FakeClock:
+    """Годинник, що рухається лише вручну"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _journal(tmp: str, clock: FakeClock) -> JobJournal:
+    """Журнал з однією задачею в черзі"""
+    journal = JobJournal(str(Path(tmp) / "catalog.db"), clock=clock)
+    journal.enqueue(SOURCE, "s", 60, {1: (0.0, 60.0)})
+    return journal
+
+
+def _job(journal: JobJournal):
+    """(стан, спроби, власник) єдиної задачі"""
+    row = journal.conn.execute("SELECT state, attempts, owner FROM jobs").fetchone()
+    return tuple(row)
+
+
+def test_expired_lease_is_reclaimed():
+    """Задачу забирає інший процес лише після кінця оренди"""
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        journal = _journal(tmp, clock)
+        assert journal.claim("a", 60)['clip_index'] == 1
+        clock.now += 30
+        assert journal.claim("b", 60) is None
+        assert journal.heartbeat("a", SOURCE, 1, 60)
+        clock.now += 59
+        assert journal.claim("b", 60) is None
+        clock.now += 2
+        assert journal.claim("b", 60)['clip_index'] == 1
+        assert _job(journal) == ('encoding', 2, 'b')
+        # Оренду втрачено: старий власник не подовжить і не звільнить її
+        assert not journal.heartbeat("a", SOURCE, 1, 60)
+        journal.release("a", SOURCE, 1, "пізно")
+        assert _job(journal) == ('encoding', 2, 'b')
+
+
+def test_attempts_cap_fails_crashing_clip():
+    """Кліп, що щоразу валить процес, після MAX_ATTEMPTS оренд - failed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        journal = _journal(tmp, clock)
+        for attempt in range(1, JobJournal.MAX_ATTEMPTS + 1):
+            assert journal.claim(f"w{attempt}", 60) is not None
+            assert _job(journal)[1] == attempt
+            clock.now += 61
+        assert journal.claim("last", 60) is None
+        state, attempts, _ = _job(journal)
+        assert (state, attempts) == ('failed', JobJournal.MAX_ATTEMPTS)
+        assert journal.exhausted(SOURCE) == {1}
+        assert journal.active() == 0
+
+
+def test_start_does_not_double_count_leased_attempt():
+    """start() рахує спробу лише поза орендою; release - без другої спроби"""
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        journal = _journal(tmp, clock)
+        journal.claim("a", 60)
+        journal.start(SOURCE, [1])
+        assert _job(journal)[:2] == ('encoding', 1)
+        journal.release("a", SOURCE, 1, "не збіглися налаштування")
+        assert _job(journal)[:2] == ('failed', 1)
+        # Локальне нарізання (без оренди) - нова спроба
+        journal.start(SOURCE, [1])
+        assert _job(journal)[:2] == ('encoding', 2)
+        journal.finish(SOURCE, 1)
+        assert _job(journal)[:2] == ('done', 0)
+        assert journal.claim("b", 60) is None
+
+
+class _SlowProcessor:
+    """Обробник, чий рендеринг не закінчується сам"""
+
+    def __init__(self, journal: JobJournal):
+        self.journal = journal
+        self.cancelled = False
+
+    async def render_clip_async(self, entry):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def test_worker_stops_on_lost_lease():
+    """Робочий процес зупиняє кодування, щойно оренду забрав інший"""
+    print("🧪 Тестування втрати оренди робочим процесом...")
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        journal = _journal(tmp, clock)
+        processor = _SlowProcessor(journal)
+        worker = ClipWorker(processor, name="a", lease=0.3)
+
+        async def scenario():
+            job = journal.claim("a", worker.lease)
+            task = asyncio.create_task(worker._process(job))
+            await asyncio.sleep(0.15)
+            # Процес "завис": оренда минула, задачу забрав інший
+            clock.now += 1
+            assert journal.claim("b", 60) is not None
+            return await asyncio.wait_for(task, timeout=2)
+
+        assert asyncio.run(scenario()) is False
+        assert processor.cancelled
+        assert _job(journal) == ('encoding', 2, 'b')
+
+
+if __name__ == "__main__":
+    test_expired_lease_is_reclaimed()
+    test_attempts_cap_fails_crashing_clip()
+    test_start_does_not_double_count_leased_attempt()
+    test_worker_stops_on_lost_lease()
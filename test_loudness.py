@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Тест гучності відрізків: гейтування EBU R128 і підсилення
+"""
+
+import subprocess
+import tempfile
+from pathlib import Path
+
+from loudness import analyze_loudness, linear_gain, segment_loudness
+
+
+def _table(momentary, peak=-10.0):
+    """Таблиця ebur128 з блоками кожні 100 мс від t=0.1"""
+    return {
+        'time': [round(0.1 * (i + 1), 3) for i in range(len(momentary))],
+        'momentary': list(momentary),
+        'peak': [peak] * len(momentary),
+    }
+
+
+def test_absolute_gate_drops_silence():
+    """Блоки тихіші за -70 LUFS не входять у гучність; тиша - None"""
+    table = _table([-23.0] * 20 + [-120.0] * 20)
+    assert abs(segment_loudness(table, 0.0, 4.0)['integrated'] + 23.0) < 1e-6
+    silent = segment_loudness(table, 2.0, 2.0)
+    assert silent['integrated'] is None
+    assert linear_gain(silent, -14.0, -1.0) == 0.0
+
+
+def test_relative_gate_drops_quiet_blocks():
+    """Блоки на 10 LU тихіші за середню гучність не враховуються"""
+    print("🧪 Тестування відносного гейтування...")
+    table = _table([-20.0] * 20 + [-40.0] * 20)
+    measurement = segment_loudness(table, 0.0, 4.0)
+    # Без відносного порогу вийшло б близько -23 LUFS
+    assert abs(measurement['integrated'] + 20.0) < 1e-6
+
+
+def test_segment_uses_only_whole_blocks():
+    """Блок 400 мс, що почався до відрізка, не враховується"""
+    # Гучно до 1.0 с: блоки t=1.1..1.3 ще захоплюють гучну частину
+    table = _table([-10.0] * 13 + [-30.0] * 27)
+    assert abs(segment_loudness(table, 1.0, 3.0)['integrated'] + 30.0) < 1e-6
+
+
+def test_gain_is_capped_by_peak():
+    """Підсилення не виводить пік за true_peak"""
+    assert linear_gain({'integrated': -30.0, 'peak': -20.0}, -14.0, -1.0) == 16.0
+    assert linear_gain({'integrated': -30.0, 'peak': -5.0}, -14.0, -1.0) == 4.0
+    assert linear_gain({'integrated': -10.0, 'peak': -1.0}, -14.0, -1.0) == -4.0
+
+
+def test_sine_loudness():
+    """Синус 1 кГц з піком -24.1 dBFS має гучність -27.1 LUFS"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sine.wav"
+        subprocess.run(
+            ['ffmpeg', '-v', 'error', '-f', 'lavfi',
+             '-i', 'sine=frequency=1000:duration=4', '-af', 'volume=0.5',
+             str(path)],
+            check=True
+        )
+        table = analyze_loudness(path)
+        measurement = segment_loudness(table, 0.0, 4.0)
+        assert abs(measurement['integrated'] + 27.1) < 0.2
+        assert abs(measurement['peak'] + 24.1) < 0.2
+
+
+if __name__ == "__main__":
+    test_absolute_gate_drops_silence()
+    test_relative_gate_drops_quiet_blocks()
+    test_segment_uses_only_whole_blocks()
+    test_gain_is_capped_by_peak()
+    test_sine_loudness()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Тест динамічного кадрування: траєкторія вікна та команди sendcmd
+"""
+
+import subprocess
+import tempfile
+from pathlib import Path
+
+from reframe import (ANALYSIS_FPS, MAX_PAN_SPEED, _smooth_shot, analyze_track,
+                     position_at, write_crop_commands)
+
+
+def _source(tmp: str, x: int) -> Path:
+    """Чорний кадр 16:9 з рухомою тестовою смугою в позиції x"""
+    path = Path(tmp) / f"source_{x}.mkv"
+    subprocess.run(
+        ['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i',
+         "color=black:s=320x180:r=8:d=4[bg];testsrc=s=60x180:r=8:d=4[fg];"
+         f"[bg][fg]overlay=x={x}:y=0",
+         '-c:v', 'mpeg4', '-q:v', '3', str(path)],
+        check=True
+    )
+    return path
+
+
+def test_track_follows_action():
+    """Вікно 9:16 іде за рухомою смугою; без запасу - центр"""
+    print("🧪 Тестування траєкторії кадрування...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = _source(tmp, 250)
+        right = analyze_track(source, 16 / 9, 9 / 16)
+        assert right['fps'] == ANALYSIS_FPS
+        assert len(right['positions']) == 4 * ANALYSIS_FPS
+        assert min(right['positions']) > 0.9
+        left = analyze_track(_source(tmp, 10), 16 / 9, 9 / 16)
+        assert max(left['positions']) < 0.1
+        # Кліп тієї ж пропорції: вікно не рухається
+        same = analyze_track(source, 16 / 9, 16 / 9)
+        assert set(same['positions']) == {0.5}
+
+
+def test_pan_speed_is_limited():
+    """У межах плану вікно рухається не швидше за MAX_PAN_SPEED"""
+    import numpy as np
+    positions = _smooth_shot(np.array([0.0] * 8 + [1.0] * 24))
+    assert np.all(np.abs(np.diff(positions)) <= MAX_PAN_SPEED / ANALYSIS_FPS + 1e-9)
+    assert positions[-1] > 0.9
+
+
+def test_crop_commands_for_segment():
+    """Команди відрізка: час від його початку, без повторів положення"""
+    track = {'fps': 4, 'positions': [0.5, 0.5, 0.2, 0.2, 0.2, 0.8, 0.8, 0.8]}
+    assert position_at(track, 1.3) == 0.8
+    assert position_at({'fps': 4, 'positions': []}, 1.0) == 0.5
+    commands = write_crop_commands(track, 0.25, 1.0)
+    try:
+        lines = commands.read_text(encoding='utf-8').splitlines()
+        assert lines == [
+            "0.000 reframe x (in_w-out_w)*0.500;",
+            "0.250 reframe x (in_w-out_w)*0.200;",
+            "1.000 reframe x (in_w-out_w)*0.800;",
+        ]
+    finally:
+        commands.unlink()
+    assert write_crop_commands({'fps': 4, 'positions': []}, 0.0, 1.0) is None
+
+
+def test_crop_commands_accepted_by_ffmpeg():
+    """Файл команд застосовується до crop@reframe без помилок"""
+    track = {'fps': 4, 'positions': [0.0, 0.0, 1.0, 1.0]}
+    commands = write_crop_commands(track, 0.0, 1.0)
+    try:
+        subprocess.run(
+            ['ffmpeg', '-v', 'error', '-xerror', '-f', 'lavfi',
+             '-i', 'testsrc=size=320x180:rate=8:duration=1',
+             '-vf', f"sendcmd=f={commands},crop@reframe=100:180:0,"
+                    "scale=90:160",
+             '-f', 'null', '-'],
+            check=True, capture_output=True
+        )
+    finally:
+        commands.unlink()
+
+
+if __name__ == "__main__":
+    test_track_follows_action()
+    test_pan_speed_is_limited()
+    test_crop_commands_for_segment()
+    test_crop_commands_accepted_by_ffmpeg()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Тест меж кліпів у паузах звуку
+"""
+
+import subprocess
+import tempfile
+from pathlib import Path
+
+from silence import WINDOW, analyze_energy, plan_boundaries
+
+
+def _energy(duration: float, pauses=(), level=-20.0):
+    """Рівні по вікнах WINDOW: рівний звук з паузами (початок, кінець)"""
+    import numpy as np
+    times = (np.arange(round(duration / WINDOW)) + 0.5) * WINDOW
+    energy = np.full(len(times), level)
+    for start, end in pauses:
+        energy[(times >= start) & (times < end)] = -90.0
+    return energy
+
+
+def test_boundaries_fall_into_pauses():
+    """Межа стає в паузу, а не на номінальну тривалість"""
+    print("🧪 Тестування меж у паузах...")
+    energy = _energy(100.0, [(35.0, 35.6), (70.0, 70.6)])
+    boundaries = plan_boundaries(energy, 100.0, 20, 40, 30)
+    print(f"📋 Межі: {boundaries}")
+    assert len(boundaries) == 4
+    assert boundaries[0] == 0.0 and boundaries[-1] == 100.0
+    assert 35.0 <= boundaries[1] <= 35.6
+    assert 70.0 <= boundaries[2] <= 70.6
+
+
+def test_tail_becomes_clip():
+    """Хвіст епізоду, не коротший за min_length, - окремий кліп"""
+    boundaries = plan_boundaries(_energy(65.0), 65.0, 20, 40, 30)
+    assert len(boundaries) == 3 and boundaries[-1] == 65.0
+    assert abs(boundaries[1] - 30.0) <= WINDOW
+
+
+def test_short_remainder_is_dropped():
+    """Залишок, що не ділиться на два кліпи, відкидається після паузи"""
+    energy = _energy(85.0, [(74.0, 74.6)])
+    boundaries = plan_boundaries(energy, 85.0, 30, 40, 40)
+    assert len(boundaries) == 3
+    assert 74.0 <= boundaries[2] <= 74.6
+    # Кожен кліп у межах [min_length, max_length]
+    lengths = [b - a for a, b in zip(boundaries, boundaries[1:])]
+    assert all(30 <= length <= 40 for length in lengths)
+
+
+def test_plan_from_start_and_too_short():
+    """Планування з середини джерела; закороткий відрізок - без кліпів"""
+    boundaries = plan_boundaries(_energy(100.0), 100.0, 20, 40, 30, start=45.0)
+    assert boundaries[0] == 45.0 and boundaries[-1] == 100.0
+    assert plan_boundaries(_energy(10.0), 10.0, 20, 40, 30) == []
+
+
+def test_energy_of_synthetic_pause():
+    """Пауза в синтетичному аудіо видна в енергії та стає межею"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "pause.wav"
+        subprocess.run(
+            ['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i',
+             "aevalsrc='0.5*sin(2*PI*440*t)*(lt(t,3)+gte(t,3.6))':d=8:s=8000",
+             str(path)],
+            check=True
+        )
+        energy = analyze_energy(path)
+        assert len(energy) == round(8 / WINDOW)
+        assert energy[int(3.2 / WINDOW)] < -90 < energy[int(1.0 / WINDOW)]
+        boundaries = plan_boundaries(energy, 8.0, 2, 5, 4)
+        assert 3.0 <= boundaries[1] <= 3.6
+
+
+if __name__ == "__main__":
+    test_boundaries_fall_into_pauses()
+    test_tail_becomes_clip()
+    test_short_remainder_is_dropped()
+    test_plan_from_start_and_too_short()
+    test_energy_of_synthetic_pause()
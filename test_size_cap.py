@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Тест стелі розміру кліпа: VBV-параметри з max_size_mb
+"""
+
+import json
+import subprocess
+import tempfile
+from pathlib import Path
+
+from tiktok_bot import VideoProcessor
+
+MIB = 1024 * 1024
+
+
+def _processor(root: Path, profile: dict, audio_bitrate: str = "128k") -> VideoProcessor:
+    """Обробник з єдиним профілем test"""
+    config = root / "config.json"
+    config.write_text(json.dumps({
+        "video_settings": {"audio_bitrate": audio_bitrate, "profile": "test"},
+        "encoding_profiles": {"test": profile},
+    }), encoding='utf-8')
+    return VideoProcessor(input_dir=str(root / "Serial"),
+                          output_dir=str(root / "clips"), catalog_file=None,
+                          cache_file=str(root / "cache.db"),
+                          config_file=str(config))
+
+
+def test_cap_fits_size_ceiling():
+    """maxrate * (тривалість + 2) з аудіо вміщується в max_size_mb"""
+    print("🧪 Тестування стелі розміру кліпа...")
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = _processor(Path(tmp), {"crf": 23, "max_size_mb": 15})
+        cap = processor._size_cap(60)
+        # Розмір за VBV: maxrate * T + bufsize, де bufsize = 2 * maxrate
+        total = cap * (60 + 2) + 128e3 * 60
+        assert total <= 15 * MIB * 8 * VideoProcessor.CONTAINER_OVERHEAD + 1
+        assert total > 15 * MIB * 8 * VideoProcessor.CONTAINER_OVERHEAD * 0.999
+        assert processor._size_cap(0) is None
+        # Замалий бюджет - нижня межа 100 кбіт/с
+        assert processor._size_cap(3600) == 100e3
+
+
+def test_cap_tightens_profile_vbv():
+    """Стеля знижує maxrate профілю, bufsize не більший за 2 * maxrate"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        loose = _processor(root, {"crf": 23, "maxrate": "3M", "bufsize": "6M",
+                                  "max_size_mb": 15})
+        options = loose._video_codec_options(60)
+        cap = loose._size_cap(60)
+        assert options['maxrate'] == f"{int(cap / 1000)}k"
+        assert options['bufsize'] == f"{int(2 * cap / 1000)}k"
+        # Округлені значення теж дотримуються стелі
+        maxrate = VideoProcessor._parse_bitrate(options['maxrate'])
+        bufsize = VideoProcessor._parse_bitrate(options['bufsize'])
+        assert maxrate * 60 + bufsize + 128e3 * 60 <= 15 * MIB * 8
+
+        tight = _processor(root, {"crf": 23, "maxrate": "1M", "bufsize": "1500k",
+                                  "max_size_mb": 15})
+        options = tight._video_codec_options(60)
+        assert (options['maxrate'], options['bufsize']) == ("1000k", "1500k")
+
+        unlimited = _processor(root, {"crf": 23})
+        assert 'maxrate' not in unlimited._video_codec_options(60)
+
+
+def test_encode_respects_ceiling():
+    """Шум (найгірший випадок для стиснення) не перевищує стелю розміру"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        processor = _processor(root, {"preset": "ultrafast", "crf": 10,
+                                      "max_size_mb": 0.25}, audio_bitrate="0")
+        options = processor._video_codec_options(4)
+        output = root / "noise.mp4"
+        subprocess.run(
+            ['ffmpeg', '-v', 'error', '-f', 'lavfi',
+             '-i', 'nullsrc=s=320x240:r=25:d=4,geq=random(1)*255:128:128',
+             '-c:v', 'libx264', '-preset', options['preset'],
+             '-crf', str(options['crf']), '-maxrate', options['maxrate'],
+             '-bufsize', options['bufsize'], str(output)],
+            check=True
+        )
+        assert output.stat().st_size <= 0.25 * MIB
+
+
+if __name__ == "__main__":
+    test_cap_fits_size_ceiling()
+    test_cap_tightens_profile_vbv()
+    test_encode_respects_ceiling()
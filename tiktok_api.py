@@ -6,6 +6,7 @@ TikTok API клієнт для завантаження відео
 
 import os
 import json
+import time
 import requests
 import logging
 from typing import Optional, Dict, Any
@@ -17,9 +18,18 @@ logger = logging.getLogger(__name__)
 class TikTokAPIClient:
     """Клієнт для роботи з TikTok Content Posting API"""
 
-    def __init__(self):
-        """Ініціалізація API клієнта"""
+    def __init__(self, timeout: float = 120):
+        """
+        Ініціалізація API клієнта
+
+        Args:
+            timeout: Скільки секунд чекати на з'єднання або наступну
+                порцію даних, перш ніж вважати запит завислим
+        """
         self.base_url = "https://open.tiktokapis.com"
+        self.timeout = timeout
+        # Секунди, втрачені на останнє завантаження, якщо воно зависло
+        self.stalled: Optional[float] = None
         self.client_id = os.getenv('TIKTOK_CLIENT_ID')
         self.client_secret = os.getenv('TIKTOK_CLIENT_SECRET')
         self.access_token = None
@@ -83,7 +93,8 @@ class TikTokAPIClient:
         }
 
         try:
-            response = requests.post(url, data=data)
+            response = requests.post(url, data=data,
+                                     timeout=self.timeout)
             response.raise_for_status()
 
             result = response.json()
@@ -118,7 +129,8 @@ class TikTokAPIClient:
         }
 
         try:
-            response = requests.post(url, data=data)
+            response = requests.post(url, data=data,
+                                     timeout=self.timeout)
             response.raise_for_status()
 
             result = response.json()
@@ -139,7 +151,8 @@ class TikTokAPIClient:
 
     def upload_video(self, video_path: str, title: str = "",
                      description: str = "",
-                     privacy_level: str = "SELF_ONLY") -> Optional[Dict]:
+                     privacy_level: str = "SELF_ONLY",
+                     cover_timestamp_ms: int = 1000) -> Optional[Dict]:
         """
         Завантажити відео на TikTok
 
@@ -149,10 +162,12 @@ class TikTokAPIClient:
             description: Опис відео
             privacy_level: Рівень приватності (PUBLIC_TO_EVERYONE,
                           SELF_ONLY, MUTUAL_FOLLOW_FRIENDS)
+            cover_timestamp_ms: Кадр обкладинки (мс від початку відео)
 
         Returns:
             Результат завантаження або None при помилці
         """
+        self.stalled = None
         if not self.access_token:
             logger.error("Немає токену доступу. Потрібна авторизація.")
             return None
@@ -162,7 +177,7 @@ class TikTokAPIClient:
             return None
 
         # Крок 1: Ініціалізація завантаження
-        init_result = self._initialize_upload()
+        init_result = self._initialize_upload(cover_timestamp_ms)
         if not init_result:
             return None
 
@@ -181,7 +196,8 @@ class TikTokAPIClient:
 
         return publish_result
 
-    def _initialize_upload(self) -> Optional[Dict[str, Any]]:
+    def _initialize_upload(self, cover_timestamp_ms: int = 1000
+                           ) -> Optional[Dict[str, Any]]:
         """Ініціалізувати процес завантаження"""
         url = f"{self.base_url}/v2/post/publish/video/init/"
 
@@ -197,7 +213,7 @@ class TikTokAPIClient:
                 'disable_duet': False,
                 'disable_comment': False,
                 'disable_stitch': False,
-                'video_cover_timestamp_ms': 1000
+                'video_cover_timestamp_ms': cover_timestamp_ms
             },
             'source_info': {
                 'source': 'FILE_UPLOAD',
@@ -208,7 +224,8 @@ class TikTokAPIClient:
         }
 
         try:
-            response = requests.post(url, headers=headers, json=data)
+            response = requests.post(url, headers=headers, json=data,
+                                     timeout=self.timeout)
             response.raise_for_status()
 
             result = response.json()
@@ -224,24 +241,46 @@ class TikTokAPIClient:
             if hasattr(e, 'response') and e.response.status_code == 401:
                 logger.info("Спроба оновити токен...")
                 if self.refresh_access_token():
-                    return self._initialize_upload()  # Повторна спроба
+                    # Повторна спроба
+                    return self._initialize_upload(cover_timestamp_ms)
             return None
 
     def _upload_file(self, upload_url: str, video_path: str) -> bool:
-        """Завантажити файл на TikTok"""
+        """
+        Завантажити файл на TikTok
+
+        Тайм-аут діє на кожну операцію сокета, тож завантаження, що
+        повільно, але йде, не обривається, а зависле - зупиняється.
+        """
+        started = time.monotonic()
         try:
             with open(video_path, 'rb') as video_file:
                 files = {'video': video_file}
-                response = requests.put(upload_url, files=files)
+                response = requests.put(upload_url, files=files,
+                                        timeout=self.timeout)
                 response.raise_for_status()
 
                 logger.info(f"Файл успішно завантажено: {video_path}")
                 return True
 
         except requests.RequestException as e:
+            if self._timed_out(e):
+                self.stalled = time.monotonic() - started
+                logger.error(f"Завантаження файлу зависло (немає прогресу "
+                             f"{self.timeout:.0f}с): {e}")
+                return False
             logger.error(f"Помилка завантаження файлу: {e}")
             return False
 
+    @staticmethod
+    def _timed_out(error: requests.RequestException) -> bool:
+        """Чи обірвано запит тайм-аутом (під час надсилання це ConnectionError)"""
+        if isinstance(error, requests.Timeout):
+            return True
+        reason = error.args[0] if error.args else None
+        return any(isinstance(arg, TimeoutError)
+                   for arg in getattr(reason, 'args', ()))
+
     def _publish_video(self, publish_id: str, title: str, description: str,
                        privacy_level: str) -> Optional[Dict[str, Any]]:
         """Опублікувати відео"""
@@ -257,7 +296,8 @@ class TikTokAPIClient:
         }
 
         try:
-            response = requests.post(url, headers=headers, json=data)
+            response = requests.post(url, headers=headers, json=data,
+                                     timeout=self.timeout)
             response.raise_for_status()
 
             result = response.json()
@@ -9,43 +9,286 @@ import asyncio
 from datetime import datetime, timedelta
 from pathlib import Path
 import json
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 import random
+import time
+import hashlib
+import tempfile
+import glob
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+
+from media_catalog import MediaCatalog
+from clip_cache import ClipCache
+from cover_selector import CoverSelector
+from loudness import segment_loudness, linear_gain
+from folder_watcher import FolderWatcher
+from job_journal import JobJournal
+from clip_worker import ClipWorker
+from stall_log import StallLog
+from clip_verifier import ClipVerifier
+from subtitles import find_subtitles, write_clip_subtitles
+from reframe import position_at, write_crop_commands
+from filter_planner import plan_filters
+from duplicates import DuplicateIndex, clip_signature
+from intro_detector import MAX_REFERENCES
+from media_cache import ProbeService, get_probe_service
+from ffmpeg_runner import run_ffmpeg_async, ProgressCallback
 
 # Налаштування логування
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('tiktok_bot.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
+def setup_logging():
+    """
+    Налаштувати лог у консоль і tiktok_bot.log
+
+    Викликається точками входу (main, run_bot, процеси пулу), а не при
+    імпорті: status.py та тести не створюють файл логу.
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('tiktok_bot.log'),
+            logging.StreamHandler()
+        ]
+    )
+
+
 class VideoProcessor:
     """Клас для обробки відеофайлів"""
     
-    def __init__(self, input_dir: str = "Serial", output_dir: str = "clips"):
+    # segment - одне декодування епізоду, всі кліпи через segment muxer
+    # seek - окремий запуск FFmpeg для кожного кліпа
+    # smart - перекодування лише неповного GOP на початку кліпа, решта
+    #         копіюється (для джерел, що вже у форматі TikTok)
+    CUT_MODES = ("segment", "seek", "smart")
+    
+    # fixed - межі кожні clip_duration секунд
+    # silence - межі в паузах звуку між min_clip_duration і max_clip_duration
+    BOUNDARY_MODES = ("fixed", "silence")
+    
+    # flag - лише попереджати про майже однакові кліпи, drop - не нарізати
+    # і не ставити їх у чергу (None - не перевіряти)
+    DUPLICATE_MODES = (None, "flag", "drop")
+    
+    # Вихідний формат TikTok (video_settings у tiktok_config.json)
+    DEFAULT_VIDEO_SETTINGS = {
+        "width": 1080,
+        "height": 1920,
+        "fps": 30,
+        "bitrate": "2M",
+        "audio_bitrate": "128k",
+        "profile": "default",
+        "proxy": False,
+        "proxy_height": 480,
+        "proxy_bitrate": "300k",
+        "normalize_audio": True,
+        "loudness_target": -14.0,
+        "true_peak": -1.5,
+        "verify_clips": True,
+        "subtitles": False,
+        "subtitle_font_size": 64,
+        "subtitle_margin": 360,
+        "clip_boundaries": "fixed",
+        "min_clip_duration": None,
+        "max_clip_duration": None,
+        "duplicates": None,
+        "duplicate_distance": 10,
+        "skip_intros": False,
+        "reframe": False,
+        "stall_timeout": 120
+    }
+    
+    # Повтори кліпів, чиє кодування зависло, у межах того ж запуску
+    STALL_RETRIES = 1
+    
+    # Профіль default відтворює класичні налаштування: x264 medium з
+    # фіксованим бітрейтом; інші профілі задаються в encoding_profiles
+    PROFILE_KEYS = ("preset", "crf", "bitrate", "maxrate", "bufsize",
+                    "threads", "tune", "gop", "max_size_mb")
+    
+    # Запас на контейнер MP4 при розрахунку стелі розміру кліпа
+    CONTAINER_OVERHEAD = 0.97
+    
+    VIDEO_EXTENSIONS = ('.mkv', '.mp4', '.avi', '.mov', '.wmv')
+    
+    def __init__(self, input_dir: str = "Serial", output_dir: str = "clips",
+                 cut_mode: str = "segment", threads: int = 0,
+                 catalog_file: Optional[str] = None,
+                 cache_file: str = "media_cache.db",
+                 snap_tolerance: float = 0.0,
+                 on_progress: Optional[ProgressCallback] = None,
+                 config_file: str = "tiktok_config.json",
+                 profile: Optional[str] = None,
+                 on_clip: Optional[Callable[[Path], None]] = None):
+        """
+        Args:
+            input_dir: Папка з серіалами
+            output_dir: Папка для кліпів
+            cut_mode: Режим нарізання (segment або seek)
+            threads: Кількість потоків FFmpeg (0 - FFmpeg вирішує сам)
+            catalog_file: База каталогу для інкрементальної обробки
+                (None - завжди нарізати все заново)
+            cache_file: База кешу метаданих FFprobe
+            snap_tolerance: У режимі smart межі кліпів зсуваються до
+                найближчого ключового кадру, якщо він ближче за цю кількість
+                секунд (тоді кліп копіюється повністю)
+            on_progress: Отримувач подій прогресу FFmpeg (fps, speed, ETA)
+            config_file: Конфігурація з video_settings та encoding_profiles
+            profile: Назва профілю кодування (None - video_settings.profile)
+            on_clip: Викликається для кожного кліпа одразу після того, як
+                FFmpeg закінчив його писати
+        """
+        if cut_mode not in self.CUT_MODES:
+            raise ValueError(f"Невідомий режим нарізання: {cut_mode}")
+        
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.cut_mode = cut_mode
+        self.threads = threads
+        self.catalog_file = catalog_file
+        self.catalog = MediaCatalog(catalog_file) if catalog_file else None
+        # Журнал задач живе в тій самій базі, що й каталог
+        self.journal = JobJournal(catalog_file) if catalog_file else None
+        self.stalls = StallLog(catalog_file) if catalog_file else None
+        # Підпис налаштувань поточного нарізання кожного джерела
+        self._job_settings: Dict[Path, str] = {}
+        # Події субтитрів джерел, у яких субтитри вшиваються
+        self._subtitles: Dict[Path, List] = {}
+        # Метадані джерел, що нарізаються (для планування фільтрів)
+        self._probes: Dict[Path, Dict] = {}
+        # Траєкторії динамічного кадрування джерел
+        self._reframe: Dict[Path, Dict] = {}
+        # Заставки й титри джерел, що не потрапляють у кліпи
+        self._excluded: Dict[Path, List[List[float]]] = {}
+        # План кліпів джерел: номер -> (початок, тривалість)
+        self._plans: Dict[Path, Dict[int, Tuple[float, float]]] = {}
+        # Кліпи джерел, кодування яких зависло в поточному проході
+        self._stalled: Dict[Path, set] = {}
+        self.cache_file = cache_file
+        self.probe_service = get_probe_service(cache_file)
+        self.snap_tolerance = snap_tolerance
+        self.on_progress = on_progress
+        self._last_progress_log = 0.0
+        self.on_clip = on_clip
+        self._announced = set()
+        
+        self.config_file = config_file
+        self.video_settings, self.profiles = self._load_video_settings(config_file)
+        self.width = int(self.video_settings["width"])
+        self.height = int(self.video_settings["height"])
+        self.fps = self.video_settings["fps"]
+        
+        self.profile_name = profile or self.video_settings["profile"]
+        if self.profile_name not in self.profiles:
+            raise ValueError(f"Невідомий профіль кодування: {self.profile_name}")
+        self.profile = self.profiles[self.profile_name]
+        if self.video_settings["clip_boundaries"] not in self.BOUNDARY_MODES:
+            raise ValueError(f"Невідомий режим меж кліпів: "
+                             f"{self.video_settings['clip_boundaries']}")
+        self.verifier = ClipVerifier(self.probe_service, self.width, self.height)
+        
+        if self.video_settings["duplicates"] not in self.DUPLICATE_MODES:
+            raise ValueError(f"Невідомий режим дублікатів: "
+                             f"{self.video_settings['duplicates']}")
+        self.duplicates = None
+        if self.video_settings["duplicates"]:
+            # Без каталогу дублікати шукаються лише в межах запуску
+            self.duplicates = DuplicateIndex(
+                catalog_file or ":memory:",
+                int(self.video_settings["duplicate_distance"])
+            )
+    
+    @classmethod
+    def _load_video_settings(cls, config_file: str) -> Tuple[Dict, Dict]:
+        """
+        Завантажити video_settings та профілі кодування з конфігурації
+        
+        Returns:
+            (video_settings, словник назва профілю -> параметри)
+        """
+        config = {}
+        if config_file and os.path.exists(config_file):
+            with open(config_file, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        
+        video_settings = dict(cls.DEFAULT_VIDEO_SETTINGS)
+        video_settings.update(config.get("video_settings", {}))
+        
+        profiles = {
+            "default": {"preset": "medium", "bitrate": video_settings["bitrate"]}
+        }
+        for name, params in config.get("encoding_profiles", {}).items():
+            unknown = set(params) - set(cls.PROFILE_KEYS)
+            if unknown:
+                logger.warning(
+                    f"Профіль {name}: невідомі параметри {', '.join(sorted(unknown))}"
+                )
+            profiles[name] = params
+        return video_settings, profiles
         
     def get_video_files(self) -> List[Path]:
-        """Отримати список відеофайлів"""
-        video_extensions = ['.mkv', '.mp4', '.avi', '.mov', '.wmv']
-        video_files = []
+        """Отримати список відеофайлів (включно з підпапками серіалів)"""
+        return MediaCatalog.scan(self.input_dir, self.VIDEO_EXTENSIONS)
+    
+    def _settings_signature(self, clip_duration: int,
+                            video_path: Optional[Path] = None) -> str:
+        """Підпис налаштувань, від яких залежить вміст кліпів"""
+        encode = self._encode_options(
+            clip_length=self._clip_bounds(clip_duration)[1]
+        )
+        # Кількість потоків залежить від машини й кількості робочих
+        # процесів, а не від вмісту кліпа
+        encode.pop('threads', None)
+        settings = {
+            'clip_duration': clip_duration,
+            'encode': encode,
+            'profile': self.profile,
+        }
+        if self.cut_mode == "smart":
+            settings['snap_tolerance'] = self.snap_tolerance
+        if self.video_settings["normalize_audio"]:
+            settings['loudness'] = [self.video_settings["loudness_target"],
+                                    self.video_settings["true_peak"]]
+        if self.video_settings["clip_boundaries"] != "fixed":
+            settings['boundaries'] = [self.video_settings["clip_boundaries"],
+                                      *self._clip_bounds(clip_duration)]
+        if self.video_settings["subtitles"]:
+            settings['subtitles'] = [self.video_settings["subtitles"],
+                                     self.video_settings["subtitle_font_size"],
+                                     self.video_settings["subtitle_margin"]]
+        if self.video_settings["reframe"]:
+            settings['reframe'] = True
+        # Заставки до підпису не входять: знайдена пізніше заставка змінює
+        # лише план ще не нарізаних кліпів (див. _plan_spans)
+        return hashlib.sha1(
+            json.dumps(settings, sort_keys=True).encode()
+        ).hexdigest()[:16]
+    
+    def cut_video_to_clips(self, video_path: Path, clip_duration: int = 60) -> List[Path]:
+        """
+        Нарізати відео на кліпи (синхронно, для коду поза event loop)
         
-        for ext in video_extensions:
-            video_files.extend(self.input_dir.glob(f"*{ext}"))
+        Args:
+            video_path: Шлях до відеофайлу
+            clip_duration: Тривалість кліпа в секундах (за замовчуванням 60с)
             
-        return sorted(video_files)
+        Returns:
+            Список шляхів до створених кліпів
+        """
+        return asyncio.run(self.cut_video_to_clips_async(video_path, clip_duration))
     
-    def cut_video_to_clips(self, video_path: Path, clip_duration: int = 60) -> List[Path]:
+    async def cut_video_to_clips_async(self, video_path: Path,
+                                       clip_duration: int = 60) -> List[Path]:
         """
         Нарізати відео на кліпи заданої тривалості
         
+        FFmpeg працює як asyncio-підпроцес, тож event loop не блокується,
+        а скасування задачі зупиняє кодування.
+        
         Args:
             video_path: Шлях до відеофайлу
             clip_duration: Тривалість кліпа в секундах (за замовчуванням 60с)
@@ -53,75 +296,1463 @@ class VideoProcessor:
         Returns:
             Список шляхів до створених кліпів
         """
+        missing = []
         try:
-            import ffmpeg
+            excluded = await self._shared_ranges(video_path)
+            settings = self._settings_signature(clip_duration, video_path)
+            self._job_settings[video_path] = settings
+            done = {}
+            if self.catalog and self.catalog.refresh_source(video_path):
+                done = self.catalog.done_clips(video_path, settings)
+                known_duration = self.catalog.get_duration(video_path)
+                if known_duration is not None and await self._fully_cut(
+                        video_path, known_duration, clip_duration, excluded, done):
+                    logger.info(f"Без змін, пропущено: {video_path.name}")
+                    return []
             
-            # Отримати інформацію про відео
-            probe = ffmpeg.probe(str(video_path))
+            source = await self._plan_source(video_path, clip_duration, done)
+            if source is None:
+                return []
+            probe, options, smart, keyframes, plan = source
+            clip_count = len(plan)
+            self._plans[video_path] = plan
             
-            # Спробувати отримати тривалість з різних джерел
-            duration = None
-            if 'format' in probe and 'duration' in probe['format']:
-                duration = float(probe['format']['duration'])
+            missing = [i for i in plan if i not in done]
+            missing = await self._filter_duplicates(video_path, plan, missing)
+            if done:
+                logger.info(
+                    f"Дорізання {video_path.name}: бракує {len(missing)} "
+                    f"з {clip_count} кліпів"
+                )
             else:
-                for stream in probe['streams']:
-                    if stream['codec_type'] == 'video' and 'duration' in stream:
-                        duration = float(stream['duration'])
-                        break
-                        
-            if duration is None:
-                logger.error(f"Не вдалося визначити тривалість відео {video_path}")
-                return []
+                logger.info(f"Нарізання {video_path.name} на {clip_count} кліпів")
             
-            clips = []
-            clip_count = int(duration // clip_duration)
+            if self.journal:
+                interrupted = self.journal.plan(video_path, settings, missing)
+                if interrupted:
+                    logger.info(f"Відновлення {video_path.name}: {interrupted} "
+                                f"кліпів обірвано під час минулого запуску")
+                exhausted = self.journal.exhausted(video_path) & set(missing)
+                if exhausted:
+                    logger.warning(
+                        f"Пропущено кліпи {sorted(exhausted)} {video_path.name}: "
+                        f"{JobJournal.MAX_ATTEMPTS} невдалі спроби"
+                    )
+                    missing = [i for i in missing if i not in exhausted]
+            if not missing:
+                return []
+            # Кліпи, що нарізаються заново, буде повідомлено ще раз
+            self._announced.difference_update(
+                self._clip_path(video_path, i) for i in missing
+            )
+            self._clean_partials(video_path)
             
-            base_name = video_path.stem
-            logger.info(f"Нарізання {video_path.name} на {clip_count} кліпів")
+            spans = {i: plan[i] for i in missing}
+            self._stalled.pop(video_path, None)
+            clips = await self._cut_spans(video_path, plan, spans, smart,
+                                          keyframes, probe, options)
+            for _ in range(self.STALL_RETRIES):
+                # Зависання здебільшого тимчасове (NFS, мережевий диск) -
+                # кліп ріжеться ще раз, не чекаючи наступного запуску
+                retry = sorted(i for i in self._stalled.pop(video_path, ())
+                               if not self._clip_path(video_path, i).exists())
+                if not retry:
+                    break
+                logger.info(f"🔁 {video_path.name}: повтор завислих кліпів {retry}")
+                await self._cut_spans(video_path, plan,
+                                      {i: spans[i] for i in retry}, smart,
+                                      keyframes, probe, options)
+                clips = self._collect_clips(video_path, spans)
+            self._stalled.pop(video_path, None)
             
-            for i in range(clip_count):
-                start_time = i * clip_duration
-                output_name = f"{base_name}_clip_{i+1:03d}.mp4"
-                output_path = self.output_dir / output_name
-                
-                # Нарізати відео за допомогою FFmpeg
-                (
-                    ffmpeg
-                    .input(str(video_path), ss=start_time, t=clip_duration)
-                    .output(
-                        str(output_path),
-                        vcodec='libx264',
-                        acodec='aac',
-                        video_bitrate='2M',
-                        audio_bitrate='128k',
-                        vf='scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920',  # TikTok розмір 9:16
-                        r=30  # 30 FPS для TikTok
-                    )
-                    .overwrite_output()
-                    .run(quiet=True)
-                )
-                
-                if output_path.exists():
-                    clips.append(output_path)
-                    logger.info(f"Створено кліп: {output_name}")
-                
+            self._report_savings(video_path, spans, clips, options)
             return clips
             
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Помилка при нарізанні відео {video_path}: {e}")
+            if self.journal:
+                self.journal.fail(video_path, missing, self._error_text(e))
+            # Кліпи, завершені до помилки, вже в каталозі й придатні
+            return self._collect_clips(video_path, missing)
+    
+    async def _cut_spans(self, video_path: Path,
+                         plan: Dict[int, Tuple[float, float]],
+                         spans: Dict[int, Tuple[float, float]], smart: bool,
+                         keyframes: List[float], probe: Dict,
+                         options: Dict) -> List[Path]:
+        """
+        Нарізати кліпи spans способом, що відповідає режиму нарізання
+        
+        Завислий прохід segment muxer не зупиняє решту джерела: його
+        недописані кліпи рахуються невдалими (і завислими) окремо.
+        """
+        if smart:
+            return await self._cut_smart(video_path, spans, keyframes, probe,
+                                         options)
+        if self.cut_mode == "seek":
+            return await self._cut_by_seek(video_path, spans, options)
+        
+        clips = []
+        for run in self._contiguous_runs(plan, list(spans)):
+            run_spans = {i: spans[i] for i in run}
+            if len(run) == 1:
+                # Окремий кліп дешевше дорізати точковим пошуком
+                clips += await self._cut_by_seek(video_path, run_spans, options)
+                continue
+            # Суцільний відрізок (увесь епізод, частина між заставками
+            # або хвіст після збою) - одним проходом
+            try:
+                clips += await self._cut_segmented(video_path, run_spans, options)
+            except Exception as e:
+                if getattr(e, 'stalled', None) is None:
+                    raise
+                for index in run:
+                    if not self._clip_path(video_path, index).exists():
+                        self._clip_failed(video_path, index, e)
+                clips += self._collect_clips(video_path, run)
+        return clips
+    
+    async def _plan_source(self, video_path: Path, clip_duration: int,
+                           cut: Optional[Dict[int, Optional[Tuple[float, float]]]] = None):
+        """
+        Підготувати нарізання джерела: метадані, параметри та план кліпів
+        
+        Args:
+            cut: Уже нарізані чи опубліковані кліпи (див. _plan_spans)
+        
+        Returns:
+            (probe, параметри кодування, smart, ключові кадри, план
+            номер -> (початок, тривалість)) або None, якщо тривалість
+            визначити не вдалося
+        """
+        # Отримати інформацію про відео (з кешу, якщо файл не змінився)
+        probe = await asyncio.to_thread(self.probe_service.probe, video_path)
+        duration = ProbeService.duration(probe)
+        if duration is None:
+            logger.error(f"Не вдалося визначити тривалість відео {video_path}")
+            return None
+        
+        if self.catalog:
+            self.catalog.set_duration(video_path, duration)
+        
+        self._probes[video_path] = probe
+        subtitles = await self._load_subtitles(video_path, probe)
+        reframe = await self._load_reframe(video_path, probe)
+        # Стеля розміру рахується для найдовшого можливого кліпа
+        options = self._encode_options(probe, self._clip_bounds(clip_duration)[1],
+                                       subtitles, reframe)
+        if options['vcodec'] != 'copy':
+            self._log_filters(video_path)
+        smart = self.cut_mode == "smart" and options['vcodec'] == 'copy'
+        if self.cut_mode == "smart" and not smart:
+            logger.info("Джерело потребує перекодування, smart-нарізання "
+                        "замінено на segment")
+        
+        keyframes = []
+        if smart:
+            keyframes = await asyncio.to_thread(
+                self.probe_service.keyframes, video_path
+            )
+        excluded = await self._shared_ranges(video_path)
+        plan = await self._plan_spans(video_path, duration, clip_duration,
+                                      keyframes, excluded, cut or {})
+        return probe, options, smart, keyframes, plan
+    
+    @staticmethod
+    def _same_span(first: Optional[Tuple[float, float]],
+                   second: Tuple[float, float]) -> bool:
+        """Чи той самий відрізок джерела (з точністю до мілісекунди)"""
+        return first is not None and all(
+            abs(a - b) < 0.001 for a, b in zip(first, second)
+        )
+    
+    async def _plan_spans(self, video_path: Path, duration: float,
+                          clip_duration: int, keyframes: List[float],
+                          excluded: List[List[float]],
+                          cut: Dict[int, Optional[Tuple[float, float]]]
+                          ) -> Dict[int, Tuple[float, float]]:
+        """
+        План кліпів з урахуванням уже нарізаних
+        
+        Кліп визначається відрізком джерела, а не номером. Якщо план
+        змінився під нарізаними чи опублікованими кліпами (наприклад,
+        заставку знайдено разом з новим епізодом), ці кліпи лишаються як
+        є, заново плануються лише проміжки між ними, а нові кліпи
+        отримують номери після останнього відомого - файли та позначки
+        публікації старих кліпів не переписуються.
+        
+        Args:
+            cut: Номер -> відрізок нарізаного кліпа (None - відрізок не
+                записано, кліп вважається відповідним номеру в плані)
+        """
+        boundaries = await self._boundaries(video_path, duration, clip_duration,
+                                            excluded)
+        plan = dict(enumerate(self._plan_clips(duration, clip_duration, keyframes,
+                                               boundaries, excluded), 1))
+        if all(span is None or self._same_span(plan.get(index), span)
+               for index, span in cut.items()):
+            return plan
+        
+        kept = {index: span for index, span in cut.items() if span is not None}
+        covered = sorted(list(excluded)
+                         + [[start, start + length] for start, length in kept.values()])
+        boundaries = await self._boundaries(video_path, duration, clip_duration,
+                                            covered)
+        remainder = self._plan_clips(duration, clip_duration, keyframes,
+                                     boundaries, covered)
+        logger.info(f"План {video_path.name} змінився: {len(kept)} нарізаних "
+                    f"кліпів лишаються, {len(remainder)} плануються заново")
+        plan = dict(sorted(kept.items()))
+        plan.update(enumerate(remainder, max(cut) + 1))
+        return plan
+    
+    async def _fully_cut(self, video_path: Path, duration: float,
+                         clip_duration: int, excluded: List[List[float]],
+                         cut: Dict[int, Optional[Tuple[float, float]]]) -> bool:
+        """Чи вкривають нарізані кліпи все джерело поза заставками"""
+        if any(span is None for span in cut.values()):
+            # Кліпи без записаних відрізків - порівняти з кількістю в плані
+            return len(cut) == len(self._plan_clips(
+                duration, clip_duration, [],
+                await self._boundaries(video_path, duration, clip_duration,
+                                       excluded),
+                excluded
+            ))
+        covered = sorted(list(excluded)
+                         + [[start, start + length] for start, length in cut.values()])
+        # Проміжок, коротший за найкоротший кліп, кліпом не стає
+        return all(end - start < self._clip_bounds(clip_duration)[0]
+                   for start, end in self._spans(duration, covered))
+    
+    async def _boundaries(self, video_path: Path, duration: float,
+                          clip_duration: int,
+                          excluded: List[List[float]] = ()
+                          ) -> Optional[List[List[float]]]:
+        """
+        Межі кліпів у паузах звуку (режим silence, з кешу)
+        
+        Returns:
+            Межі для кожного відрізка між заставками або None - ділити
+            кожні clip_duration секунд
+        """
+        if self.video_settings["clip_boundaries"] != "silence":
+            return None
+        boundaries = await asyncio.to_thread(
+            self.probe_service.silence_boundaries, video_path,
+            self._spans(duration, excluded),
+            *self._clip_bounds(clip_duration), clip_duration
+        )
+        if boundaries is None:
+            logger.info(f"У {video_path.name} немає аудіо, межі кліпів "
+                        f"кожні {clip_duration}с")
+        return boundaries
+    
+    async def _shared_ranges(self, video_path: Path) -> List[List[float]]:
+        """
+        Заставки й титри, спільні з сусідніми епізодами тієї ж папки
+        (режим skip_intros; відбитки з кешу)
+        
+        Returns:
+            Діапазони [початок, кінець], що не потрапляють у кліпи
+        """
+        if not self.video_settings["skip_intros"]:
             return []
+        if video_path in self._excluded:
+            return self._excluded[video_path]
+        
+        episodes = sorted(p for p in video_path.parent.iterdir()
+                          if p.suffix.lower() in self.VIDEO_EXTENSIONS
+                          and not p.name.startswith('.'))
+        # Найближчі за порядком епізоди: у них та сама заставка сезону
+        position = episodes.index(video_path) if video_path in episodes else 0
+        references = sorted(
+            (p for p in episodes if p != video_path),
+            key=lambda p: abs(episodes.index(p) - position)
+        )[:MAX_REFERENCES]
+        try:
+            ranges = await asyncio.to_thread(self.probe_service.shared_audio,
+                                             video_path, references)
+        except Exception as e:
+            logger.warning(f"Не вдалося знайти заставку {video_path.name}: "
+                           f"{self._error_text(e)}")
+            ranges = []
+        if ranges:
+            logger.info(f"🎵 {video_path.name}: пропуск заставок " + ", ".join(
+                f"{start:.0f}-{end:.0f}с" for start, end in ranges
+            ))
+        self._excluded[video_path] = ranges
+        return ranges
+    
+    async def plan_virtual_clips_async(self, video_path: Path,
+                                       clip_duration: int = 60) -> List[Dict]:
+        """
+        Запланувати кліпи джерела без нарізання (для рендерингу перед публікацією)
+        
+        Опубліковані кліпи (за каталогом) пропускаються.
+        
+        Returns:
+            Віртуальні кліпи: source, index, start, duration, clip_duration,
+            profile, clip (шлях, куди кліп буде відрендерено)
+        """
+        try:
+            uploaded = {}
+            if self.catalog:
+                self.catalog.refresh_source(video_path)
+                uploaded = self.catalog.uploaded_spans(video_path)
+            
+            source = await self._plan_source(video_path, clip_duration, uploaded)
+            if source is None:
+                return []
+            plan = source[4]
+            indices = await self._filter_duplicates(
+                video_path, plan, [i for i in plan if i not in uploaded]
+            )
+            
+            return [
+                {
+                    'source': str(video_path),
+                    'index': index,
+                    'start': start,
+                    'duration': length,
+                    'clip_duration': clip_duration,
+                    'profile': self.profile_name,
+                    'clip': str(self._clip_path(video_path, index)),
+                }
+                for index, (start, length) in plan.items()
+                if index in indices
+            ]
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Помилка при плануванні кліпів {video_path}: {e}")
+            return []
+    
+    async def enqueue_clips_async(self, video_path: Path,
+                                  clip_duration: int = 60) -> List[int]:
+        """
+        Поставити відсутні кліпи джерела в чергу розподіленого нарізання
+        
+        План складається один раз тут; робочі процеси (ClipWorker)
+        отримують готові відрізки й лише кодують.
+        
+        Returns:
+            Номери кліпів у черзі
+        """
+        if self.journal is None:
+            logger.error("Розподілене нарізання потребує каталогу")
+            return []
+        try:
+            settings = self._settings_signature(clip_duration, video_path)
+            done = {}
+            if self.catalog.refresh_source(video_path):
+                done = self.catalog.done_clips(video_path, settings)
+            
+            source = await self._plan_source(video_path, clip_duration, done)
+            if source is None:
+                return []
+            plan = source[4]
+            missing = await self._filter_duplicates(
+                video_path, plan, [i for i in plan if i not in done]
+            )
+            self.journal.enqueue(video_path, settings, clip_duration,
+                                 {i: plan[i] for i in missing})
+            exhausted = self.journal.exhausted(video_path)
+            queued = [i for i in missing if i not in exhausted]
+            if queued:
+                logger.info(f"📥 {video_path.name}: {len(queued)} кліпів у черзі")
+            return queued
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Помилка при плануванні кліпів {video_path}: {e}")
+            return []
+    
+    async def render_clip_async(self, entry: Dict) -> Optional[Path]:
+        """
+        Відрендерити віртуальний кліп (якщо файлу ще немає)
+        
+        Args:
+            entry: Віртуальний кліп з plan_virtual_clips_async
+            
+        Returns:
+            Шлях до кліпа або None при помилці
+        """
+        video_path = Path(entry['source'])
+        index = entry['index']
+        clip_path = self._clip_path(video_path, index)
+        if clip_path.exists():
+            return clip_path
+        
+        try:
+            clip_duration = entry.get('clip_duration', entry['duration'])
+            probe = await asyncio.to_thread(self.probe_service.probe, video_path)
+            self._probes[video_path] = probe
+            subtitles = await self._load_subtitles(video_path, probe)
+            reframe = await self._load_reframe(video_path, probe)
+            options = self._encode_options(
+                probe, self._clip_bounds(clip_duration)[1], subtitles, reframe
+            )
+            spans = {index: (entry['start'], entry['duration'])}
+            self._plans.setdefault(video_path, {}).update(spans)
+            
+            logger.info(f"🎬 Рендеринг {clip_path.name}")
+            if self.catalog:
+                self.catalog.refresh_source(video_path)
+            self._job_settings[video_path] = self._settings_signature(
+                clip_duration, video_path
+            )
+            if entry.get('settings', self._job_settings[video_path]) != \
+                    self._job_settings[video_path]:
+                # Задачу розподіленої черги поставлено з іншою конфігурацією
+                logger.error(f"Налаштування {clip_path.name} не збігаються "
+                             f"з налаштуваннями черги")
+                return None
+            if self.cut_mode == "smart" and options['vcodec'] == 'copy':
+                keyframes = await asyncio.to_thread(
+                    self.probe_service.keyframes, video_path
+                )
+                clips = await self._cut_smart(video_path, spans, keyframes,
+                                              probe, options)
+            else:
+                clips = await self._cut_by_seek(video_path, spans, options)
+            self._report_savings(video_path, spans, clips, options)
+            
+            if not clips:
+                return None
+            return clip_path
+            
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Помилка при рендерингу {clip_path.name}: {e}")
+            return None
+    
+    async def _filter_duplicates(self, video_path: Path,
+                                 plan: Dict[int, Tuple[float, float]],
+                                 indices: List[int]) -> List[int]:
+        """
+        Перевірити кліпи на збіг з уже відомими (до кодування)
+        
+        Підписи беруться з хешів ключових кадрів джерела, тож дублікат
+        відкидається ще до кодування й до черги публікацій.
+        
+        Returns:
+            Номери кліпів, які треба нарізати (у режимі flag - усі)
+        """
+        if self.duplicates is None or not indices:
+            return indices
+        dropped = self.duplicates.retain(video_path, plan)
+        if dropped:
+            logger.debug(f"{video_path.name}: видалено {dropped} підписів "
+                         f"старого плану")
+        try:
+            frame_hashes = await asyncio.to_thread(self.probe_service.frame_hashes,
+                                                   video_path)
+        except Exception as e:
+            logger.warning(f"Не вдалося обчислити хеші кадрів {video_path.name}: "
+                           f"{self._error_text(e)}")
+            return indices
+        
+        kept = []
+        for index in indices:
+            signature = clip_signature(frame_hashes, *plan[index])
+            if signature is None:
+                kept.append(index)
+                continue
+            match = self.duplicates.find(signature, (video_path, index))
+            if match:
+                source, match_index, distance = match
+                logger.warning(
+                    f"♊ {self._clip_path(video_path, index).name} майже "
+                    f"збігається з кліпом {match_index} {Path(source).name} "
+                    f"(відстань {distance:.1f} біт)"
+                )
+                if self.video_settings["duplicates"] == "drop":
+                    continue
+            self.duplicates.add(video_path, index, signature, plan[index])
+            kept.append(index)
+        return kept
+    
+    async def _load_subtitles(self, video_path: Path, probe: Dict) -> bool:
+        """
+        Підготувати субтитри джерела для вшивання (події з кешу)
+        
+        Returns:
+            True, якщо кліпи джерела отримають субтитри
+        """
+        self._subtitles.pop(video_path, None)
+        selector = self.video_settings["subtitles"]
+        if not selector:
+            return False
+        
+        found = find_subtitles(video_path, probe, selector)
+        if found is None:
+            return False
+        try:
+            events = await asyncio.to_thread(self.probe_service.subtitle_events,
+                                             *found)
+        except Exception as e:
+            logger.warning(f"Не вдалося прочитати субтитри {found[0].name}: "
+                           f"{self._error_text(e)}")
+            return False
+        if not events:
+            return False
+        
+        logger.info(f"💬 Субтитри {video_path.name}: {len(events)} реплік "
+                    f"({found[0].name}, доріжка {found[1]})")
+        self._subtitles[video_path] = events
+        return True
+    
+    def _subtitle_filter(self, video_path: Path, start: float,
+                         length: float) -> Tuple[str, Optional[Path]]:
+        """
+        Фільтр вшивання субтитрів відрізка (після масштабування й обрізання)
+        
+        Returns:
+            (",subtitles=..." або "", тимчасовий ASS-файл для видалення)
+        """
+        events = self._subtitles.get(video_path)
+        if not events:
+            return "", None
+        path = write_clip_subtitles(
+            events, start, length, self.width, self.height,
+            int(self.video_settings["subtitle_font_size"]),
+            int(self.video_settings["subtitle_margin"])
+        )
+        if path is None:
+            return "", None
+        return f",subtitles={path}", path
+    
+    async def _load_reframe(self, video_path: Path, probe: Dict) -> bool:
+        """
+        Підготувати динамічне кадрування джерела (траєкторія з кешу)
+        
+        Returns:
+            True, якщо вікно кадрування кліпів стежитиме за дією
+        """
+        self._reframe.pop(video_path, None)
+        if not self.video_settings["reframe"]:
+            return False
+        aspect = ProbeService.display_aspect(probe)
+        target = self.width / self.height
+        # Джерело не ширше за кліп - обрізати збоку нічого
+        if aspect is None or aspect <= target * 1.01:
+            return False
+        
+        started = time.monotonic()
+        try:
+            track = await asyncio.to_thread(self.probe_service.reframe_track,
+                                            video_path, target)
+        except Exception as e:
+            logger.warning(f"Не вдалося проаналізувати кадр {video_path.name}, "
+                           f"обрізання по центру: {self._error_text(e)}")
+            return False
+        if not track['positions']:
+            return False
+        
+        elapsed = time.monotonic() - started
+        if elapsed >= 0.1:
+            logger.info(f"🎯 Кадрування {video_path.name}: траєкторія з "
+                        f"{len(track['positions'])} точок за {elapsed:.1f}с")
+        self._reframe[video_path] = track
+        return True
+    
+    def _reframe_commands(self, video_path: Path, start: float,
+                          length: float) -> Optional[Tuple[Path, float]]:
+        """
+        Команди зсуву вікна кадрування для відрізка
+        
+        Returns:
+            (тимчасовий файл sendcmd для видалення, початкове положення)
+            або None, якщо джерело обрізається по центру
+        """
+        track = self._reframe.get(video_path)
+        if not track:
+            return None
+        path = write_crop_commands(track, start, length)
+        if path is None:
+            return None
+        return path, position_at(track, start)
+    
+    async def _audio_gains(self, video_path: Path,
+                           spans: Dict[int, Tuple[float, float]]
+                           ) -> Optional[Dict[int, float]]:
+        """
+        Підсилення аудіо (дБ) для кожного кліпа
+        
+        Гучність джерела вимірюється один раз (кеш media_cache.db), тож
+        кожен кліп нормалізується постійним підсиленням за той самий
+        прохід кодування, без другого аналізу.
+        
+        Returns:
+            {номер кліпа: підсилення} або None без нормалізації
+        """
+        if not self.video_settings["normalize_audio"]:
+            return None
+        table = await asyncio.to_thread(self.probe_service.loudness, video_path)
+        if not table:
+            return None
+        
+        target = self.video_settings["loudness_target"]
+        true_peak = self.video_settings["true_peak"]
+        return {
+            index: linear_gain(segment_loudness(table, start, length),
+                               target, true_peak)
+            for index, (start, length) in spans.items()
+        }
+    
+    @staticmethod
+    def _gain_filter(gains: Dict[int, float],
+                     spans: Dict[int, Tuple[float, float]], offset: float) -> str:
+        """
+        Фільтр volume з постійним підсиленням на кожен кліп
+        
+        Для кількох кліпів одного проходу підсилення вибирається за часом
+        (t відраховується від offset - початку вхідного відрізка).
+        """
+        indices = sorted(spans)
+        factors = {index: 10 ** (gains[index] / 20) for index in indices}
+        expression = f"{factors[indices[-1]]:.4f}"
+        for index in reversed(indices[:-1]):
+            start, length = spans[index]
+            expression = (f"if(lt(t\\,{start + length - offset:.3f})\\,"
+                          f"{factors[index]:.4f}\\,{expression})")
+        return f"volume={expression}:eval=frame"
+    
+    async def _run(self, stream, duration: float, label: str,
+                   on_event: Optional[ProgressCallback] = None):
+        """
+        Виконати команду FFmpeg, передаючи прогрес у on_progress та лог
+        
+        on_event додатково отримує кожну подію прогресу цього запуску.
+        """
+        def report(event: Dict):
+            self._report_progress(event)
+            if on_event:
+                on_event(event)
+        
+        try:
+            await run_ffmpeg_async(stream, duration, report, label,
+                                   self.video_settings["stall_timeout"])
+        except Exception as e:
+            # Завислий кліп рахується невдалою спробою й ріжеться знову
+            stalled = getattr(e, 'stalled', None)
+            if stalled is not None and self.stalls:
+                self.stalls.record('encode', label, stalled)
+            raise
+    
+    def _report_progress(self, event: Dict):
+        """Логувати прогрес не частіше ніж раз на 10 секунд"""
+        if self.on_progress:
+            self.on_progress(event)
+        
+        now = time.monotonic()
+        if event['done'] or now - self._last_progress_log < 10:
+            return
+        self._last_progress_log = now
+        
+        percent = f"{event['percent']:.0f}%" if event['percent'] is not None else "?"
+        eta = f"{event['eta']:.0f}с" if event['eta'] is not None else "?"
+        logger.info(
+            f"⏳ {event['label']}: {percent}, {event['fps']:.0f} fps, "
+            f"x{event['speed']:.2f}, залишилось ~{eta}"
+        )
+    
+    def _clip_bounds(self, clip_duration: int) -> Tuple[float, float]:
+        """
+        Мінімальна та максимальна тривалість кліпа
+        
+        За замовчуванням 75% і 125% від clip_duration. Хвіст епізоду,
+        не коротший за мінімум, стає останнім кліпом.
+        """
+        min_length = self.video_settings["min_clip_duration"] or clip_duration * 0.75
+        max_length = self.video_settings["max_clip_duration"] or clip_duration * 1.25
+        return float(min_length), float(max(max_length, min_length))
+    
+    @staticmethod
+    def _spans(duration: float,
+               excluded: List[List[float]] = ()) -> List[List[float]]:
+        """Відрізки джерела між виключеними діапазонами"""
+        spans = []
+        position = 0.0
+        for start, end in excluded:
+            if start > position:
+                spans.append([position, start])
+            position = max(position, end)
+        if duration > position:
+            spans.append([position, duration])
+        return spans
+    
+    def _plan_clips(self, duration: float, clip_duration: int,
+                    keyframes: List[float],
+                    boundaries: Optional[List[List[float]]] = None,
+                    excluded: List[List[float]] = ()) -> List[Tuple[float, float]]:
+        """
+        Скласти план кліпів
+        
+        Args:
+            duration: Тривалість джерела
+            clip_duration: Номінальна тривалість кліпа
+            keyframes: Індекс ключових кадрів для вирівнювання меж
+                (порожній - межі не зсуваються)
+            boundaries: Готові межі для кожного відрізка (режим silence);
+                None - кожні clip_duration секунд від початку відрізка
+            excluded: Діапазони, що не потрапляють у кліпи (заставки)
+            
+        Returns:
+            Список (початок, тривалість); кліп з номером i - елемент i-1
+        """
+        if boundaries is None:
+            boundaries = []
+            for start, end in self._spans(duration, excluded):
+                clip_count = int((end - start) // clip_duration)
+                points = [round(start + i * clip_duration, 3)
+                          for i in range(clip_count + 1)]
+                # Достатньо довгий хвіст - окремий кліп, а не втрачений контент
+                if end - points[-1] >= self._clip_bounds(clip_duration)[0]:
+                    points.append(end)
+                boundaries.append(points)
+        
+        plan = []
+        for points in boundaries:
+            points = list(points)
+            clip_count = max(0, len(points) - 1)
+            if keyframes and self.snap_tolerance > 0:
+                # Крайні межі не зсуваються, щоб не вийти за межі відрізка
+                for i in range(1, clip_count):
+                    points[i] = self._snap_to_keyframe(points[i], keyframes)
+            plan.extend((points[i], points[i + 1] - points[i])
+                        for i in range(clip_count))
+        return plan
+    
+    @staticmethod
+    def _contiguous_runs(plan: Dict[int, Tuple[float, float]],
+                         indices: List[int]) -> List[List[int]]:
+        """
+        Розбити номери кліпів на суцільні відрізки: сусідні номери, між
+        кліпами яких немає пропуску (заставки чи відкинутого дубліката)
+        """
+        runs = []
+        for index in indices:
+            if runs and index == runs[-1][-1] + 1:
+                start, length = plan[runs[-1][-1]]
+                if abs(plan[index][0] - (start + length)) < 0.001:
+                    runs[-1].append(index)
+                    continue
+            runs.append([index])
+        return runs
+    
+    def _snap_to_keyframe(self, position: float, keyframes: List[float]) -> float:
+        """Найближчий ключовий кадр у межах snap_tolerance або сама позиція"""
+        i = bisect_left(keyframes, position)
+        nearest = min(keyframes[max(0, i - 1):i + 1],
+                      key=lambda k: abs(k - position))
+        if abs(nearest - position) <= self.snap_tolerance:
+            return nearest
+        return position
+    
+    def _input_options(self) -> Dict:
+        """Параметри вхідного файлу (потоки декодера)"""
+        if self.threads:
+            return {'threads': self.threads}
+        return {}
+    
+    @staticmethod
+    def _parse_rate(rate: str) -> float:
+        """Перетворити частоту кадрів FFprobe ("30000/1001") у число"""
+        try:
+            num, _, den = rate.partition('/')
+            return float(num) / float(den or 1)
+        except (ValueError, ZeroDivisionError):
+            return 0.0
+    
+    def _stream_copy_plan(self, probe: Dict) -> Tuple[bool, bool]:
+        """
+        Визначити, які потоки джерела вже відповідають формату TikTok
+        
+        Returns:
+            (копіювати відео, копіювати аудіо)
+        """
+        video = ProbeService.first_stream(probe, 'video')
+        audio = ProbeService.first_stream(probe, 'audio')
+        
+        copy_video = (
+            video is not None
+            and video.get('codec_name') == 'h264'
+            and video.get('pix_fmt') == 'yuv420p'
+            and video.get('width') == self.width
+            and video.get('height') == self.height
+            and video.get('sample_aspect_ratio', '1:1') in ('1:1', '0:1')
+            and abs(self._parse_rate(video.get('avg_frame_rate', '0/0'))
+                    - self._parse_rate(str(self.fps))) < 0.01
+        )
+        # Нормалізація гучності потребує перекодування аудіо (дешево)
+        copy_audio = (audio is not None and audio.get('codec_name') == 'aac'
+                      and not self.video_settings["normalize_audio"])
+        return copy_video, copy_audio
+    
+    def _encode_options(self, probe: Optional[Dict] = None,
+                        clip_length: Optional[float] = None,
+                        subtitles: bool = False, reframe: bool = False) -> Dict:
+        """
+        Параметри кодування кліпа під формат TikTok
+        
+        Якщо probe показує, що потік джерела вже у потрібному форматі,
+        він копіюється без перекодування (-c copy). clip_length потрібна
+        для профілів зі стелею розміру кліпа (max_size_mb). Вшиті
+        субтитри (subtitles) і динамічне кадрування (reframe) потребують
+        перекодування відео. Ланцюжок фільтрів планується за probe
+        (див. filter_planner.plan_filters).
+        """
+        copy_video, copy_audio = (
+            self._stream_copy_plan(probe) if probe else (False, False)
+        )
+        copy_video = copy_video and not subtitles and not reframe
+        
+        options = {}
+        if copy_video:
+            options['vcodec'] = 'copy'
+        else:
+            options.update(self._video_codec_options(clip_length))
+            # TikTok розмір 9:16
+            filters = plan_filters(probe, self.width, self.height, self.fps)
+            options['vf'] = filters['vf']
+            if filters['r']:
+                options['r'] = filters['r']
+            
+        if copy_audio:
+            options['acodec'] = 'copy'
+        else:
+            options.update({
+                'acodec': 'aac',
+                'audio_bitrate': self.video_settings["audio_bitrate"]
+            })
+        
+        if copy_video and copy_audio:
+            logger.info("Джерело вже у форматі TikTok - копіювання без перекодування")
+        elif copy_audio:
+            logger.info("Аудіо вже у форматі AAC - копіювання аудіопотоку")
+        return options
+    
+    @staticmethod
+    def _parse_bitrate(value) -> float:
+        """Бітрейт у форматі FFmpeg ("2M", "128k", 500000) у біт/с"""
+        if isinstance(value, (int, float)):
+            return float(value)
+        value = str(value).strip()
+        multipliers = {'k': 1e3, 'K': 1e3, 'm': 1e6, 'M': 1e6}
+        if value and value[-1] in multipliers:
+            return float(value[:-1]) * multipliers[value[-1]]
+        return float(value)
+    
+    def _size_cap(self, clip_length: float) -> Optional[float]:
+        """
+        Максимальний піковий бітрейт відео (біт/с) для стелі розміру кліпа
+        
+        За VBV розмір кліпа не перевищує maxrate * тривалість + bufsize,
+        тож при bufsize = 2 * maxrate стеля max_size_mb гарантована.
+        """
+        max_size_mb = self.profile.get('max_size_mb')
+        if not max_size_mb or not clip_length:
+            return None
+        budget = max_size_mb * 1024 * 1024 * 8 * self.CONTAINER_OVERHEAD
+        budget -= self._parse_bitrate(self.video_settings["audio_bitrate"]) * clip_length
+        return max(budget / (clip_length + 2), 100e3)
+    
+    def _video_codec_options(self, clip_length: Optional[float] = None) -> Dict:
+        """Параметри x264 з поточного профілю кодування"""
+        profile = self.profile
+        options = {
+            'vcodec': 'libx264',
+            'preset': profile.get('preset', 'medium'),
+        }
+        if 'crf' in profile:
+            options['crf'] = profile['crf']
+            # CRF з обмеженням пікового бітрейту (VBV)
+            if 'maxrate' in profile:
+                options['maxrate'] = profile['maxrate']
+                options['bufsize'] = profile.get('bufsize', profile['maxrate'])
+        else:
+            options['video_bitrate'] = profile.get(
+                'bitrate', self.video_settings["bitrate"]
+            )
+            if 'maxrate' in profile:
+                options['maxrate'] = profile['maxrate']
+                options['bufsize'] = profile.get('bufsize', profile['maxrate'])
+        
+        cap = self._size_cap(clip_length)
+        if cap is not None:
+            maxrate = min(cap, self._parse_bitrate(options.get('maxrate', cap)))
+            bufsize = min(2 * maxrate,
+                          self._parse_bitrate(options.get('bufsize', 2 * maxrate)))
+            options['maxrate'] = f"{int(maxrate / 1000)}k"
+            options['bufsize'] = f"{int(bufsize / 1000)}k"
+        
+        if profile.get('tune'):
+            options['tune'] = profile['tune']
+        if profile.get('gop'):
+            options['g'] = profile['gop']
+        
+        # Явний бюджет потоків (пул процесів) важливіший за профіль
+        threads = self.threads or profile.get('threads', 0)
+        if threads:
+            options['threads'] = threads
+        return options
+    
+    def _report_savings(self, video_path: Path,
+                        spans: Dict[int, Tuple[float, float]],
+                        clips: List[Path], options: Dict):
+        """
+        Звітувати розмір кліпів і економію проти фіксованого бітрейту
+        
+        Базою є video_settings.bitrate + audio_bitrate, з якими кліпи
+        кодувалися до появи профілів. Для перекодованих кліпів - також
+        піксельні операції фільтрів, зекономлені плануванням ланцюжка
+        проти універсального scale+crop.
+        """
+        filters = None
+        if options['vcodec'] != 'copy':
+            filters = self._video_filters(video_path, self.width, self.height,
+                                          self.fps)
+            if filters['baseline'] is None:
+                filters = None
+        nominal_rate = (self._parse_bitrate(self.video_settings["bitrate"])
+                        + self._parse_bitrate(self.video_settings["audio_bitrate"]))
+        created = set(clips)
+        total_size = 0
+        total_saved = 0.0
+        total_pixels = 0.0
+        for index, (_, length) in spans.items():
+            clip = self._clip_path(video_path, index)
+            if clip not in created:
+                continue
+            size = clip.stat().st_size
+            saved = nominal_rate * length / 8 - size
+            total_size += size
+            total_saved += saved
+            pixels = ""
+            if filters:
+                saved_pixels = ((filters['baseline'] - filters['pixels'])
+                                * length)
+                total_pixels += saved_pixels
+                pixels = (f", фільтри зекономили {saved_pixels / 1e9:.1f} млрд "
+                          f"пікселів")
+            logger.info(f"💾 {clip.name}: {size / 1024 / 1024:.1f} МБ, "
+                        f"економія {saved / 1024 / 1024:+.1f} МБ{pixels}")
+        if created:
+            logger.info(f"💾 {video_path.name}: {total_size / 1024 / 1024:.1f} МБ, "
+                        f"економія {total_saved / 1024 / 1024:+.1f} МБ проти "
+                        f"{self.video_settings['bitrate']} "
+                        f"(профіль {self.profile_name})")
+            if filters:
+                logger.info(f"🧮 {video_path.name}: фільтри зекономили "
+                            f"{total_pixels / 1e9:.1f} млрд піксельних операцій "
+                            f"проти scale+crop")
+    
+    def _video_filters(self, video_path: Path, width: int, height: int,
+                       fps: Optional[float] = None,
+                       reframe: Optional[Tuple[Path, float]] = None) -> Dict:
+        """План фільтрів джерела до кадру width x height (див. plan_filters)"""
+        return plan_filters(self._probes.get(video_path), width, height, fps,
+                            reframe)
+    
+    def _log_filters(self, video_path: Path):
+        """Показати запланований ланцюжок фільтрів джерела"""
+        filters = self._video_filters(video_path, self.width, self.height,
+                                      self.fps)
+        if filters['baseline']:
+            logger.info(f"🧮 Фільтри {video_path.name}: {filters['vf']} "
+                        f"({1 - filters['pixels'] / filters['baseline']:.0%} "
+                        f"пікселів менше за scale+crop)")
+    
+    def _clip_stem(self, video_path: Path) -> str:
+        """
+        Основа назв кліпів джерела, унікальна в межах input_dir
+        
+        Епізоди з однаковою назвою в різних папках серіалів (Serial/ep1.mkv
+        і Serial/ShowB/ep1.mkv) інакше писали б ті самі кліпи. Папки
+        додаються на початок через ". ", як у назвах серій, тож опис
+        бере назву серіалу з папки; назви кліпів джерел у корені
+        input_dir не змінюються.
+        """
+        try:
+            relative = video_path.resolve().relative_to(self.input_dir.resolve())
+        except ValueError:
+            return video_path.stem
+        return ". ".join(relative.parent.parts + (relative.stem,))
+    
+    def _clip_path(self, video_path: Path, index: int) -> Path:
+        """Шлях до кліпа з номером index (нумерація з 1)"""
+        return self.output_dir / f"{self._clip_stem(video_path)}_clip_{index:03d}.mp4"
+    
+    def _proxy_path(self, video_path: Path, index: int) -> Path:
+        """Шлях до легкої копії кліпа для перегляду"""
+        return self.output_dir / "proxy" / self._clip_path(video_path, index).name
+    
+    def _side_outputs(self, source, video_path: Path,
+                      spans: Dict[int, Tuple[float, float]], options: Dict,
+                      segment_options: Optional[Dict] = None,
+                      reframe: Optional[Tuple[Path, float]] = None) -> List:
+        """
+        Додаткові виходи того ж проходу FFmpeg: проксі для перегляду
+        
+        FFmpeg декодує вхід один раз і роздає кадри всім виходам, тому
+        проксі майже не додає часу. Обкладинка окремим файлом не пишеться:
+        TikTok приймає лише час кадру (див. CoverSelector).
+        
+        Args:
+            source: Вхід ffmpeg-python (з ss/t відрізка)
+            spans: Кліпи, які пише цей прохід: {номер: (початок, тривалість)}
+            segment_options: Параметри segment muxer, якщо прохід пише
+                всі кліпи плану одразу
+            reframe: Команди кадрування проходу (з _reframe_commands)
+        """
+        if options.get('vcodec') == 'copy':
+            return []
+        
+        outputs = []
+        indices = sorted(spans)
+        if self.video_settings["proxy"]:
+            (self.output_dir / "proxy").mkdir(exist_ok=True)
+            proxy_height = int(self.video_settings["proxy_height"])
+            proxy_width = round(proxy_height * self.width / self.height / 2) * 2
+            if segment_options:
+                stem = self._clip_stem(video_path).replace('%', '%%')
+                proxy = self.output_dir / "proxy" / f"{stem}_clip_%03d.mp4"
+            else:
+                proxy = self._proxy_path(video_path, indices[0])
+            filters = self._video_filters(video_path, proxy_width, proxy_height,
+                                          self.fps, reframe)
+            rate = {'r': filters['r']} if filters['r'] else {}
+            outputs.append(source.output(
+                str(proxy), vcodec='libx264', preset='veryfast',
+                video_bitrate=self.video_settings["proxy_bitrate"],
+                vf=filters['vf'], acodec='aac', audio_bitrate='64k',
+                **rate, **(segment_options or {})
+            ))
+        return outputs
+    
+    def _collect_clips(self, video_path: Path, indices) -> List[Path]:
+        """Зібрати створені кліпи у порядку номерів"""
+        clips = []
+        for index in indices:
+            output_path = self._clip_path(video_path, index)
+            if output_path.exists():
+                clips.append(output_path)
+                self._clip_done(output_path)
+        return clips
+    
+    def _clip_done(self, clip_path: Path):
+        """Повідомити про готовий кліп (один раз на нарізання)"""
+        if clip_path in self._announced or not clip_path.exists():
+            return
+        self._announced.add(clip_path)
+        logger.info(f"Створено кліп: {clip_path.name}")
+        if self.on_clip:
+            self.on_clip(clip_path)
+    
+    def _temp_clip_path(self, video_path: Path, index: int) -> Path:
+        """
+        Тимчасова назва кліпа під час запису
+        
+        Прихований файл без розширення .mp4 не потрапить ні в чергу, ні в
+        кеш кліпів, навіть якщо процес обірветься посеред запису.
+        """
+        return self.output_dir / f".{self._clip_path(video_path, index).name}.part"
+    
+    def _clean_partials(self, video_path: Path):
+        """Видалити недописані кліпи джерела, що лишилися після збою"""
+        pattern = f".{glob.escape(self._clip_stem(video_path))}_clip_*.mp4.part"
+        for partial in self.output_dir.glob(pattern):
+            partial.unlink(missing_ok=True)
+    
+    def _start_clips(self, video_path: Path, indices):
+        """Позначити кліпи в журналі перед запуском FFmpeg"""
+        if self.journal:
+            self.journal.start(video_path, indices)
+    
+    async def _finalize_clip(self, video_path: Path, index: int,
+                             length: Optional[float] = None):
+        """
+        Атомарно перейменувати дописаний кліп і записати його в каталог
+        
+        Запис відбувається одразу після кожного кліпа, тож повторний
+        запуск після збою продовжує з першого незавершеного кліпа.
+        Пошкоджений кліп видаляється і рахується як невдала спроба.
+        FFprobe перевірки працює в потоці, тож event loop (завантаження,
+        прогрес FFmpeg) не чекає на неї.
+        
+        length - очікувана тривалість, якщо межі кліпа точні
+        """
+        temp_path = self._temp_clip_path(video_path, index)
+        clip_path = self._clip_path(video_path, index)
+        if not temp_path.exists():
+            return
+        os.replace(temp_path, clip_path)
+        
+        if self.video_settings["verify_clips"]:
+            probe = await asyncio.to_thread(self.probe_service.probe, video_path)
+            source_audio = ProbeService.first_stream(probe, 'audio')
+            problems = await asyncio.to_thread(self.verifier.verify, clip_path,
+                                               length,
+                                               audio=source_audio is not None)
+            if problems:
+                error = "; ".join(problems)
+                logger.error(f"Пошкоджений кліп {clip_path.name}: {error}")
+                clip_path.unlink(missing_ok=True)
+                if self.journal:
+                    self.journal.fail(video_path, [index], error)
+                return
+        
+        if self.journal:
+            self.journal.finish(video_path, index)
+        settings = self._job_settings.get(video_path)
+        if self.catalog and settings:
+            span = self._plans.get(video_path, {}).get(index)
+            self.catalog.record_clips(video_path, settings, {index: clip_path},
+                                      {index: span} if span else None)
+        self._clip_done(clip_path)
+    
+    def _clip_failed(self, video_path: Path, index: int, error: Exception):
+        """Записати невдалу спробу кліпа і продовжити з наступним"""
+        logger.error(f"Помилка кліпа {self._clip_path(video_path, index).name}: "
+                     f"{self._error_text(error)}")
+        self._temp_clip_path(video_path, index).unlink(missing_ok=True)
+        if getattr(error, 'stalled', None) is not None:
+            self._stalled.setdefault(video_path, set()).add(index)
+        if self.journal:
+            self.journal.fail(video_path, [index], self._error_text(error))
+    
+    @staticmethod
+    def _error_text(error: Exception) -> str:
+        """Текст помилки разом з кінцем stderr FFmpeg"""
+        stderr = getattr(error, 'stderr', None)
+        if stderr:
+            return f"{error}: {stderr.decode(errors='replace').strip()[-300:]}"
+        return str(error)
+    
+    async def _cut_by_seek(self, video_path: Path,
+                           spans: Dict[int, Tuple[float, float]],
+                           options: Dict) -> List[Path]:
+        """
+        Окремий прохід FFmpeg з пошуком (ss) для кожного кліпа
+        
+        При копіюванні відео кліп починається з ключового кадру перед ss.
+        
+        spans - {номер кліпа: (початок, тривалість)}
+        """
+        import ffmpeg
+        
+        gains = await self._audio_gains(video_path, spans)
+        for index, (start_time, length) in spans.items():
+            output_path = self._clip_path(video_path, index)
+            clip_options = dict(options)
+            if gains:
+                clip_options['af'] = f"volume={gains[index]:.2f}dB"
+            reframe = self._reframe_commands(video_path, start_time, length)
+            if reframe:
+                clip_options['vf'] = self._video_filters(
+                    video_path, self.width, self.height, self.fps, reframe
+                )['vf']
+            subtitle_filter, subtitle_file = (
+                self._subtitle_filter(video_path, start_time, length)
+            )
+            if subtitle_filter:
+                clip_options['vf'] += subtitle_filter
+            
+            # Нарізати відео за допомогою FFmpeg (у тимчасовий файл)
+            source = ffmpeg.input(str(video_path), ss=start_time, t=length,
+                                  **self._input_options())
+            stream = ffmpeg.merge_outputs(
+                source.output(str(self._temp_clip_path(video_path, index)),
+                              format='mp4', **clip_options),
+                *self._side_outputs(source, video_path,
+                                    {index: (start_time, length)}, options,
+                                    reframe=reframe)
+            ).overwrite_output()
+            self._start_clips(video_path, [index])
+            try:
+                await self._run(stream, length, output_path.name)
+            except ffmpeg.Error as e:
+                self._clip_failed(video_path, index, e)
+                continue
+            finally:
+                if subtitle_file:
+                    subtitle_file.unlink(missing_ok=True)
+                if reframe:
+                    reframe[0].unlink(missing_ok=True)
+            # При копіюванні відео пошук зсуває початок до ключового кадру
+            await self._finalize_clip(video_path, index,
+                                      length if options['vcodec'] != 'copy' else None)
+        
+        return self._collect_clips(video_path, spans)
+    
+    async def _cut_segmented(self, video_path: Path,
+                             spans: Dict[int, Tuple[float, float]],
+                             options: Dict) -> List[Path]:
+        """
+        Одне декодування епізоду: segment muxer пише всі кліпи за один прохід
+        
+        Ключові кадри примусово ставляться на межах кліпів, тому кожен
+        сегмент починається точно з потрібного кадру. При копіюванні відео
+        межі зсуваються до найближчих наступних ключових кадрів джерела.
+        Хвіст після останнього кліпа плану відкидається, як і в режимі seek.
+        
+        spans - суцільний відрізок кліпів {номер: (початок, тривалість)}.
+        """
+        import ffmpeg
+        
+        indices = sorted(spans)
+        # Символ % у назві файлу зламав би шаблон segment muxer
+        stem = self._clip_stem(video_path).replace('%', '%%')
+        pattern = self.output_dir / f".{stem}_clip_%03d.mp4.part"
+        
+        segment_options = {
+            'format': 'segment',
+            'segment_start_number': indices[0],
+            'reset_timestamps': 1,
+        }
+        plan_start = spans[indices[0]][0]
+        plan_end = sum(spans[indices[-1]])
+        # Час сегментів відраховується від початку вхідного відрізка
+        boundaries = ",".join(
+            f"{spans[index][0] - plan_start:.3f}" for index in indices[1:]
+        )
+        if boundaries:
+            # Через затримку B-кадрів ключовий кадр може трохи не збігатися
+            # з межею, тому segment_time_delta обов'язковий
+            segment_options.update(
+                segment_times=boundaries,
+                segment_time_delta=0.05
+            )
+            if options['vcodec'] != 'copy':
+                segment_options['force_key_frames'] = boundaries
+        
+        gains = await self._audio_gains(video_path, spans)
+        if gains:
+            options = dict(options,
+                           af=self._gain_filter(gains, spans, plan_start))
+        # Segment muxer дописує назву кліпа у список, щойно закриває файл,
+        # тож кліпи стають доступні ще до кінця проходу
+        segment_list = self.output_dir / f".{self._clip_stem(video_path)}.segments"
+        
+        # Межі сегментів точні лише при перекодуванні відео
+        lengths = {
+            index: spans[index][1] if options['vcodec'] != 'copy' else None
+            for index in indices
+        }
+        
+        # Колбек прогресу лише ставить готові кліпи в чергу: перевірка
+        # кліпа не має затримувати читання прогресу FFmpeg
+        finished: asyncio.Queue = asyncio.Queue()
+        queued = set()
+        
+        def announce_segments(_event: Dict):
+            if segment_list.exists():
+                names = set(segment_list.read_text(errors='replace').splitlines())
+                for index in indices:
+                    if (index not in queued
+                            and self._temp_clip_path(video_path, index).name in names):
+                        queued.add(index)
+                        finished.put_nowait(index)
+        
+        async def finalize_segments():
+            while (index := await finished.get()) is not None:
+                await self._finalize_clip(video_path, index, lengths[index])
+        
+        source = ffmpeg.input(str(video_path), ss=plan_start,
+                              t=plan_end - plan_start, **self._input_options())
+        # Субтитри лише в кліпах; обкладинки та проксі - без них
+        clip_options = dict(options)
+        reframe = self._reframe_commands(video_path, plan_start,
+                                         plan_end - plan_start)
+        if reframe:
+            clip_options['vf'] = self._video_filters(
+                video_path, self.width, self.height, self.fps, reframe
+            )['vf']
+        subtitle_filter, subtitle_file = (
+            self._subtitle_filter(video_path, plan_start, plan_end - plan_start)
+        )
+        if subtitle_filter:
+            clip_options['vf'] += subtitle_filter
+        
+        # Потоки задаються явно: за назвою .part FFmpeg не визначить,
+        # які потоки підтримує вкладений формат сегментів
+        stream = ffmpeg.merge_outputs(
+            ffmpeg.output(source['v'], source['a?'], str(pattern),
+                          **segment_options, **clip_options,
+                          segment_format='mp4',
+                          segment_list=str(segment_list),
+                          segment_list_type='flat'),
+            *self._side_outputs(source, video_path, spans, options,
+                                segment_options, reframe)
+        ).overwrite_output()
+        self._start_clips(video_path, indices)
+        finalizer = asyncio.create_task(finalize_segments())
+        try:
+            await self._run(stream, plan_end - plan_start, video_path.name,
+                            announce_segments)
+            announce_segments({})
+        finally:
+            # Кліпи, дописані до кінця чи збою проходу, фіналізуються
+            finished.put_nowait(None)
+            await finalizer
+            segment_list.unlink(missing_ok=True)
+            if subtitle_file:
+                subtitle_file.unlink(missing_ok=True)
+            if reframe:
+                reframe[0].unlink(missing_ok=True)
+        
+        return self._collect_clips(video_path, indices)
+    
+    async def _cut_smart(self, video_path: Path,
+                         spans: Dict[int, Tuple[float, float]],
+                         keyframes: List[float], probe: Dict,
+                         options: Dict) -> List[Path]:
+        """
+        Smart-нарізання: кадрова точність майже зі швидкістю копіювання
+        
+        Неповний GOP від початку кліпа до першого ключового кадру
+        перекодовується, решта кліпа копіюється без декодування. Кожна
+        частина несе власні SPS/PPS усередині потоку, тому після з'єднання
+        декодер перемикається на параметри скопійованої частини.
+        """
+        import ffmpeg
+        
+        video = ProbeService.first_stream(probe, 'video')
+        fps = video.get('avg_frame_rate', str(self.fps))
+        fps_value = self._parse_rate(fps)
+        # Початок кліпа кодується з параметрами профілю, але у форматі джерела
+        head_options = self._video_codec_options(
+            max(length for _, length in spans.values())
+        )
+        audio_options = {k: v for k, v in options.items()
+                         if k in ('acodec', 'audio_bitrate')}
+        gains = await self._audio_gains(video_path, spans)
+        
+        for index, (start, length) in spans.items():
+            end = start + length
+            output_path = self._clip_path(video_path, index)
+            if gains:
+                audio_options['af'] = f"volume={gains[index]:.2f}dB"
+            
+            i = bisect_left(keyframes, start - 0.001)
+            keyframe = keyframes[i] if i < len(keyframes) else end
+            keyframe = min(keyframe, end)
+            
+            self._start_clips(video_path, [index])
+            try:
+                with tempfile.TemporaryDirectory(dir=self.output_dir) as tmp:
+                    parts = []
+                    if keyframe - start > 0.001:
+                        head = Path(tmp) / "head.mp4"
+                        stream = (
+                            ffmpeg
+                            .input(str(video_path), ss=start, t=keyframe - start,
+                                   **self._input_options())
+                            .output(
+                                str(head), an=None, pix_fmt='yuv420p', r=fps,
+                                vframes=round((keyframe - start) * fps_value),
+                                **head_options,
+                                **{'x264-params': 'repeat-headers=1'}
+                            )
+                            .overwrite_output()
+                        )
+                        await self._run(stream, keyframe - start, output_path.name)
+                        parts.append(head)
+                    if end - keyframe > 0.001:
+                        tail = Path(tmp) / "tail.mp4"
+                        # Невеликий зсув, щоб пошук не відкотився до
+                        # попереднього ключового кадру через округлення;
+                        # кількість кадрів задається явно, бо -t при копіюванні
+                        # рахується від ss, а не від ключового кадру
+                        stream = (
+                            ffmpeg
+                            .input(str(video_path), ss=keyframe + 0.001)
+                            .output(str(tail), an=None, vcodec='copy',
+                                    vframes=round((end - keyframe) * fps_value),
+                                    bsf='h264_mp4toannexb',
+                                    avoid_negative_ts='make_zero')
+                            .overwrite_output()
+                        )
+                        await self._run(stream, end - keyframe, output_path.name)
+                        parts.append(tail)
+                
+                    concat_list = Path(tmp) / "parts.txt"
+                    concat_list.write_text(
+                        "".join(f"file '{part.name}'\n" for part in parts)
+                    )
+                    video_part = ffmpeg.input(str(concat_list), format='concat',
+                                              safe=0)
+                    audio_part = ffmpeg.input(str(video_path), ss=start, t=length)
+                    stream = (
+                        ffmpeg
+                        .output(video_part['v'], audio_part['a?'],
+                                str(self._temp_clip_path(video_path, index)),
+                                format='mp4', vcodec='copy', **audio_options)
+                        .overwrite_output()
+                    )
+                    await self._run(stream, length, output_path.name)
+            except ffmpeg.Error as e:
+                self._clip_failed(video_path, index, e)
+                continue
+            await self._finalize_clip(video_path, index, length)
+        
+        return self._collect_clips(video_path, spans)
+
+
+def _cut_episode(processor_args: Dict, video_path: Path) -> Tuple[List[Path], float]:
+    """
+    Нарізати один епізод у робочому процесі пулу
+    
+    Returns:
+        Кліпи епізоду та час обробки в секундах
+    """
+    processor = VideoProcessor(**processor_args)
+    started = time.monotonic()
+    clips = processor.cut_video_to_clips(video_path)
+    return clips, time.monotonic() - started
+
+
+def _run_worker(processor_args: Dict, wait: bool = False) -> int:
+    """
+    Робочий процес розподіленого нарізання (див. ClipWorker)
+    
+    Returns:
+        Кількість відрендерених кліпів
+    """
+    processor = VideoProcessor(**processor_args)
+    return asyncio.run(ClipWorker(processor).run(wait))
 
 
 class TikTokUploader:
     """Клас для завантаження відео у TikTok через API"""
     
-    def __init__(self, config_file: str = "tiktok_config.json"):
+    # Обмеження TikTok Content Posting API
+    MIN_DURATION = 3
+    MAX_DURATION = 600
+    MAX_FILE_SIZE = 4 * 1024 ** 3
+    
+    def __init__(self, config_file: str = "tiktok_config.json",
+                 stalls: Optional[StallLog] = None):
+        """
+        Args:
+            config_file: Конфігурація з описами та upload_settings
+            stalls: Облік часу, втраченого на завислі завантаження
+        """
         self.config_file = config_file
         self.load_config()
+        self.stalls = stalls
         
         # Ініціалізувати API клієнт
         from tiktok_api import TikTokAPIClient
-        self.api_client = TikTokAPIClient()
+        upload_settings = self.config.get("upload_settings", {})
+        self.api_client = TikTokAPIClient(
+            timeout=upload_settings.get("upload_timeout", 120)
+        )
+        self.cover_selector = CoverSelector()
         
     def load_config(self):
         """Завантажити конфігурацію TikTok"""
@@ -217,6 +1848,39 @@ class TikTokUploader:
             description += f"\n\n{hashtags}"
         
         return description
+    
+    def validate_video(self, video_path: Path) -> bool:
+        """
+        Перевірити кліп перед завантаженням (метадані беруться з кешу FFprobe)
+        
+        Args:
+            video_path: Шлях до відеофайлу
+            
+        Returns:
+            True якщо файл придатний для TikTok
+        """
+        try:
+            if video_path.stat().st_size > self.MAX_FILE_SIZE:
+                logger.error(f"Файл завеликий для TikTok: {video_path.name}")
+                return False
+            
+            probe = get_probe_service().probe(video_path)
+        except Exception as e:
+            logger.error(f"Не вдалося прочитати {video_path}: {e}")
+            return False
+        
+        if ProbeService.first_stream(probe, 'video') is None:
+            logger.error(f"У файлі немає відеопотоку: {video_path.name}")
+            return False
+        
+        duration = ProbeService.duration(probe)
+        if duration is None or not (self.MIN_DURATION <= duration <= self.MAX_DURATION):
+            logger.error(
+                f"Неприпустима тривалість {duration}с: {video_path.name}"
+            )
+            return False
+        return True
+    
     async def upload_video(self, video_path: Path,
                            description: str = None) -> bool:
         """
@@ -237,6 +1901,9 @@ class TikTokUploader:
                 )
                 return False
             
+            if not self.validate_video(video_path):
+                return False
+            
             # Створити опис якщо не вказаний
             if not description:
                 description = self.generate_description(video_path)
@@ -244,12 +1911,19 @@ class TikTokUploader:
             # Отримати назву файлу для заголовку
             title = video_path.stem
             
-            # Завантажити відео через API
-            result = self.api_client.upload_video(
+            # Найкращий кадр обкладинки (зазвичай уже в кеші після нарізки)
+            cover_ms = await asyncio.to_thread(self.cover_selector.select,
+                                               video_path)
+            
+            # Завантажити відео через API (в окремому потоці, щоб не
+            # блокувати event loop, де паралельно може йти нарізка)
+            result = await asyncio.to_thread(
+                self.api_client.upload_video,
                 video_path=str(video_path),
                 title=title,
                 description=description,
-                privacy_level=self.config.get("privacy_level", "SELF_ONLY")
+                privacy_level=self.config.get("privacy_level", "SELF_ONLY"),
+                cover_timestamp_ms=cover_ms
             )
             
             if result:
@@ -257,6 +1931,9 @@ class TikTokUploader:
                 return True
             else:
                 logger.error(f"Помилка завантаження: {video_path.name}")
+                if self.api_client.stalled is not None and self.stalls:
+                    self.stalls.record('upload', video_path.name,
+                                       self.api_client.stalled)
                 return False
             
         except Exception as e:
@@ -282,6 +1959,8 @@ class ScheduleManager:
                 "posts_per_day": 3,
                 "posting_times": ["09:00", "15:00", "21:00"],
                 "last_upload": None,
+                "render_lead_minutes": 30,
+                "clip_cache_mb": 2048,
                 "queue": []
             }
             self.save_schedule()
@@ -292,11 +1971,45 @@ class ScheduleManager:
             json.dump(self.schedule, f, indent=2, ensure_ascii=False)
     
     def add_videos_to_queue(self, video_paths: List[Path]):
-        """Додати відео до черги"""
+        """Додати відео до черги (без кліпів, які вже в черзі)"""
+        queued = {str(self.entry_path(entry)) for entry in self.schedule["queue"]}
+        added = []
         for video_path in video_paths:
-            self.schedule["queue"].append(str(video_path))
+            if str(video_path) not in queued:
+                queued.add(str(video_path))
+                added.append(str(video_path))
+        self.schedule["queue"].extend(added)
         self.save_schedule()
-        logger.info(f"Додано {len(video_paths)} відео до черги")
+        logger.info(f"Додано {len(added)} відео до черги")
+    
+    def add_virtual_clips(self, entries: List[Dict]):
+        """Додати до черги віртуальні кліпи (без кліпів, які вже в черзі)"""
+        queued = {str(self.entry_path(entry)) for entry in self.schedule["queue"]}
+        added = [entry for entry in entries if entry['clip'] not in queued]
+        self.schedule["queue"].extend(added)
+        self.save_schedule()
+        logger.info(f"Додано {len(added)} віртуальних кліпів до черги")
+    
+    @staticmethod
+    def is_virtual(entry) -> bool:
+        """Чи є запис черги віртуальним кліпом (рендериться перед публікацією)"""
+        return isinstance(entry, dict)
+    
+    @staticmethod
+    def entry_path(entry) -> Path:
+        """Шлях до файлу кліпа для запису черги"""
+        return Path(entry['clip'] if isinstance(entry, dict) else entry)
+    
+    def render_due(self) -> bool:
+        """Чи настав час рендерити перший віртуальний кліп черги"""
+        if not self.schedule["queue"]:
+            return False
+        entry = self.schedule["queue"][0]
+        if not self.is_virtual(entry) or self.entry_path(entry).exists():
+            return False
+        
+        lead = timedelta(minutes=self.schedule.get("render_lead_minutes", 30))
+        return self.get_next_upload_time() - datetime.now() <= lead
     
     def get_next_upload_time(self) -> datetime:
         """Отримати час наступного завантаження"""
@@ -331,61 +2044,364 @@ class ScheduleManager:
 class TikTokBot:
     """Основний клас бота"""
     
-    def __init__(self):
-        self.processor = VideoProcessor()
-        self.uploader = TikTokUploader()
+    # Спроби відрендерити віртуальний кліп, після яких він знімається з черги
+    MAX_RENDER_ATTEMPTS = 3
+    
+    def __init__(self, cut_mode: str = "segment", incremental: bool = True,
+                 snap_tolerance: float = 0.0, profile: Optional[str] = None):
+        self.processor = VideoProcessor(
+            cut_mode=cut_mode,
+            catalog_file="media_catalog.db" if incremental else None,
+            snap_tolerance=snap_tolerance,
+            profile=profile
+        )
+        self.uploader = TikTokUploader(stalls=self.processor.stalls)
         self.scheduler = ScheduleManager()
+        self.clip_cache = ClipCache(
+            self.processor.output_dir,
+            self.scheduler.schedule.get("clip_cache_mb", 2048) * 1024 * 1024,
+            self.processor.catalog
+        )
         
-    async def process_all_videos(self):
-        """Обробити всі відео та додати до черги"""
+    async def process_all_videos(self, workers: int = 1,
+                                 threads_per_worker: int = 0,
+                                 jit: bool = False, distributed: bool = False):
+        """
+        Обробити всі відео та додати до черги
+        
+        Args:
+            workers: Кількість паралельних процесів (1 - послідовно)
+            threads_per_worker: Потоки FFmpeg на процес
+                (0 - порівну ділити ядра між процесами)
+            jit: Лише запланувати віртуальні кліпи; кожен рендериться
+                за render_lead_minutes до свого часу публікації
+            distributed: Поставити кліпи в чергу журналу задач і нарізати
+                їх workers робочими процесами (можуть допомагати інші
+                процеси цієї машини з командою worker)
+        """
         video_files = self.processor.get_video_files()
         logger.info(f"Знайдено {len(video_files)} відеофайлів")
         
+        if jit:
+            entries = []
+            for video_file in video_files:
+                entries.extend(
+                    await self.processor.plan_virtual_clips_async(video_file)
+                )
+            self.scheduler.add_virtual_clips(entries)
+            return
+        
+        started = time.monotonic()
+        # Прогріти кеш метаданих паралельно, далі FFprobe бере їх з кешу
+        await asyncio.to_thread(self.processor.probe_service.probe_many,
+                                video_files)
+        if distributed:
+            all_clips = await self._cut_distributed(video_files, workers,
+                                                    threads_per_worker)
+            await self._queue_clips(all_clips)
+            return
+        if workers > 1 and len(video_files) > 1:
+            results = await self._cut_in_pool(video_files, workers,
+                                              threads_per_worker)
+        else:
+            results = []
+            for video_file in video_files:
+                episode_started = time.monotonic()
+                clips = await self.processor.cut_video_to_clips_async(video_file)
+                results.append((clips, time.monotonic() - episode_started))
+        wall_time = time.monotonic() - started
+        
+        # Результати йдуть у порядку епізодів, кліпи - у порядку номерів
         all_clips = []
-        for video_file in video_files:
-            clips = self.processor.cut_video_to_clips(video_file)
+        for video_file, (clips, elapsed) in zip(video_files, results):
+            logger.info(
+                f"⏱️ {video_file.name}: {len(clips)} кліпів за {elapsed:.1f}с"
+            )
             all_clips.extend(clips)
+        
+        if video_files and wall_time > 0:
+            episodes_time = sum(elapsed for _, elapsed in results)
+            logger.info(
+                f"Загальний час: {wall_time:.1f}с, сумарний час епізодів: "
+                f"{episodes_time:.1f}с, прискорення: x{episodes_time / wall_time:.2f}"
+            )
             
-        if all_clips:
-            self.scheduler.add_videos_to_queue(all_clips)
-            logger.info(f"Всього створено {len(all_clips)} кліпів")
+        await self._queue_clips(all_clips)
+    
+    async def _queue_clips(self, clips: List[Path]):
+        """Додати нарізані кліпи до черги публікацій"""
+        if clips:
+            self.scheduler.add_videos_to_queue(clips)
+            logger.info(f"Всього створено {len(clips)} кліпів")
+            # Обкладинки вибираються пакетно, публікація бере їх з кешу
+            await asyncio.to_thread(self.uploader.cover_selector.select_many,
+                                    clips)
+    
+    async def _cut_in_pool(self, video_files: List[Path], workers: int,
+                           threads_per_worker: int) -> List[Tuple[List[Path], float]]:
+        """Нарізати епізоди паралельно у пулі процесів"""
+        workers = min(workers, len(video_files))
+        processor_args = self._processor_args(workers, threads_per_worker)
+        threads_per_worker = processor_args['threads']
+        logger.info(
+            f"Паралельна обробка: {workers} процесів x {threads_per_worker} потоків FFmpeg"
+        )
+        
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=setup_logging) as pool:
+            tasks = [
+                loop.run_in_executor(pool, _cut_episode, processor_args, video_file)
+                for video_file in video_files
+            ]
+            return await asyncio.gather(*tasks)
             
+    def _processor_args(self, workers: int, threads_per_worker: int) -> Dict:
+        """Параметри VideoProcessor для робочих процесів"""
+        if not threads_per_worker:
+            # Не перевантажувати ядра: кожен процес отримує свою частку
+            threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+        return {
+            'input_dir': str(self.processor.input_dir),
+            'output_dir': str(self.processor.output_dir),
+            'cut_mode': self.processor.cut_mode,
+            'threads': threads_per_worker,
+            'catalog_file': self.processor.catalog_file,
+            'cache_file': self.processor.cache_file,
+            'snap_tolerance': self.processor.snap_tolerance,
+            'config_file': self.processor.config_file,
+            'profile': self.processor.profile_name,
+        }
+    
+    async def run_workers(self, workers: int = 1, threads_per_worker: int = 0,
+                          wait: bool = False) -> int:
+        """
+        Запустити локальні робочі процеси розподіленого нарізання
+        
+        Додаткові процеси тієї ж машини запускаються так само (run_bot.py
+        worker); база каталогу локальна - WAL не працює через NFS чи SMB.
+        
+        Returns:
+            Кількість відрендерених кліпів
+        """
+        if self.processor.journal is None:
+            logger.error("Розподілене нарізання потребує каталогу")
+            return 0
+        processor_args = self._processor_args(workers, threads_per_worker)
+        logger.info(f"👷 Робочих процесів: {workers} x "
+                    f"{processor_args['threads']} потоків FFmpeg")
+        
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=setup_logging) as pool:
+            rendered = await asyncio.gather(*[
+                loop.run_in_executor(pool, _run_worker, processor_args, wait)
+                for _ in range(workers)
+            ])
+        return sum(rendered)
+    
+    async def _cut_distributed(self, video_files: List[Path], workers: int,
+                               threads_per_worker: int) -> List[Path]:
+        """
+        Поставити кліпи всіх епізодів у чергу й нарізати їх робочими
+        процесами (цього та інших запусків команди worker на цій машині)
+        
+        Returns:
+            Готові кліпи у порядку епізодів і номерів
+        """
+        queued = {}
+        for video_file in video_files:
+            queued[video_file] = await self.processor.enqueue_clips_async(video_file)
+        total = sum(len(indices) for indices in queued.values())
+        if not total:
+            return []
+        
+        started = time.monotonic()
+        await self.run_workers(workers, threads_per_worker)
+        wall_time = time.monotonic() - started
+        
+        clips = [clip for video_file, indices in queued.items()
+                 for clip in self.processor._collect_clips(video_file, indices)]
+        logger.info(f"Розподілене нарізання: {len(clips)} з {total} кліпів за "
+                    f"{wall_time:.1f}с ({len(clips) / max(wall_time, 1e-6):.2f} "
+                    f"кліпів/с)")
+        return clips
+    
+    def _enqueue_clip(self, clip_path: Path):
+        """Додати кліп до черги, щойно він записаний"""
+        self.scheduler.add_videos_to_queue([clip_path])
+    
+    async def ingest(self, poll_interval: float = 10.0, settle_time: float = 15.0):
+        """
+        Стежити за папкою серіалів і нарізати нові епізоди, щойно вони скопійовані
+        
+        Кожен кліп потрапляє в чергу одразу після запису, тож перший кліп
+        нового епізоду можна публікувати, не чекаючи кінця нарізання.
+        """
+        watcher = FolderWatcher(self.processor.input_dir,
+                                self.processor.VIDEO_EXTENSIONS,
+                                poll_interval, settle_time)
+        self.processor.on_clip = self._enqueue_clip
+        try:
+            async for video_file in watcher.changes():
+                logger.info(f"📥 Новий епізод: {video_file.name}")
+                clips = await self.processor.cut_video_to_clips_async(video_file)
+                if clips:
+                    await asyncio.to_thread(
+                        self.uploader.cover_selector.select_many, clips
+                    )
+        finally:
+            self.processor.on_clip = None
+    
+    def _processor_for(self, profile: str) -> VideoProcessor:
+        """Обробник з профілем кодування віртуального кліпа"""
+        if profile == self.processor.profile_name:
+            return self.processor
+        return VideoProcessor(
+            input_dir=str(self.processor.input_dir),
+            output_dir=str(self.processor.output_dir),
+            cut_mode=self.processor.cut_mode,
+            threads=self.processor.threads,
+            catalog_file=self.processor.catalog_file,
+            cache_file=self.processor.cache_file,
+            snap_tolerance=self.processor.snap_tolerance,
+            config_file=self.processor.config_file,
+            profile=profile
+        )
+    
+    async def materialize(self, entry) -> Optional[Path]:
+        """
+        Отримати файл кліпа для запису черги
+        
+        Віртуальний кліп рендериться, якщо його немає в кеші кліпів.
+        
+        Returns:
+            Шлях до кліпа або None, якщо файлу немає і його не створити
+        """
+        video_path = self.scheduler.entry_path(entry)
+        if self.scheduler.is_virtual(entry) and not video_path.exists():
+            video_path = await self._processor_for(
+                entry['profile']
+            ).render_clip_async(entry)
+            if video_path is None:
+                return None
+            self.clip_cache.evict(protected=self._protected_clips() | {video_path})
+            await asyncio.to_thread(self.uploader.cover_selector.select, video_path)
+        
+        if not video_path.exists():
+            return None
+        self.clip_cache.touch(video_path)
+        return video_path
+    
+    def _protected_clips(self) -> set:
+        """Файли черги, які неможливо відрендерити повторно"""
+        return {
+            self.scheduler.entry_path(entry)
+            for entry in self.scheduler.schedule["queue"]
+            if not self.scheduler.is_virtual(entry)
+        }
+    
+    def finish_upload(self, video_path: Path):
+        """Позначити кліп опублікованим і звільнити місце в кеші кліпів"""
+        self.scheduler.schedule["last_upload"] = datetime.now().isoformat()
+        self.scheduler.save_schedule()
+        if self.processor.catalog:
+            self.processor.catalog.mark_uploaded(video_path)
+        self.clip_cache.evict(protected=self._protected_clips())
+    
+    async def render_upcoming(self):
+        """Заздалегідь відрендерити наступний віртуальний кліп черги"""
+        if self.scheduler.render_due():
+            await self.materialize(self.scheduler.schedule["queue"][0])
+    
     async def upload_scheduled_videos(self):
         """Завантажити відео згідно розкладу"""
         if self.scheduler.should_upload_now() and self.scheduler.schedule["queue"]:
-            video_path = Path(self.scheduler.schedule["queue"].pop(0))
+            entry = self.scheduler.schedule["queue"].pop(0)
+            video_path = await self.materialize(entry)
             
-            if video_path.exists():
+            if video_path is not None:
+                if self.scheduler.is_virtual(entry):
+                    entry.pop('render_attempts', None)
                 success = await self.uploader.upload_video(video_path)
                 if success:
-                    self.scheduler.schedule["last_upload"] = datetime.now().isoformat()
-                    self.scheduler.save_schedule()
+                    self.finish_upload(video_path)
                 else:
                     # Повернути відео в чергу якщо завантаження не вдалося
-                    self.scheduler.schedule["queue"].insert(0, str(video_path))
+                    self.scheduler.schedule["queue"].insert(0, entry)
                     self.scheduler.save_schedule()
+            elif self.scheduler.is_virtual(entry):
+                # Рендер міг не вдатися через тимчасову причину (диск,
+                # недоступне джерело) - повторити пізніше
+                attempts = entry.get('render_attempts', 0) + 1
+                if attempts < self.MAX_RENDER_ATTEMPTS:
+                    entry['render_attempts'] = attempts
+                    self.scheduler.schedule["queue"].insert(0, entry)
+                    logger.warning(
+                        f"Не вдалося відрендерити {entry['clip']} "
+                        f"(спроба {attempts}/{self.MAX_RENDER_ATTEMPTS}), "
+                        f"кліп лишається в черзі"
+                    )
+                else:
+                    logger.error(
+                        f"Не вдалося відрендерити {entry['clip']} після "
+                        f"{attempts} спроб, кліп знято з черги"
+                    )
+                self.scheduler.save_schedule()
             else:
-                logger.warning(f"Файл не знайдено: {video_path}")
+                logger.warning(
+                    f"Файл не знайдено: {self.scheduler.entry_path(entry)}"
+                )
+                self.scheduler.save_schedule()
                 
-    async def run_continuous(self):
-        """Запустити бота в безперервному режимі"""
+    async def run_continuous(self, with_processing: bool = False,
+                             watch: bool = False, workers: int = 1,
+                             threads_per_worker: int = 0):
+        """
+        Запустити бота в безперервному режимі
+        
+        Args:
+            with_processing: Паралельно нарізати нові відео в тому ж event
+                loop; при зупинці бота кодування скасовується
+            watch: Стежити за папкою серіалів і нарізати нові епізоди,
+                щойно вони з'являються (кліпи стають у чергу по одному)
+            workers: Процеси нарізання для with_processing
+                (див. process_all_videos)
+            threads_per_worker: Потоки FFmpeg на один процес
+        """
         logger.info("Запуск TikTok бота...")
         
-        while True:
-            try:
-                await self.upload_scheduled_videos()
-                await asyncio.sleep(300)  # Перевіряти кожні 5 хвилин
-                
-            except KeyboardInterrupt:
-                logger.info("Зупинка бота...")
-                break
-            except Exception as e:
-                logger.error(f"Помилка в основному циклі: {e}")
-                await asyncio.sleep(60)  # Чекати хвилину перед повторною спробою
+        processing = None
+        if watch:
+            processing = asyncio.create_task(self.ingest())
+        elif with_processing:
+            processing = asyncio.create_task(self.process_all_videos(
+                workers=workers, threads_per_worker=threads_per_worker
+            ))
+        
+        try:
+            while True:
+                try:
+                    await self.render_upcoming()
+                    await self.upload_scheduled_videos()
+                    await asyncio.sleep(300)  # Перевіряти кожні 5 хвилин
+                    
+                except KeyboardInterrupt:
+                    logger.info("Зупинка бота...")
+                    break
+                except Exception as e:
+                    logger.error(f"Помилка в основному циклі: {e}")
+                    await asyncio.sleep(60)  # Чекати хвилину перед повторною спробою
+        finally:
+            if processing and not processing.done():
+                logger.info("Скасування обробки відео...")
+                processing.cancel()
+                await asyncio.gather(processing, return_exceptions=True)
 
 
 async def main():
     """Головна функція"""
+    setup_logging()
     bot = TikTokBot()
     await bot.run_continuous()
 